@@ -1,89 +1,258 @@
 
-
+import asyncio
 import aiohttp
 import logging
+import os
+from functools import partial
+
+from . import item_snapshot
+from . import json_decoder
+from . import metrics
+from . import request_scheduler
+from .search_index import SearchIndex
+from .inventory_cache import names as item_names
+
+
+item_database = {}
+search_index = SearchIndex({})
+database_version = 0
 
+DOWNLOAD_TIMEOUT = aiohttp.ClientTimeout(total=180, connect=15)
 
 DATA_URLS = [
     {"name": "all_items", "url": "https://raw.githubusercontent.com/ByMykel/CSGO-API/main/public/api/en/all.json"}
 ]
 
+REFRESH_INTERVAL = 6 * 3600   # сек, переопределяется ITEM_REFRESH_INTERVAL
+
+_snapshot = None
+_refresh_lock = asyncio.Lock()
+_refresh_task = None
+_revalidate_task = None
+
+
+def to_item_dict(data, name) -> dict:
+    """
+    Приводит JSON источника к виду {id: item}.
+    Умеет обрабатывать и dict, и list.
+    """
+    if isinstance(data, dict):
+        logging.info(f"Successfully loaded {len(data)} items from '{name}' (dict).")
+        return data
+    
+    elif isinstance(data, list):
+        logging.warning(f"Data from '{name}' is a list. Converting {len(data)} items...")
+        converted_data = {}
+        for item in data:
+            if 'id' in item:
+                converted_data[item['id']] = item
+            else:
+                logging.warning(f"Item in '{name}' has no 'id', skipping.")
+        
+        logging.info(f"Successfully converted and loaded {len(converted_data)} items from list '{name}'.")
+        return converted_data
+    
+    else:
+        logging.warning(f"Data from '{name}' is not a dict or list, skipping.")
+        return {}
+
+
+def parse_source(name, data) -> tuple:
+    """
+    reducer для json_decoder: выполняется в воркере рядом с разбором JSON
+    и возвращает источник уже в формате снапшота (item_snapshot.encode_items).
+    """
+    return item_snapshot.encode_items(to_item_dict(data, name))
 
 
-async def load_data_from_url(session, url, name):
+async def load_data_from_url(url, name, validators=None):
     """
-    Вспомогательная функция для загрузки и парсинга одного JSON
-    Теперь умеет обрабатывать и dict, и list.
+    Вспомогательная функция для загрузки и парсинга одного JSON.
+    validators — ETag/Last-Modified прошлой загрузки для условного запроса.
+
+    Возвращает (status, encoded, validators), где encoded — источник
+    в формате item_snapshot.encode_items; при 304 и ошибках encoded = None.
     """
     logging.info(f"Loading database '{name}'...")
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
     try:
-        async with session.get(url) as response:
-            if response.status == 200:
-                data = await response.json(content_type=None)
-                
-                if isinstance(data, dict):
-                    logging.info(f"Successfully loaded {len(data)} items from '{name}' (dict).")
-                    return data
-                
-                elif isinstance(data, list):
-                    logging.warning(f"Data from '{name}' is a list. Converting {len(data)} items...")
-                    converted_data = {}
-                    for item in data:
-                        if 'id' in item:
-                            converted_data[item['id']] = item
-                        else:
-                            logging.warning(f"Item in '{name}' has no 'id', skipping.")
-                    
-                    logging.info(f"Successfully converted and loaded {len(converted_data)} items from list '{name}'.")
-                    return converted_data
-               
-                
-                else:
-                    logging.warning(f"Data from '{name}' is not a dict or list, skipping.")
-                    return {}
-            else:
-                logging.error(f"Failed to load '{name}'. Status: {response.status}")
-                return {}
+        status, response_headers, body = await request_scheduler.fetch(
+            url, headers=headers, priority=request_scheduler.BACKGROUND, timeout=DOWNLOAD_TIMEOUT
+        )
+        if status == 304:
+            logging.info(f"Database '{name}' not modified.")
+            return status, None, validators
+        elif status == 200:
+            # Десятки МБ JSON разбираются и кодируются в воркере json_decoder.
+            encoded = await json_decoder.decode(body, partial(parse_source, name))
+            new_validators = {
+                "etag": response_headers.get("ETag"),
+                "last_modified": response_headers.get("Last-Modified"),
+            }
+            return status, encoded, new_validators
+        else:
+            logging.error(f"Failed to load '{name}'. Status: {status}")
+            return status, None, validators
     except Exception as e:
         logging.error(f"Error loading '{name}': {e}")
-        return {}
+        return None, None, validators
+
+
+def build_catalog(sources: dict) -> tuple:
+    """
+    Объединяет источники в одну базу и строит поисковый индекс.
+    Чистая функция без глобального состояния — выполняется в отдельном потоке.
+    """
+    database = {}
+    for items in sources.values():
+        database.update(items)
+    return database, SearchIndex(database)
+
+
+async def install(sources: dict) -> None:
+    """
+    Строит новую базу и индекс вне event loop, затем атомарно подменяет их.
+    Между присваиваниями нет await, поэтому хендлеры видят либо старую
+    пару (item_database, search_index), либо новую — но не смесь.
+    """
+    global item_database, search_index, database_version
+
+    database, index = await asyncio.to_thread(build_catalog, sources)
+
+    item_database, search_index = database, index
+    database_version += 1
+
+    item_names.seed(item.get('name', '') for item in database.values())
+    logging.info(f"Search index built: {index.describe()}.")
+    logging.info(f"TOTAL in database: {len(database)} unique items (version {database_version}).")
+
+
+async def refresh_item_data() -> bool:
+    """
+    Скачивает источники (условно, если есть снапшот), сохраняет новый снапшот
+    и подменяет базу. Возвращает True, если база обновилась.
+    """
+    global _snapshot
+
+    async with _refresh_lock:
+        snapshot = _snapshot
+        sources = {}
+        validators = {}
+        changed = False
+
+        for db in DATA_URLS:
+            name = db["name"]
+            previous = snapshot.meta["sources"].get(name) if snapshot else None
+            status, encoded, source_validators = await load_data_from_url(db["url"], name, previous)
+
+            if status == 200:
+                sources[name] = encoded
+                validators[name] = source_validators
+                changed = True
+            elif previous is not None and name in snapshot.sources:
+                # 304 или ошибка — остаёмся на данных из снапшота.
+                sources[name] = snapshot.encoded(name)
+                validators[name] = {k: previous.get(k) for k in ("etag", "last_modified")}
+            else:
+                sources[name] = item_snapshot.encode_items({})
+
+        if not changed:
+            return False
+
+        # Новая база живёт в снапшоте: холодные поля декодируются только по запросу.
+        _snapshot = await asyncio.to_thread(item_snapshot.save, sources, validators)
+        await install(_snapshot.sources)
+        return True
 
 
 async def load_all_item_data():
     """
     Вызывается один раз при старте бота.
-    Скачивает ВСЕ JSON и объединяет их в item_database.
+    Если есть снапшот на диске — поднимает базу из него за миллисекунды
+    и обновляет её в фоне; иначе скачивает ВСЕ JSON и объединяет их в item_database.
     """
+    global _snapshot, _revalidate_task
     logging.info("Starting full database load...")
-    global item_database
-    
-    item_database = {} 
 
-    async with aiohttp.ClientSession() as session:
-        for db in DATA_URLS:
-            data = await load_data_from_url(session, db["url"], db["name"])
-            
-            item_database.update(data)
-            
+    snapshot = await asyncio.to_thread(item_snapshot.load)
+    if snapshot is not None:
+        _snapshot = snapshot
+        await install(snapshot.sources)
+        logging.info(f"--- Loaded from snapshot {item_snapshot.snapshot_path()}, revalidating in background ---")
+        _revalidate_task = asyncio.create_task(refresh_item_data())
+        return
+
+    await refresh_item_data()
     logging.info("--- Load complete! ---")
-    logging.info(f"TOTAL in database: {len(item_database)} unique items.")
 
 
-def find_items_by_name(query: str):
+async def _refresh_loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if await refresh_item_data():
+                logging.info("Item database hot-reloaded.")
+        except Exception as e:
+            logging.error(f"Background item database refresh failed: {e}")
+
+
+def start_background_refresh(interval: float | None = None) -> None:
+    """
+    Периодически перечитывает базу, чтобы новые скины были доступны без рестарта.
+    """
+    global _refresh_task
+    if interval is None:
+        interval = float(os.getenv("ITEM_REFRESH_INTERVAL", REFRESH_INTERVAL))
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(_refresh_loop(interval))
+        logging.info(f"Item database refresh scheduled every {interval:.0f}s.")
+
+
+async def stop_background_refresh() -> None:
+    global _refresh_task, _revalidate_task
+    for task in (_refresh_task, _revalidate_task):
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    _refresh_task = _revalidate_task = None
+
+
+def find_items_by_name(query: str, limit: int = 15):
     """
     Ищет по загруженной базе предметы, имя которых содержит 'query'.
+    Использует заранее построенный search_index, результаты ранжированы.
     """
-    matches = []
-    if not item_database:
+    index = search_index
+    if not len(index):
         logging.warning("Attempting to search on an empty database.")
-        return matches
+        return []
 
-    query_lower = query.lower()
-    
-    for item_id, item_details in item_database.items():
-        if query_lower in item_details.get('name', '').lower():
-            matches.append(item_details)
-            if len(matches) >= 15:
-                break
-                
-    return matches
\ No newline at end of file
+    with metrics.search_seconds.time("search"):
+        return index.search(query, limit=limit)
+
+
+def search_items(query: str, offset: int = 0, limit: int = 10) -> tuple:
+    """
+    Поиск для клавиатуры результатов: фильтры по оружию, типу, редкости, износу,
+    StatTrak/Souvenir и коллекции прямо в запросе ("AK-47 Factory New covert")
+    и постраничная выдача. Возвращает (предметы страницы, есть ли следующая).
+    """
+    with metrics.search_seconds.time("faceted"):
+        return search_index.find(query, offset=offset, limit=limit)
+
+
+def complete_items(query: str, offset: int = 0, limit: int = 20) -> list:
+    """
+    Автодополнение для inline-режима (@bot AWP Asi...).
+    """
+    with metrics.search_seconds.time("complete"):
+        return search_index.complete(query, offset=offset, limit=limit)
@@ -1,8 +1,9 @@
 # app/handlers.py
+import html
 import logging
 from aiogram import Router, F
-from aiogram.filters import CommandStart, Command
-from aiogram.types import Message, CallbackQuery, InlineKeyboardButton
+from aiogram.filters import CommandStart, Command, CommandObject
+from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, InlineQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -12,14 +13,28 @@ from datetime import datetime
 # --- Наши импорты ---
 from . import keyboards as kb
 from . import data_manager as dm
-from . import steam_api               
+from . import price_cache
 from . import keyboard_builders       
-from . import valve_stats_api         
+from . import stats_poller
 from . import official_steam_api  
 from . import inventory_api       
+from .inventory_cache import inventory_cache
+from . import valuation
+from . import inline_results
+from . import observability
+from .prices import CURRENCIES, PriceQuote, find_currency, format_price, get_currency, parse_price
+from . import user_settings
+from .price_history import price_history
+from .price_watch import watch_scheduler, Watch, BELOW, ABOVE, MAX_WATCHES_PER_USER
 
 router = Router()
 
+INLINE_PAGE_SIZE = 20
+INLINE_CACHE_TIME = 300
+
+# user_id пользователей, у которых сейчас идёт оценка инвентаря.
+_valuations_running = set()
+
 class SkinSearch(StatesGroup):
     waiting_for_name = State() 
     showing_results = State() 
@@ -41,19 +56,32 @@ async def command_profile_steam_handler(message: Message) -> None:
 
 @router.message(F.text == "Server Stats")
 async def server_stats_handler(message: Message):
-    loading_msg = await message.answer("<i>Fetching server stats...</i>", parse_mode="HTML")
+    # Данные собирает stats_poller в фоне — здесь только чтение из памяти.
+    stats = stats_poller.summary()
     
-    stats = await valve_stats_api.get_online_stats()
-    
-    if stats:
-        text = (
-            "<b>Steam Server Stats</b>\n\n"
-            f"🟢 <b>Players Online:</b> {stats['online']}\n"
-            f"🎮 <b>Players In-Game:</b> {stats['in_game']}"
+    if not stats:
+        await message.answer("⚠️ Server stats are not available yet. Please try again in a minute.", parse_mode="HTML")
+        return
+
+    text = (
+        "<b>Steam Server Stats</b>\n\n"
+        f"🟢 <b>Players Online:</b> {stats['online']:,}{trend(stats['online_change'])}\n"
+        f"🎮 <b>Players In-Game:</b> {stats['in_game']:,}{trend(stats['in_game_change'])}\n"
+    )
+    if stats["samples"] > 1:
+        minutes = max(1, round(stats["window"] / 60))
+        text += (
+            f"\n📈 <b>Peak (last {minutes} min):</b> {stats['peak_online']:,} online, "
+            f"{stats['peak_in_game']:,} in-game\n"
         )
-        await loading_msg.edit_text(text, parse_mode="HTML")
-    else:
-        await loading_msg.edit_text("⚠️ Could not retrieve stats. The Valve stats page might be down or its layout changed.", parse_mode="HTML")
+    text += f"\n<i>Updated {datetime.fromtimestamp(stats['updated_at']).strftime('%H:%M:%S')}</i>"
+    await message.answer(text, parse_mode="HTML")
+
+
+def trend(change: int) -> str:
+    if not change:
+        return ""
+    return f" ({'▲' if change > 0 else '▼'} {abs(change):,})"
 
 
 @router.message(F.text == "Steam Profile Search")
@@ -162,30 +190,84 @@ async def process_inventory_search(message: Message, state: FSMContext):
         await message.answer("That doesn't look like a valid SteamID64. It must be 17 digits long.", reply_markup=kb.main)
         return
 
+    inventory = await inventory_cache.find_recent(steam_id)
+    if inventory is not None:
+        await show_inventory(message, state, inventory)
+        return
+
     loading_msg = await message.answer(f"<i>Fetching inventory for {steam_id}... (this may take a moment)</i>", parse_mode="HTML")
     
-    inventory_or_error = await inventory_api.get_user_inventory(steam_id)
-    
-    if isinstance(inventory_or_error, str):
+    inventory = inventory_cache.create(steam_id)
+    inventory_msg = None
+    pages = 0
+    error = None
+    try:
+        async for page, more in inventory_api.iter_inventory(steam_id):
+            pages += 1
+            inventory_cache.extend(inventory, page)
+            if not len(inventory):
+                continue
+
+            if inventory_msg is None:
+                # Первая страница пришла — показываем её, не дожидаясь остальных.
+                await loading_msg.delete()
+                inventory_msg = await show_inventory(message, state, inventory, loading=more)
+                if more:
+                    # handle уже в FSM — следующий клик может прийти на другой воркер.
+                    await inventory_cache.save(inventory)
+            elif await state.get_state() != InventorySearch.showing_inventory.state:
+                # Пользователь уже закрыл инвентарь — дальше не грузим.
+                inventory_cache.discard(inventory.handle)
+                return
+    except inventory_api.InventoryError as e:
+        error = str(e)
+    except Exception as e:
+        logging.error(f"Error while streaming inventory: {e}")
+        error = f"An unexpected error occurred: {e}"
+
+    if inventory_msg is None:
+        inventory_cache.discard(inventory.handle)
         await state.clear()
-        await loading_msg.edit_text(f"⚠️ {inventory_or_error}", reply_markup=None)
+        await loading_msg.edit_text(f"⚠️ {error or 'This inventory contains no marketable items.'}", reply_markup=None)
         await message.answer("Main Menu:", reply_markup=kb.main)
         return
 
-    await loading_msg.delete() 
-    
+    if error:
+        logging.warning(f"Inventory for {steam_id} loaded partially: {error}")
+    else:
+        inventory.complete = True
+    await inventory_cache.save(inventory)
+
+    data = await state.get_data()
+    if pages == 1 or data.get("inv") != inventory.handle or data.get("viewing_item"):
+        # Нечего обновлять, инвентарь закрыт или пользователь смотрит цену предмета:
+        # актуальный заголовок покажет back_to_inv.
+        return
+    keyboard = keyboard_builders.create_inventory_keyboard(inventory, page=data.get("page", 0))
+    try:
+        await inventory_msg.edit_text(inventory_title(inventory), reply_markup=keyboard)
+    except TelegramBadRequest:
+        pass
+
+
+async def show_inventory(message: Message, state: FSMContext, inventory, loading: bool = False) -> Message:
     await state.set_state(InventorySearch.showing_inventory)
-    await state.update_data(inventory=inventory_or_error, page=0, steam_id=steam_id)
+    await state.set_data({"inv": inventory.handle, "page": 0, "viewing_item": False})
+    keyboard = keyboard_builders.create_inventory_keyboard(inventory, page=0)
+    return await message.answer(inventory_title(inventory, loading=loading), reply_markup=keyboard)
+
 
-    keyboard = keyboard_builders.create_inventory_keyboard(inventory_or_error, page=0)
-    await message.answer(f"Inventory for {steam_id} ({len(inventory_or_error)} items):", reply_markup=keyboard)
+def inventory_title(inventory, loading: bool = False) -> str:
+    suffix = ", loading more..." if loading else ""
+    return (f"Inventory for {inventory.steam_id} "
+            f"({inventory.assets} items, {len(inventory)} unique{suffix}):")
 
 
 @router.callback_query(InventorySearch.showing_inventory, F.data.startswith("inv_page:"))
 async def inventory_page_handler(callback: CallbackQuery, state: FSMContext):
     new_page = int(callback.data.split(":")[1])
     data = await state.get_data()
-    inventory = data.get("inventory")
+    inventory = await inventory_cache.load(data.get("inv"))
     
     if not inventory:
         await callback.answer("Error: Inventory data lost. Please start over.", show_alert=True)
@@ -193,45 +275,41 @@ async def inventory_page_handler(callback: CallbackQuery, state: FSMContext):
 
     await state.update_data(page=new_page)
     keyboard = keyboard_builders.create_inventory_keyboard(inventory, page=new_page)
+    # Сначала снимаем "часики" с кнопки: правка может подождать в очереди
+    # telegram_outbox и схлопнуться с более свежей.
+    await callback.answer()
     
     try:
         await callback.message.edit_reply_markup(reply_markup=keyboard)
     except TelegramBadRequest:
         pass 
-    await callback.answer()
 
 @router.callback_query(InventorySearch.showing_inventory, F.data.startswith("inv_idx:"))
 async def inventory_item_price_handler(callback: CallbackQuery, state: FSMContext):
     item_index = int(callback.data.split(":")[1])
     data = await state.get_data()
-    inventory = data.get("inventory")
+    inventory = await inventory_cache.load(data.get("inv"))
     
     if not inventory or item_index >= len(inventory):
         await callback.answer("Error: Inventory data lost or item index out of bounds.", show_alert=True)
         return
 
-    market_hash_name = inventory[item_index]
+    market_hash_name = inventory.name(item_index)
     await callback.answer(f"Searching price for {market_hash_name}...")
+    await state.update_data(viewing_item=True)
     
-    price_data = await steam_api.get_item_price(market_hash_name)
+    currency = await user_settings.get_currency(callback.from_user.id)
+    quote = await price_cache.get_price(market_hash_name, currency)
     
     builder = InlineKeyboardBuilder()
     builder.add(InlineKeyboardButton(text="« Back to Inventory", callback_data="back_to_inv"))
     
     text_to_send = ""
-    if price_data:
-        lowest_price = price_data.get('lowest_price', 'N/A')
-        median_price = price_data.get('median_price', 'N/A')
-        volume = price_data.get('volume', 'N/A')
-        
-        text_to_send = (
-            f"<b>{market_hash_name}</b>\n\n"
-            f"📉 <b>Lowest Price:</b> {lowest_price}\n"
-            f"📊 <b>Median Price:</b> {median_price}\n"
-            f"📦 <b>Volume (24h):</b> {volume} sold"
-        )
+    if quote:
+        text_to_send = await price_text(market_hash_name, quote)
     else:
-        text_to_send = f"⚠️ Could not retrieve price for '{market_hash_name}'."
+        text_to_send = (f"⚠️ Could not retrieve price for '{html.escape(market_hash_name)}'. "
+                        f"Steam may be busy right now, please try again in a minute.")
 
     try:
         await callback.message.edit_text(
@@ -242,29 +320,104 @@ async def inventory_item_price_handler(callback: CallbackQuery, state: FSMContex
     except TelegramBadRequest:
         pass
 
+async def price_text(market_hash_name: str, quote: PriceQuote) -> str:
+    """
+    Карточка цены: lowest/median/объём в валюте котировки и изменение
+    за 24ч/7д по локальной истории (если она есть).
+    """
+    volume = f"{quote.volume:,}" if quote.volume is not None else "N/A"
+    text = (
+        f"<b>{html.escape(market_hash_name)}</b>\n\n"
+        f"📉 <b>Lowest Price:</b> {format_price(quote.lowest, quote.currency)}\n"
+        f"📊 <b>Median Price:</b> {format_price(quote.median, quote.currency)}\n"
+        f"📦 <b>Volume (24h):</b> {volume} sold"
+    )
+    changes = await price_history.changes(market_hash_name, quote.currency, quote.lowest)
+    parts = [f"<b>{label}:</b> {'▲' if change > 0 else '▼' if change < 0 else '='} {abs(change):.1%}"
+             for label, change in changes.items() if change is not None]
+    if parts:
+        text += "\n📅 " + "   ".join(parts)
+    return text
+
 @router.callback_query(InventorySearch.showing_inventory, F.data == "back_to_inv")
 async def back_to_inventory_handler(callback: CallbackQuery, state: FSMContext):
     data = await state.get_data()
-    inventory = data.get("inventory")
+    inventory = await inventory_cache.load(data.get("inv"))
     page = data.get("page", 0)
-    steam_id = data.get("steam_id", "Unknown")
     
     if not inventory:
         await callback.answer("Error: Inventory data lost.", show_alert=True)
         return
 
     await callback.answer("Loading inventory...")
+    await state.update_data(viewing_item=False)
     
     keyboard = keyboard_builders.create_inventory_keyboard(inventory, page=page)
     
     try:
         await callback.message.edit_text(
-            f"Inventory for {steam_id} ({len(inventory)} items):",
+            inventory_title(inventory),
             reply_markup=keyboard
         )
     except TelegramBadRequest:
         pass
 
+@router.callback_query(InventorySearch.showing_inventory, F.data == "inv_value")
+async def inventory_value_handler(callback: CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    inventory = await inventory_cache.load(data.get("inv"))
+    user_id = callback.from_user.id
+
+    if not inventory:
+        await callback.answer("Error: Inventory data lost. Please start over.", show_alert=True)
+        return
+    if user_id in _valuations_running:
+        await callback.answer("Valuation is already running, please wait.", show_alert=True)
+        return
+
+    counts = inventory.counts_by_name()
+    steam_id = inventory.steam_id
+    currency = await user_settings.get_currency(user_id)
+    await callback.answer("Valuing inventory...")
+    progress_msg = await callback.message.answer(
+        f"<i>Valuing {len(counts)} unique items from {steam_id}... 0/{len(counts)}</i>",
+        parse_mode="HTML"
+    )
+
+    async def on_progress(done: int, total: int):
+        try:
+            await progress_msg.edit_text(
+                f"<i>Valuing {total} unique items from {steam_id}... {done}/{total}</i>",
+                parse_mode="HTML"
+            )
+        except TelegramBadRequest:
+            pass
+
+    _valuations_running.add(user_id)
+    try:
+        report = await valuation.value_inventory(counts, on_progress=on_progress, currency=currency)
+    finally:
+        _valuations_running.discard(user_id)
+
+    top_lines = "\n".join(
+        f"{i}. {html.escape(name)} ×{quantity} — {format_price(subtotal, currency)}"
+        for i, (name, quantity, unit, subtotal) in enumerate(report["top"], start=1)
+    )
+    text = (
+        f"<b>Inventory value for {steam_id}</b>\n\n"
+        f"💰 <b>Total:</b> {format_price(report['total'], currency)}\n"
+        f"📦 <b>Items:</b> {report['assets']} ({report['unique']} unique, {report['priced']} priced)\n"
+    )
+    if report["unpriced"]:
+        text += f"⚠️ <b>No price:</b> {len(report['unpriced'])} items\n"
+    if top_lines:
+        text += f"\n<b>Top {len(report['top'])}:</b>\n{top_lines}"
+
+    try:
+        await progress_msg.edit_text(text, parse_mode="HTML")
+    except TelegramBadRequest:
+        pass
+
 @router.callback_query(InventorySearch.showing_inventory, F.data == "close_inv")
 async def inventory_close_handler(callback: CallbackQuery, state: FSMContext):
     await state.clear()
@@ -284,29 +437,46 @@ async def noop_handler(callback: CallbackQuery):
 @router.message(F.text == "Skin Price Search")
 async def gun(message: Message, state: FSMContext) -> None:
     await state.set_state(SkinSearch.waiting_for_name)
-    await message.answer("Please type a skin name to search (e.g., 'Redline' or 'AWP Asiimov'):",
+    await message.answer("Please type a skin name to search (e.g., 'Redline' or 'AWP Asiimov').\n"
+                         "You can filter by weapon, wear, rarity, type, StatTrak/Souvenir or collection: "
+                         "'AK-47 Factory New covert', 'StatTrak AWP FT'.",
                          reply_markup=None) 
 
 @router.message(SkinSearch.waiting_for_name)
 async def process_skin_search(message: Message, state: FSMContext):
     query = message.text
-    results = dm.find_items_by_name(query)
+    keyboard = keyboard_builders.get_search_keyboard(query)
     
-    if not results:
+    if keyboard is None:
         await state.clear() 
         await message.answer("⚠️ Nothing found. Please try again.", reply_markup=kb.main)
         return
 
     await state.set_state(SkinSearch.showing_results) 
-    await state.update_data(query=query) 
-    
-    keyboard = keyboard_builders.create_skin_search_keyboard(results)
+    await state.update_data(query=query, page=0) 
     
     await message.answer(
-        f"Here's what I found for '{query}' (up to 15 shown):",
+        f"Here's what I found for '{query}':",
         reply_markup=keyboard
     )
 
+
+@router.callback_query(SkinSearch.showing_results, F.data.startswith("search_page:"))
+async def search_page_handler(callback: CallbackQuery, state: FSMContext):
+    query = (await state.get_data()).get("query")
+    page = int(callback.data.split(":")[1])
+    keyboard = keyboard_builders.get_search_keyboard(query, page) if query else None
+    if keyboard is None:
+        await callback.answer("Error: Search results expired. Please search again.", show_alert=True)
+        return
+
+    await state.update_data(page=page)
+    await callback.answer()
+    try:
+        await callback.message.edit_reply_markup(reply_markup=keyboard)
+    except TelegramBadRequest:
+        pass
+
 @router.callback_query(F.data.startswith("priceid:"))
 async def send_skin_price(callback: CallbackQuery, state: FSMContext):
     
@@ -320,33 +490,38 @@ async def send_skin_price(callback: CallbackQuery, state: FSMContext):
     market_hash_name = item_details['name']
     await callback.answer(f"Searching price for {market_hash_name}...")
 
-    price_data = await steam_api.get_item_price(market_hash_name)
+    currency = await user_settings.get_currency(callback.from_user.id)
+    quote = await price_cache.get_price(market_hash_name, currency)
     
     builder = InlineKeyboardBuilder()
-    builder.add(InlineKeyboardButton(text="« Back to Results", callback_data="back_to_results"))
+    if callback.inline_message_id:
+        # Сообщение из inline-режима: результатов поиска за ним нет.
+        builder.add(InlineKeyboardButton(text="🔄 Refresh", callback_data=f"priceid:{item_id}"))
+    else:
+        builder.add(InlineKeyboardButton(text="« Back to Results", callback_data="back_to_results"))
     
     text_to_send = ""
-    if price_data:
-        lowest_price = price_data.get('lowest_price', 'N/A')
-        median_price = price_data.get('median_price', 'N/A')
-        volume = price_data.get('volume', 'N/A')
-        
-        text_to_send = (
-            f"<b>{market_hash_name}</b>\n\n"
-            f"📉 <b>Lowest Price:</b> {lowest_price}\n"
-            f"📊 <b>Median Price:</b> {median_price}\n"
-            f"📦 <b>Volume (24h):</b> {volume} sold"
-        )
+    if quote:
+        text_to_send = await price_text(market_hash_name, quote)
     else:
-        text_to_send = (f"⚠️ Could not retrieve price for '{market_hash_name}'. "
-                        f"It might not be marketable or the Steam API is down.")
+        text_to_send = (f"⚠️ Could not retrieve price for '{html.escape(market_hash_name)}'. "
+                        f"It might not be marketable, or Steam is busy right now: "
+                        f"please try again in a minute.")
 
     try:
-        await callback.message.edit_text(
-            text_to_send,
-            parse_mode="HTML",
-            reply_markup=builder.as_markup()
-        )
+        if callback.inline_message_id:
+            await callback.bot.edit_message_text(
+                text_to_send,
+                inline_message_id=callback.inline_message_id,
+                parse_mode="HTML",
+                reply_markup=builder.as_markup()
+            )
+        else:
+            await callback.message.edit_text(
+                text_to_send,
+                parse_mode="HTML",
+                reply_markup=builder.as_markup()
+            )
     except TelegramBadRequest:
         pass 
 
@@ -366,18 +541,153 @@ async def back_to_results_handler(callback: CallbackQuery, state: FSMContext):
     
     await callback.answer(f"Loading results for '{query}'...")
     
-    results = dm.find_items_by_name(query)
-    keyboard = keyboard_builders.create_skin_search_keyboard(results)
+    keyboard = keyboard_builders.get_search_keyboard(query, state_data.get("page", 0))
     
     try:
         await callback.message.edit_text(
-            f"Here's what I found for '{query}' (up to 15 shown):",
+            f"Here's what I found for '{query}':",
             reply_markup=keyboard
         )
     except TelegramBadRequest:
         pass 
 
 
+# --- Inline-режим: @bot AWP Asi... ---
+
+@router.inline_query()
+async def inline_item_search(inline_query: InlineQuery):
+    try:
+        offset = int(inline_query.offset or 0)
+    except ValueError:
+        offset = 0
+
+    # На одну позицию больше страницы — чтобы понять, есть ли следующая.
+    items = dm.complete_items(inline_query.query, offset=offset, limit=INLINE_PAGE_SIZE + 1)
+    results = [inline_results.get_article(item) for item in items[:INLINE_PAGE_SIZE]]
+    next_offset = str(offset + INLINE_PAGE_SIZE) if len(items) > INLINE_PAGE_SIZE else ""
+
+    await inline_query.answer(
+        results,
+        cache_time=INLINE_CACHE_TIME,
+        is_personal=False,
+        next_offset=next_offset
+    )
+
+
 @router.message(F.text == "CS Price")
 async def cs_price(message: Message) -> None:
-    await message.answer("Counter-Strike 2 prices are fetched via the Steam Market using an unofficial API.", reply_markup=kb.main)
\ No newline at end of file
+    await message.answer("Counter-Strike 2 prices are fetched via the Steam Market using an unofficial API.", reply_markup=kb.main)
+
+
+# --- Ценовые алерты: /watch <item> <price> ---
+
+WATCH_USAGE = ("Usage: <code>/watch &lt;item name&gt; &lt;price&gt;</code>\n"
+               "e.g. <code>/watch AWP | Asiimov (Field-Tested) 95</code>\n"
+               "Prefix the price with &lt; or &gt; to choose the direction explicitly.")
+
+
+@router.message(Command('watch'))
+async def watch_command(message: Message, command: CommandObject) -> None:
+    query, _, target_text = (command.args or "").strip().rpartition(" ")
+    direction = None
+    if target_text[:1] in "<>" and target_text:
+        direction = BELOW if target_text[0] == "<" else ABOVE
+        target_text = target_text[1:]
+    target = parse_price(target_text)
+    if not query or target is None:
+        await message.answer(WATCH_USAGE, parse_mode="HTML")
+        return
+
+    user_watches = await watch_scheduler.user_watches(message.from_user.id)
+    if len(user_watches) >= MAX_WATCHES_PER_USER:
+        await message.answer(f"⚠️ You already have {MAX_WATCHES_PER_USER} alerts. Remove one with /unwatch.")
+        return
+
+    results = dm.find_items_by_name(query, limit=1)
+    if not results:
+        await message.answer(f"⚠️ No item matches '{query}'.")
+        return
+    market_hash_name = results[0]['name']
+
+    currency = await user_settings.get_currency(message.from_user.id)
+    quote = await price_cache.get_price(market_hash_name, currency)
+    current = quote.lowest if quote else None
+    if direction is None:
+        # Цель ниже текущей цены — ждём падения, выше — роста.
+        direction = ABOVE if current is not None and target > current else BELOW
+
+    watch = Watch(message.from_user.id, market_hash_name, currency, target, direction)
+    await watch_scheduler.add(watch)
+    now_text = f" (now {format_price(current, currency)})" if current is not None else ""
+    await message.answer(f"🔔 Alert set: <b>{watch.describe()}</b>{now_text}.\n"
+                         f"See your alerts with /watches.", parse_mode="HTML")
+
+
+@router.message(Command('watches'))
+async def watches_command(message: Message) -> None:
+    user_watches = await watch_scheduler.user_watches(message.from_user.id)
+    if not user_watches:
+        await message.answer("You have no price alerts. " + WATCH_USAGE, parse_mode="HTML")
+        return
+    lines = "\n".join(f"{i}. {watch.describe()}" for i, watch in enumerate(user_watches, start=1))
+    await message.answer(f"<b>Your price alerts:</b>\n{lines}\n\nRemove one with /unwatch &lt;number&gt; "
+                         f"or all with /unwatch all.", parse_mode="HTML")
+
+
+@router.message(Command('unwatch'))
+async def unwatch_command(message: Message, command: CommandObject) -> None:
+    user_watches = await watch_scheduler.user_watches(message.from_user.id)
+    arg = (command.args or "").strip().lower()
+    if arg == "all":
+        removed = user_watches
+    elif arg.isdigit() and 1 <= int(arg) <= len(user_watches):
+        removed = [user_watches[int(arg) - 1]]
+    else:
+        await message.answer("Usage: /unwatch &lt;number from /watches&gt; or /unwatch all", parse_mode="HTML")
+        return
+    for watch in removed:
+        await watch_scheduler.remove(watch)
+    await message.answer(f"Removed {len(removed)} alert(s).")
+
+
+# --- Валюта пользователя ---
+
+@router.message(Command('currency'))
+async def currency_command(message: Message, command: CommandObject) -> None:
+    if command.args:
+        currency = find_currency(command.args)
+        if currency is None:
+            codes = ", ".join(currency.code for currency in CURRENCIES.values())
+            await message.answer(f"⚠️ Unknown currency. Available: {codes}")
+            return
+        await user_settings.set_currency(message.from_user.id, currency.id)
+        await message.answer(f"💱 Prices will be shown in {currency.code}.")
+        return
+
+    current = get_currency(await user_settings.get_currency(message.from_user.id))
+    await message.answer(f"💱 Your currency: <b>{current.code}</b>. Choose another one:",
+                         parse_mode="HTML", reply_markup=kb.currencies)
+
+
+@router.callback_query(F.data.startswith("currency:"))
+async def currency_selected(callback: CallbackQuery) -> None:
+    currency = CURRENCIES.get(int(callback.data.split(":")[1]))
+    if currency is None:
+        await callback.answer("Unknown currency.", show_alert=True)
+        return
+    await user_settings.set_currency(callback.from_user.id, currency.id)
+    await callback.answer(f"Prices will be shown in {currency.code}.")
+    try:
+        await callback.message.edit_text(f"💱 Your currency: <b>{currency.code}</b>.", parse_mode="HTML")
+    except TelegramBadRequest:
+        pass
+
+
+# --- Служебное ---
+
+@router.message(Command('stats'))
+async def stats_command(message: Message) -> None:
+    # Для остальных команда не существует: не отвечаем вовсе.
+    if message.from_user.id not in observability.admin_ids():
+        return
+    await message.answer(observability.summary_text(), parse_mode="HTML")
@@ -0,0 +1,57 @@
+import aiohttp
+import logging
+
+
+# Один пул соединений на весь бот: keep-alive до Steam/Valve переживает клики
+# пользователей, DNS кешируется, а на один хост не открывается больше
+# LIMIT_PER_HOST соединений.
+TOTAL_LIMIT = 100
+LIMIT_PER_HOST = 10
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10)
+
+_session: aiohttp.ClientSession | None = None
+
+
+def create_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=TOTAL_LIMIT,
+        limit_per_host=LIMIT_PER_HOST,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=REQUEST_TIMEOUT)
+
+
+async def init_session() -> aiohttp.ClientSession:
+    """
+    Вызывается при старте бота (server.main).
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = create_session()
+        logging.info("Shared HTTP session created.")
+    return _session
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Общая сессия для всех API-клиентов.
+    Если бот не вызвал init_session (скрипты, бенчмарки) — создаётся лениво.
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = create_session()
+    return _session
+
+
+async def close_session() -> None:
+    """
+    Вызывается при остановке бота.
+    """
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logging.info("Shared HTTP session closed.")
+    _session = None
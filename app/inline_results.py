@@ -0,0 +1,35 @@
+import html
+
+from aiogram.types import (InlineKeyboardButton, InlineKeyboardMarkup,
+                           InlineQueryResultArticle, InputTextMessageContent)
+
+from . import data_manager as dm
+
+
+# Готовые InlineQueryResultArticle по id предмета. Объекты не меняются,
+# поэтому один и тот же результат переиспользуется во всех ответах,
+# пока не сменится версия базы.
+_articles = {}
+_articles_version = None
+
+
+def get_article(item) -> InlineQueryResultArticle:
+    global _articles_version
+    if _articles_version != dm.database_version:
+        _articles.clear()
+        _articles_version = dm.database_version
+
+    article = _articles.get(item['id'])
+    if article is None:
+        article = _articles[item['id']] = InlineQueryResultArticle(
+            id=item['id'][:64],
+            title=item['name'],
+            description="Tap to share, then check the price",
+            input_message_content=InputTextMessageContent(
+                message_text=f"<b>{html.escape(item['name'])}</b>", parse_mode="HTML"
+            ),
+            reply_markup=InlineKeyboardMarkup(inline_keyboard=[[
+                InlineKeyboardButton(text="📈 Check Price", callback_data=f"priceid:{item['id']}")
+            ]]),
+        )
+    return article
@@ -1,53 +1,87 @@
 
-import aiohttp
 import logging
 import json
 
-async def get_user_inventory(steam_id: str) -> list | str:
+from . import request_scheduler
+
+INVENTORY_URL = "https://steamcommunity.com/inventory/{steam_id}/730/2"
+PAGE_SIZE = 2000
+MAX_PAGES = 50
+
+
+class InventoryError(Exception):
     """
-    Загружает инвентарь CS2 (appid 730) пользователя.
-    Возвращает список 'market_hash_name' или строку с ошибкой.
+    Ошибка загрузки инвентаря; текст исключения можно показать пользователю.
+    """
+
+
+def reduce_inventory_page(data) -> dict:
     """
-    url = f"https://steamcommunity.com/inventory/{steam_id}/730/2"
-    params = {"l": "english", "count": 2000} 
-
-    logging.info(f"Fetching inventory for {steam_id}...")
-    
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json(content_type=None)
-                    if not data or not data.get('assets'):
-                        return "This inventory is empty." 
-
-                   
-                    descriptions = {
-                        item['classid']: item['market_hash_name']
-                        for item in data.get('descriptions', [])
-                        if item.get('marketable', 0) == 1 
-                    }
-                    
-                    inventory_items = []
-                    for asset in data.get('assets', []):
-                        classid = asset.get('classid')
-                        if classid in descriptions:
-                            inventory_items.append(descriptions[classid])
-                    
-                    if not inventory_items:
-                        return "This inventory contains no marketable items."
-
-                    return inventory_items 
-                
-                elif response.status == 403 or response.status == 429:
-                    logging.warning(f"Inventory access forbidden for {steam_id}")
-                    return "This profile is private or Steam is busy. Try again later."
-                else:
-                    return f"Unknown error. Status: {response.status}"
-
-    except json.JSONDecodeError:
-        logging.warning(f"Failed to decode JSON for {steam_id} (likely private).")
-        return "This inventory is private or does not exist."
-    except Exception as e:
-        logging.error(f"Error in get_user_inventory: {e}")
-        return f"An unexpected error occurred: {e}"
\ No newline at end of file
+    reducer для json_decoder: сводит страницу инвентаря Steam к парам
+    (market_hash_name, количество) и курсору следующей страницы.
+    """
+    if not data or not data.get('assets'):
+        return {"empty": True, "items": [], "more": False, "last_assetid": None}
+
+    descriptions = {
+        (item.get('classid'), item.get('instanceid')): item['market_hash_name']
+        for item in data.get('descriptions', [])
+        if item.get('marketable', 0) == 1
+    }
+
+    page_counts = {}
+    for asset in data['assets']:
+        name = descriptions.get((asset.get('classid'), asset.get('instanceid')))
+        if name is not None:
+            page_counts[name] = page_counts.get(name, 0) + int(asset.get('amount', 1))
+
+    return {
+        "empty": False,
+        "items": list(page_counts.items()),
+        "more": bool(data.get('more_items') and data.get('last_assetid')),
+        "last_assetid": data.get('last_assetid'),
+    }
+
+
+async def iter_inventory(steam_id: str):
+    """
+    Асинхронный генератор по инвентарю CS2 (appid 730) пользователя.
+
+    Идёт по курсору Steam (more_items / last_assetid) и после каждой страницы
+    отдаёт (page, more): список пар (market_hash_name, количество) только для
+    этой страницы и флаг, будут ли ещё страницы. Первую страницу можно
+    показать до загрузки всего инвентаря.
+    Бросает InventoryError, если страницу загрузить не удалось.
+    """
+    url = INVENTORY_URL.format(steam_id=steam_id)
+    params = {"l": "english", "count": PAGE_SIZE}
+
+    for page_number in range(MAX_PAGES):
+        logging.info(f"Fetching inventory for {steam_id} (page {page_number + 1})...")
+        try:
+            status, page = await request_scheduler.fetch_json(url, params=params, reducer=reduce_inventory_page)
+        except json.JSONDecodeError:
+            logging.warning(f"Failed to decode JSON for {steam_id} (likely private).")
+            raise InventoryError("This inventory is private or does not exist.")
+
+        if status == 403:
+            logging.warning(f"Inventory access forbidden for {steam_id}")
+            raise InventoryError("This profile is private. Try again later.")
+        elif status == 429:
+            logging.warning(f"Inventory rate limited for {steam_id} (retries exhausted)")
+            raise InventoryError("Steam is busy right now. Try again later.")
+        elif status != 200:
+            raise InventoryError(f"Unknown error. Status: {status}")
+
+        if page["empty"]:
+            if page_number == 0:
+                raise InventoryError("This inventory is empty.")
+            return
+
+        yield page["items"], page["more"]
+
+        if not page["more"]:
+            return
+        params = {**params, "start_assetid": page["last_assetid"]}
+
+    logging.warning(f"Inventory for {steam_id} exceeds {MAX_PAGES} pages, truncated.")
@@ -0,0 +1,222 @@
+import logging
+import secrets
+import time
+from array import array
+from collections import OrderedDict
+
+from . import storage
+
+
+INVENTORY_TTL = 1800      # сек: сколько держим инвентарь без обращений
+REUSE_TTL = 300           # сек: повторный запрос того же steam_id отдаётся из кеша
+MAX_INVENTORIES = 1000
+
+
+class NameTable:
+    """
+    Интернирование market_hash_name в целые ID.
+    Заполняется именами из item_database при загрузке базы, незнакомые имена
+    из инвентарей дописываются в конец. Только добавление: выданный ID не меняется.
+    """
+
+    def __init__(self):
+        self._names = []
+        self._ids = {}
+
+    def __len__(self):
+        return len(self._names)
+
+    def intern(self, name: str) -> int:
+        name_id = self._ids.get(name)
+        if name_id is None:
+            name_id = self._ids[name] = len(self._names)
+            self._names.append(name)
+        return name_id
+
+    def seed(self, names) -> None:
+        for name in names:
+            self.intern(name)
+
+    def name(self, name_id: int) -> str:
+        return self._names[name_id]
+
+
+names = NameTable()
+
+
+class Inventory:
+    """
+    Компактный инвентарь: два массива — ID имён и количества.
+    version растёт при каждом изменении содержимого (догрузка страниц),
+    по (handle, version) кешируются готовые клавиатуры.
+    """
+    __slots__ = ("handle", "steam_id", "ids", "counts", "complete", "touched_at", "version")
+
+    def __init__(self, handle: str, steam_id: str):
+        self.handle = handle
+        self.steam_id = steam_id
+        self.ids = array('I')
+        self.counts = array('I')
+        self.complete = False
+        self.touched_at = time.monotonic()
+        self.version = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def assets(self) -> int:
+        return sum(self.counts)
+
+    def name(self, index: int) -> str:
+        return names.name(self.ids[index])
+
+    def slice(self, start: int, end: int) -> list:
+        """
+        Пары (market_hash_name, количество) для отрезка [start, end).
+        """
+        return [(names.name(name_id), amount)
+                for name_id, amount in zip(self.ids[start:end], self.counts[start:end])]
+
+    def counts_by_name(self) -> dict:
+        return {names.name(name_id): amount for name_id, amount in zip(self.ids, self.counts)}
+
+
+class InventoryCache:
+    """
+    Общий для всех пользователей кеш инвентарей с LRU и TTL.
+    В FSM хранится только handle ("<steam_id>:<случайный токен>"), а не сам список предметов.
+
+    Первый уровень — объекты Inventory в памяти процесса. save() кладёт инвентарь
+    в общий storage, чтобы клик, пришедший на другой воркер (или после перезапуска),
+    нашёл его через load()/find_recent().
+    """
+
+    def __init__(self, max_entries: int = MAX_INVENTORIES, ttl: float = INVENTORY_TTL,
+                 reuse_ttl: float = REUSE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.reuse_ttl = reuse_ttl
+        self._entries = OrderedDict()     # handle -> Inventory
+        self._latest = {}                 # steam_id -> (handle, loaded_at)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def create(self, steam_id: str) -> Inventory:
+        # Токен, а не счётчик: handle должен быть уникален между воркерами.
+        handle = f"{steam_id}:{secrets.token_hex(4)}"
+        inventory = Inventory(handle, steam_id)
+        self._entries[handle] = inventory
+        self._latest[steam_id] = (handle, time.monotonic())
+        self._evict()
+        return inventory
+
+    def extend(self, inventory: Inventory, page: list) -> None:
+        """
+        Добавляет страницу пар (market_hash_name, количество), суммируя повторы.
+        """
+        positions = {name_id: i for i, name_id in enumerate(inventory.ids)}
+        for name, amount in page:
+            name_id = names.intern(name)
+            i = positions.get(name_id)
+            if i is None:
+                positions[name_id] = len(inventory.ids)
+                inventory.ids.append(name_id)
+                inventory.counts.append(amount)
+            else:
+                inventory.counts[i] += amount
+        inventory.version += 1
+
+    def get(self, handle: str | None) -> Inventory | None:
+        if handle is None:
+            return None
+        inventory = self._entries.get(handle)
+        if inventory is None:
+            return None
+        now = time.monotonic()
+        if now - inventory.touched_at > self.ttl:
+            self.discard(handle)
+            return None
+        inventory.touched_at = now
+        self._entries.move_to_end(handle)
+        return inventory
+
+    def recent(self, steam_id: str) -> Inventory | None:
+        """
+        Недавно и полностью загруженный инвентарь этого steam_id, если он ещё свежий.
+        """
+        latest = self._latest.get(steam_id)
+        if latest is None or time.monotonic() - latest[1] > self.reuse_ttl:
+            return None
+        inventory = self.get(latest[0])
+        return inventory if inventory is not None and inventory.complete else None
+
+    async def save(self, inventory: Inventory) -> None:
+        """
+        Кладёт инвентарь в общий storage: [steam_id, complete, имена, количества].
+        Имена, а не ID: таблица имён у каждого воркера своя.
+        """
+        store = storage.get_store()
+        names_list = [names.name(name_id) for name_id in inventory.ids]
+        value = storage.pack([inventory.steam_id, inventory.complete, names_list, inventory.counts.tolist()])
+        try:
+            await store.set(f"inv:{inventory.handle}", value, self.ttl)
+            if inventory.complete:
+                await store.set(f"inv_latest:{inventory.steam_id}", inventory.handle.encode(), self.reuse_ttl)
+        except Exception as e:
+            logging.error(f"Failed to save inventory {inventory.handle} to shared storage: {e}")
+
+    async def load(self, handle: str | None) -> Inventory | None:
+        """
+        get() с подгрузкой из общего storage, если в памяти этого воркера инвентаря нет.
+        """
+        inventory = self.get(handle)
+        if inventory is not None or handle is None:
+            return inventory
+        try:
+            entry = storage.unpack(await storage.get_store().get(f"inv:{handle}"))
+        except Exception as e:
+            logging.error(f"Failed to load inventory {handle} from shared storage: {e}")
+            return None
+        if entry is None:
+            return None
+
+        steam_id, complete, names_list, counts = entry
+        inventory = Inventory(handle, steam_id)
+        inventory.ids = array('I', (names.intern(name) for name in names_list))
+        inventory.counts = array('I', counts)
+        inventory.complete = complete
+        self._entries[handle] = inventory
+        self._evict()
+        return inventory
+
+    async def find_recent(self, steam_id: str) -> Inventory | None:
+        """
+        recent() с учётом инвентарей, загруженных другими воркерами.
+        """
+        inventory = self.recent(steam_id)
+        if inventory is not None:
+            return inventory
+        try:
+            handle = await storage.get_store().get(f"inv_latest:{steam_id}")
+        except Exception as e:
+            logging.error(f"Failed to look up recent inventory for {steam_id}: {e}")
+            return None
+        if handle is None:
+            return None
+        inventory = await self.load(handle.decode())
+        return inventory if inventory is not None and inventory.complete else None
+
+    def discard(self, handle: str) -> None:
+        inventory = self._entries.pop(handle, None)
+        if inventory is not None and self._latest.get(inventory.steam_id, (None,))[0] == handle:
+            del self._latest[inventory.steam_id]
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            handle = next(iter(self._entries))
+            self.discard(handle)
+
+
+inventory_cache = InventoryCache()
@@ -0,0 +1,325 @@
+import json
+import logging
+import marshal
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from collections.abc import Mapping
+
+
+# Формат файла:
+#   MAGIC | version:u32 | header_len:u32 | header (JSON) | hot (marshal) | cold
+# hot  — колонки горячих полей (id, name), фасеты и смещения записей в cold;
+# cold — JSON каждого предмета подряд, декодируется только при обращении.
+MAGIC = b"CS2ITEMS"
+FORMAT_VERSION = 2
+PREFIX = struct.Struct("<8sII")
+HOT_FIELDS = ("id", "name")
+
+# Фасеты — короткие повторяющиеся значения (редкость, оружие...). Каждое
+# значение хранится один раз в таблице, у предмета — только его номер в array('H').
+# Номер 0 — значения нет.
+FACETS = ("type", "weapon", "category", "rarity", "wear", "collection")
+STATTRAK = 1
+SOUVENIR = 2
+WEARS = ("Factory New", "Minimal Wear", "Field-Tested", "Well-Worn", "Battle-Scarred")
+
+DEFAULT_PATH = os.path.join(".cache", "items.snapshot")
+
+
+def snapshot_path() -> str:
+    return os.getenv("ITEM_SNAPSHOT_PATH", DEFAULT_PATH)
+
+
+class SnapshotItem(Mapping):
+    """
+    Предмет из снапшота: id и name доступны сразу, остальные поля
+    декодируются из cold-блока при первом обращении.
+    """
+    __slots__ = ("id", "name", "_snapshot", "_pos", "_full")
+
+    def __init__(self, item_id: str, name: str, snapshot: "Snapshot", pos: int):
+        self.id = item_id
+        self.name = name
+        self._snapshot = snapshot
+        self._pos = pos
+        self._full = None
+
+    def __getitem__(self, key):
+        if key == "id":
+            return self.id
+        if key == "name":
+            return self.name
+        return self._decoded()[key]
+
+    def __iter__(self):
+        return iter(self._decoded())
+
+    def __len__(self):
+        return len(self._decoded())
+
+    def __repr__(self):
+        return f"SnapshotItem({self.id!r}, {self.name!r})"
+
+    def _decoded(self) -> dict:
+        if self._full is None:
+            self._full = self._snapshot.decode(self._pos)
+        return self._full
+
+
+class Snapshot:
+    """
+    Загруженный снапшот базы предметов.
+    sources — {имя источника: {id: SnapshotItem}}, meta — валидаторы (ETag/Last-Modified).
+    """
+
+    def __init__(self, meta: dict, columns: dict, facets: dict, flags: array, cold, offsets: array):
+        self.meta = meta
+        self.sources = {}
+        self.flags = flags
+        self._columns = columns
+        self._cold = cold
+        self._offsets = offsets
+        # field -> (таблица значений, номера по позициям); строки таблиц интернированы,
+        # так что "AK-47" одна на весь процесс, а не на каждый предмет.
+        self._facets = {}
+        for field, (table, codes) in facets.items():
+            values = array('H')
+            values.frombytes(codes)
+            self._facets[field] = ([None] + [sys.intern(value) for value in table[1:]], values)
+
+        ids, names = columns["id"], columns["name"]
+        for source_name, info in meta["sources"].items():
+            start, end = info["range"]
+            self.sources[source_name] = {
+                ids[pos]: SnapshotItem(ids[pos], names[pos], self, pos)
+                for pos in range(start, end)
+            }
+
+    def facet(self, field: str, pos: int) -> str | None:
+        table, codes = self._facets[field]
+        return table[codes[pos]]
+
+    def decode(self, pos: int) -> dict:
+        start, end = self._offsets[pos], self._offsets[pos + 1]
+        return json.loads(bytes(self._cold[start:end]))
+
+    def encoded(self, source_name: str) -> tuple:
+        """
+        Источник в виде encode_items(), чтобы пересохранить его без разбора.
+        """
+        start, end = self.meta["sources"][source_name]["range"]
+        base = self._offsets[start]
+        offsets = array('Q', (offset - base for offset in self._offsets[start:end + 1]))
+        columns = {field: values[start:end] for field, values in self._columns.items()}
+        for field, (table, codes) in self._facets.items():
+            columns[field] = [table[code] or "" for code in codes[start:end]]
+        columns["flags"] = list(self.flags[start:end])
+        return columns, bytes(self._cold[base:self._offsets[end]]), offsets.tobytes()
+
+
+def _label(value) -> str:
+    """
+    Вложенные объекты ByMykel ({"id": ..., "name": "AK-47"}) -> "AK-47".
+    """
+    if isinstance(value, dict):
+        value = value.get('name')
+    return value if isinstance(value, str) else ""
+
+
+def item_facets(item_id: str, item: dict) -> dict:
+    name = item.get('name', '')
+    wear = _label(item.get('wear'))
+    if not wear and name.endswith(")"):
+        wear = next((w for w in WEARS if name.endswith(f"({w})")), "")
+    collections = item.get('collections') or ()
+    item_type = item_id.split("-", 1)[0] if "-" in item_id else _label(item.get('type'))
+    weapon = _label(item.get('weapon'))
+    if not weapon and item_type == "skin" and " | " in name:
+        # "StatTrak™ ★ Karambit | Fade (Factory New)" -> "Karambit"
+        weapon = name.split(" | ", 1)[0].replace("StatTrak™", "").replace("Souvenir", "").replace("★", "").strip()
+    return {
+        "type": item_type,
+        "weapon": weapon,
+        "category": _label(item.get('category')),
+        "rarity": _label(item.get('rarity')),
+        "wear": wear,
+        "collection": _label(collections[0]) if isinstance(collections, list) and collections else "",
+    }
+
+
+def item_flags(item: dict) -> int:
+    name = item.get('name', '')
+    flags = 0
+    if item.get('stattrak') or name.startswith("StatTrak™"):
+        flags |= STATTRAK
+    if item.get('souvenir') or name.startswith("Souvenir "):
+        flags |= SOUVENIR
+    return flags
+
+
+def facets_of(item) -> tuple:
+    """
+    (фасеты, флаги) предмета: у SnapshotItem — из колонок, у обычного словаря — вычисляются.
+    """
+    if isinstance(item, SnapshotItem):
+        snapshot, pos = item._snapshot, item._pos
+        return {field: snapshot.facet(field, pos) for field in FACETS}, snapshot.flags[pos]
+    return item_facets(item.get('id', ''), item), item_flags(item)
+
+
+def encode_items(items: dict) -> tuple:
+    """
+    Кодирует {id: item} в (горячие колонки, cold-байты, смещения).
+    Чистая функция: выполняется в воркере json_decoder, в главный процесс
+    приходят компактные байты, а не десятки тысяч словарей.
+    """
+    columns = {field: [] for field in (*HOT_FIELDS, *FACETS, "flags")}
+    offsets = array('Q', [0])
+    cold = bytearray()
+    for item_id, item in items.items():
+        columns["id"].append(item_id)
+        columns["name"].append(item.get('name', ''))
+        for field, value in item_facets(item_id, item).items():
+            columns[field].append(value)
+        columns["flags"].append(item_flags(item))
+        cold += json.dumps(dict(item), ensure_ascii=False, separators=(",", ":")).encode()
+        offsets.append(len(cold))
+    return columns, bytes(cold), offsets.tobytes()
+
+
+def build(encoded_sources: dict, validators: dict) -> tuple:
+    """
+    Склеивает закодированные источники в (header, hot, cold) одного снапшота.
+    """
+    columns = {field: [] for field in HOT_FIELDS}
+    tables = {field: {"": 0} for field in FACETS}
+    codes = {field: array('H') for field in FACETS}
+    flags = array('B')
+    offsets = array('Q', [0])
+    cold = bytearray()
+    source_ranges = {}
+
+    for source_name, (source_columns, source_cold, source_offsets) in encoded_sources.items():
+        start = len(offsets) - 1
+        for field in HOT_FIELDS:
+            columns[field].extend(source_columns[field])
+        for field in FACETS:
+            table = tables[field]
+            codes[field].extend(table.setdefault(value, len(table)) for value in source_columns[field])
+        flags.extend(source_columns["flags"])
+        relative = array('Q')
+        relative.frombytes(source_offsets)
+        base = len(cold)
+        offsets.extend(base + offset for offset in relative[1:])
+        cold += source_cold
+        source_ranges[source_name] = [start, len(offsets) - 1]
+
+    facets = {field: (list(tables[field]), codes[field].tobytes()) for field in FACETS}
+    hot = marshal.dumps({"columns": columns, "facets": facets, "flags": flags.tobytes(),
+                         "offsets": offsets.tobytes()})
+    header = {
+        "python": list(sys.version_info[:2]),
+        "saved_at": time.time(),
+        "hot_length": len(hot),
+        "sources": {
+            name: {**validators.get(name, {}), "range": source_ranges[name]}
+            for name in encoded_sources
+        },
+    }
+    return header, hot, bytes(cold)
+
+
+def save(encoded_sources: dict, validators: dict, path: str | None = None) -> Snapshot:
+    """
+    Сохраняет закодированные источники и их валидаторы. Запись атомарная.
+    Возвращает готовый Snapshot (отображённый с диска, а если записать файл
+    не удалось — в памяти).
+    """
+    path = path or snapshot_path()
+    header, hot, cold = build(encoded_sources, validators)
+
+    tmp_path = None
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        header_bytes = json.dumps(header).encode()
+        # Свой временный файл у каждого писателя: воркеры на одной машине
+        # обновляют базу одновременно и не должны писать в чужой файл.
+        fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            f.write(hot)
+            f.write(cold)
+        os.replace(tmp_path, path)
+        logging.info(f"Item snapshot saved to {path} ({(len(header_bytes) + len(hot) + len(cold)) / 1e6:.1f} MB).")
+    except OSError as e:
+        logging.error(f"Failed to write item snapshot {path}: {e}")
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    else:
+        snapshot = load(path)
+        if snapshot is not None:
+            return snapshot
+    return _open(header, marshal.loads(hot), memoryview(cold))
+
+
+def load(path: str | None = None) -> Snapshot | None:
+    """
+    Читает снапшот. Возвращает None, если файла нет или он несовместим.
+    """
+    path = path or snapshot_path()
+    try:
+        with open(path, "rb") as f:
+            # cold-блок не читается целиком: страницы подтягиваются ОС при обращении к предмету.
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.warning(f"Item snapshot {path} can't be mapped, ignoring: {e}")
+        return None
+
+    parsed = _parse(path, data)
+    if parsed is None:
+        data.close()
+        return None
+    header, hot, hot_end = parsed
+    return _open(header, hot, memoryview(data)[hot_end:])
+
+
+def _parse(path: str, data) -> tuple | None:
+    """
+    (заголовок, горячие колонки, конец горячего блока) или None, если снапшот не подходит.
+    """
+    try:
+        magic, version, header_length = PREFIX.unpack_from(data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            logging.warning(f"Item snapshot {path} has an unknown format, ignoring.")
+            return None
+
+        header_end = PREFIX.size + header_length
+        header = json.loads(data[PREFIX.size:header_end])
+        if tuple(header["python"]) != sys.version_info[:2]:
+            # marshal совместим только в пределах одной версии Python.
+            logging.warning(f"Item snapshot {path} was written by another Python version, ignoring.")
+            return None
+
+        hot_end = header_end + header["hot_length"]
+        return header, marshal.loads(data[header_end:hot_end]), hot_end
+    except Exception as e:
+        logging.warning(f"Item snapshot {path} is corrupted, ignoring: {e}")
+        return None
+
+
+def _open(header: dict, hot: dict, cold) -> Snapshot:
+    offsets = array('Q')
+    offsets.frombytes(hot["offsets"])
+    flags = array('B')
+    flags.frombytes(hot["flags"])
+    return Snapshot(header, hot["columns"], hot["facets"], flags, cold, offsets)
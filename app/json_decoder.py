@@ -0,0 +1,85 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Тела меньше этого порога разбираются прямо в event loop: пересылка
+# в другой процесс стоит дороже самого разбора.
+INLINE_LIMIT = 512 * 1024
+DECODE_WORKERS = 2
+
+_executor = None
+
+
+def loads(body: bytes):
+    """
+    Разбор JSON: orjson, если установлен, иначе стандартный json.
+    Пустое тело — None (как response.json(content_type=None)).
+    Ошибки в обоих случаях — json.JSONDecodeError.
+    """
+    if not body.strip():
+        return None
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def dumps(value) -> bytes:
+    """
+    Компактная сериализация в JSON-байты (без пробелов, UTF-8 как есть).
+    """
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _decode(body: bytes, reducer):
+    data = loads(body)
+    return reducer(data) if reducer is not None else data
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # json.loads — один C-вызов, который держит GIL: поток не спасает loop,
+        # поэтому большие тела разбираются в отдельных процессах.
+        _executor = ProcessPoolExecutor(
+            max_workers=DECODE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+async def decode(body: bytes, reducer=None):
+    """
+    Разбирает JSON, не блокируя event loop на больших телах.
+
+    reducer(data) — функция верхнего уровня (её нужно уметь pickle), которая
+    выполняется там же, где разбор, и сжимает результат до того, что нужно
+    вызывающему. Так через границу процесса идёт маленький результат,
+    а не весь разобранный документ.
+    """
+    if len(body) < INLINE_LIMIT:
+        return _decode(body, reducer)
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_executor(), _decode, body, reducer)
+    except BrokenProcessPool:
+        logging.error("JSON decode worker pool is broken, recreating and decoding in a thread.")
+        shutdown()
+        return await asyncio.to_thread(_decode, body, reducer)
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
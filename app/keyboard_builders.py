@@ -1,14 +1,60 @@
-
+from collections import OrderedDict
 
 from aiogram.types import InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.types import InlineKeyboardMarkup
 
+from . import data_manager as dm
+from .search_index import normalize
+
 ITEMS_PER_PAGE = 8 
+SEARCH_PAGE_SIZE = 10
+MAX_MARKUPS = 5000
+
+# Готовые клавиатуры. Markup-объекты общие для всех ответов, поэтому
+# после построения их никто не меняет.
+#   поиск:     (normalize(query), page) -> markup | None, сбрасывается при смене версии базы;
+#   инвентарь: (handle, inventory.version, page) -> markup, LRU.
+_search_markups = OrderedDict()
+_search_version = None
+_inventory_markups = OrderedDict()
+
+
+def _remember(cache: OrderedDict, key, markup):
+    cache[key] = markup
+    if len(cache) > MAX_MARKUPS:
+        cache.popitem(last=False)
+    return markup
+
+
+def cache_sizes() -> dict:
+    return {"search_markups": len(_search_markups), "inventory_markups": len(_inventory_markups)}
+
+
+def get_search_keyboard(query: str, page: int = 0) -> InlineKeyboardMarkup | None:
+    """
+    Клавиатура страницы результатов поиска (None — на странице ничего нет).
+    Повторный запрос (в том числе "« Back to Results") не ищет и не строит заново.
+    """
+    global _search_version
+    if _search_version != dm.database_version:
+        _search_markups.clear()
+        _search_version = dm.database_version
+
+    key = (normalize(query), page)
+    if key in _search_markups:
+        _search_markups.move_to_end(key)
+        return _search_markups[key]
+
+    results, has_more = dm.search_items(query, offset=page * SEARCH_PAGE_SIZE, limit=SEARCH_PAGE_SIZE)
+    markup = create_skin_search_keyboard(results, page, has_more) if results else None
+    return _remember(_search_markups, key, markup)
 
-def create_skin_search_keyboard(results: list) -> InlineKeyboardMarkup:
+
+def create_skin_search_keyboard(results: list, page: int = 0, has_more: bool = False) -> InlineKeyboardMarkup:
     """
     Создает inline-клавиатуру из списка найденных предметов. (Поиск)
+    results — одна страница; навигация появляется, если страниц больше одной.
     """
     builder = InlineKeyboardBuilder()
     
@@ -21,12 +67,39 @@ def create_skin_search_keyboard(results: list) -> InlineKeyboardMarkup:
         ))
     
     builder.adjust(1)
+
+    if page > 0 or has_more:
+        pagination_buttons = []
+        if page > 0:
+            pagination_buttons.append(
+                InlineKeyboardButton(text="« Prev", callback_data=f"search_page:{page - 1}")
+            )
+        pagination_buttons.append(InlineKeyboardButton(text=f"Page {page + 1}", callback_data="noop"))
+        if has_more:
+            pagination_buttons.append(
+                InlineKeyboardButton(text="Next »", callback_data=f"search_page:{page + 1}")
+            )
+        builder.row(*pagination_buttons)
+
     return builder.as_markup()
 
 
-def create_inventory_keyboard(inventory: list, page: int = 0) -> InlineKeyboardMarkup:
+def create_inventory_keyboard(inventory, page: int = 0) -> InlineKeyboardMarkup:
     """
     Создает клавиатуру для просмотра инвентаря с пагинацией.
+    inventory — inventory_cache.Inventory.
+    """
+    key = (inventory.handle, inventory.version, page)
+    markup = _inventory_markups.get(key)
+    if markup is not None:
+        _inventory_markups.move_to_end(key)
+        return markup
+    return _remember(_inventory_markups, key, build_inventory_keyboard(inventory, page))
+
+
+def build_inventory_keyboard(inventory, page: int = 0) -> InlineKeyboardMarkup:
+    """
+    Сборка клавиатуры инвентаря без кеша.
     """
     builder = InlineKeyboardBuilder()
     
@@ -34,12 +107,14 @@ def create_inventory_keyboard(inventory: list, page: int = 0) -> InlineKeyboardM
     
     start_index = page * ITEMS_PER_PAGE
     end_index = start_index + ITEMS_PER_PAGE
-    page_items = inventory[start_index:end_index]
+    page_items = inventory.slice(start_index, end_index)
     
-    for i, item_name in enumerate(page_items):
+    for i, (item_name, amount) in enumerate(page_items):
         item_index = start_index + i 
         
         short_name = (item_name[:40] + '...') if len(item_name) > 43 else item_name
+        if amount > 1:
+            short_name = f"{short_name} ×{amount}"
         
         builder.add(InlineKeyboardButton(
             text=short_name,
@@ -65,6 +140,7 @@ def create_inventory_keyboard(inventory: list, page: int = 0) -> InlineKeyboardM
     
     builder.row(*pagination_buttons)
     
+    builder.row(InlineKeyboardButton(text="💰 Value Inventory", callback_data="inv_value"))
     builder.row(InlineKeyboardButton(text="Close Inventory", callback_data="close_inv"))
     
     return builder.as_markup()
\ No newline at end of file
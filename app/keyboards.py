@@ -2,6 +2,8 @@
 
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton , InlineKeyboardMarkup, InlineKeyboardButton
 
+from .prices import CURRENCIES
+
 main = ReplyKeyboardMarkup(keyboard=[
     [KeyboardButton(text="Skin Price Search"), KeyboardButton(text="View Inventory")], 
     [KeyboardButton(text="Steam Profile Search")],
@@ -15,4 +17,10 @@ main = ReplyKeyboardMarkup(keyboard=[
 steam = InlineKeyboardMarkup(inline_keyboard=[
     [InlineKeyboardButton(text="Steam Profile", url="https://steamcommunity.com/profiles/123456789")],
     [InlineKeyboardButton(text="Back", callback_data="back_to_main")]
-])
\ No newline at end of file
+])
+
+currencies = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text=currency.code, callback_data=f"currency:{currency.id}")
+     for currency in list(CURRENCIES.values())[row:row + 4]]
+    for row in range(0, len(CURRENCIES), 4)
+])
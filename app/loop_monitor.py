@@ -0,0 +1,59 @@
+import asyncio
+import logging
+import time
+
+
+# Монитор задержки event loop: раз в INTERVAL засыпаем и меряем, насколько
+# позже запланированного проснулись. Любой синхронный кусок кода (разбор
+# JSON, сборка индекса) виден как рост задержки.
+INTERVAL = 0.25
+STALL_THRESHOLD = 0.1   # сек: дольше — пишем предупреждение в лог
+
+_task = None
+_stats = {"samples": 0, "last": 0.0, "max": 0.0, "total": 0.0, "stalls": 0}
+
+
+async def _monitor(interval: float) -> None:
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(0.0, time.perf_counter() - started - interval)
+
+        _stats["samples"] += 1
+        _stats["last"] = lag
+        _stats["total"] += lag
+        _stats["max"] = max(_stats["max"], lag)
+        if lag >= STALL_THRESHOLD:
+            _stats["stalls"] += 1
+            logging.warning(f"Event loop stalled for {lag * 1000:.0f} ms.")
+
+
+def start(interval: float = INTERVAL) -> None:
+    global _task
+    if _task is None or _task.done():
+        _task = asyncio.create_task(_monitor(interval))
+
+
+async def stop() -> None:
+    global _task
+    if _task is not None and not _task.done():
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+    _task = None
+
+
+def stats() -> dict:
+    """
+    Задержка event loop в миллисекундах.
+    """
+    samples = _stats["samples"]
+    return {
+        "samples": samples,
+        "last_ms": _stats["last"] * 1000,
+        "max_ms": _stats["max"] * 1000,
+        "avg_ms": _stats["total"] / samples * 1000 if samples else 0.0,
+        "stalls": _stats["stalls"],
+    }
@@ -0,0 +1,169 @@
+import math
+import time
+from bisect import bisect_left
+
+
+# Лёгкие метрики в памяти процесса в формате Prometheus (text exposition).
+# Запись — словарь по кортежу меток и пара сложений, без блокировок
+# (всё в одном event loop), поэтому метрики можно держать включёнными всегда.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = {}
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        _registry[name] = self
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0)
+
+    def items(self):
+        return self._values.items()
+
+    def render(self) -> list:
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}"
+                for key, value in self._values.items()]
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными корзинами; на каждую серию меток хранится
+    список счётчиков по корзинам, сумма и количество.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}   # label_values -> [counts по корзинам (+Inf последней), sum, count]
+        _registry[name] = self
+
+    def observe(self, value: float, *label_values) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def time(self, *label_values) -> "_Timer":
+        return _Timer(self, label_values)
+
+    def items(self):
+        return self._series.items()
+
+    def quantile(self, q: float, *label_values) -> float | None:
+        """
+        Оценка квантиля по корзинам (линейная интерполяция внутри корзины).
+        """
+        series = self._series.get(label_values)
+        if series is None or not series[2]:
+            return None
+        return quantile_from_buckets(self.buckets, series[0], series[2], q)
+
+    def render(self) -> list:
+        lines = []
+        for key, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+def quantile_from_buckets(buckets: tuple, counts: list, count: int, q: float) -> float:
+    rank = q * count
+    cumulative = 0
+    lower = 0.0
+    for bound, bucket_count in zip(buckets, counts):
+        if cumulative + bucket_count >= rank:
+            if not bucket_count:
+                return bound
+            return lower + (bound - lower) * (rank - cumulative) / bucket_count
+        cumulative += bucket_count
+        lower = bound
+    return buckets[-1] if buckets else math.nan
+
+
+class _Timer:
+    __slots__ = ("histogram", "label_values", "started")
+
+    def __init__(self, histogram: Histogram, label_values: tuple):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+        return False
+
+
+# Функции, отдающие мгновенные значения (размеры кешей, счётчики модулей):
+# вызываются только при рендере. Каждая возвращает [(name, help, kind, {labels_tuple: value}, label_names)].
+_collectors = []
+
+
+def register_collector(collector) -> None:
+    _collectors.append(collector)
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry.values():
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    for collector in _collectors:
+        for name, help_text, kind, values, label_names in collector():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{_format_labels(label_names, key)} {value}" for key, value in values.items())
+    return "\n".join(lines) + "\n"
+
+
+# --- метрики, общие для модулей ---
+
+handler_seconds = Histogram("bot_handler_seconds", "Handler execution time.", ("event", "handler"))
+handler_errors = Counter("bot_handler_errors_total", "Handlers that raised.", ("event", "handler"))
+
+upstream_seconds = Histogram("upstream_request_seconds", "Upstream HTTP request time (one attempt).", ("host",))
+upstream_responses = Counter("upstream_responses_total", "Upstream HTTP responses by status.", ("host", "status"))
+upstream_errors = Counter("upstream_errors_total", "Upstream requests that failed without a response.", ("host",))
+upstream_queue_seconds = Histogram("upstream_queue_seconds", "Time spent waiting for a rate-limit token.", ("host",))
+
+telegram_seconds = Histogram("telegram_request_seconds", "Bot API call time.", ("method",))
+telegram_errors = Counter("telegram_errors_total", "Bot API calls that raised.", ("method",))
+
+search_seconds = Histogram("search_seconds", "Item search time (find_items_by_name / search_items / complete_items).", ("kind",),
+                           buckets=(0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05))
@@ -0,0 +1,197 @@
+import logging
+import os
+import time
+
+from aiohttp import web
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+
+from . import keyboard_builders
+from . import loop_monitor
+from . import metrics
+from . import request_scheduler
+from .inventory_cache import inventory_cache
+from .official_steam_api import summaries
+from .price_cache import price_cache
+from .price_history import price_history
+from .price_watch import watch_scheduler
+from .telegram_outbox import outbox
+
+
+# Точка сбора метрик: middleware для хендлеров и Bot API, коллектор
+# со счётчиками модулей, /metrics для Prometheus и текст для /stats.
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_METRICS_PORT = 9108     # 0 — не поднимать HTTP-эндпоинт
+TOP_HANDLERS = 8
+
+_runner = None
+
+
+def admin_ids() -> set:
+    """
+    ADMIN_IDS="123,456" — кому доступна команда /stats.
+    """
+    return {int(value) for value in os.getenv("ADMIN_IDS", "").replace(" ", "").split(",") if value.isdigit()}
+
+
+class HandlerTimingMiddleware(BaseMiddleware):
+    """
+    Inner-middleware: срабатывает только когда фильтры выбрали хендлер,
+    поэтому метка — имя функции хендлера, а не "всё подряд".
+    """
+
+    def __init__(self, event: str):
+        self.event = event
+
+    async def __call__(self, handler, event, data):
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            metrics.handler_errors.inc(self.event, name)
+            raise
+        finally:
+            metrics.handler_seconds.observe(time.perf_counter() - started, self.event, name)
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    async def __call__(self, make_request, bot, method):
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception:
+            metrics.telegram_errors.inc(name)
+            raise
+        finally:
+            metrics.telegram_seconds.observe(time.perf_counter() - started, name)
+
+
+def setup(dp, bot) -> None:
+    for event in ("message", "callback_query", "inline_query"):
+        getattr(dp, event).middleware(HandlerTimingMiddleware(event))
+    bot.session.middleware(TelegramMetricsMiddleware())
+
+
+# --- мгновенные значения модулей ---
+
+def _module_stats() -> dict:
+    return {
+        "price_cache": price_cache.stats(),
+        "profile_summaries": summaries.stats(),
+        "price_history": price_history.stats(),
+        "price_watch": watch_scheduler.stats(),
+        "telegram_outbox": outbox.stats(),
+        "loop": loop_monitor.stats(),
+    }
+
+
+def _collect() -> list:
+    result = []
+    for module, values in _module_stats().items():
+        name = f"bot_{module}"
+        result.append((name, f"Internal counters of {module}.", "gauge",
+                       {(key,): value for key, value in values.items()}, ("stat",)))
+    result.append(("bot_cache_entries", "Entries held by in-process caches.", "gauge", {
+        ("inventories",): len(inventory_cache),
+        **{(cache,): size for cache, size in keyboard_builders.cache_sizes().items()},
+    }, ("cache",)))
+    result.append(("upstream_queue_depth", "Requests waiting for a rate-limit token.", "gauge",
+                   {(host,): depth for host, depth in request_scheduler.queue_depths().items()},
+                   ("host",)))
+    return result
+
+
+metrics.register_collector(_collect)
+
+
+# --- HTTP-эндпоинт ---
+
+async def _metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8",
+                        headers={"X-Content-Type-Options": "nosniff"})
+
+
+async def start(host: str | None = None, port: int | None = None) -> None:
+    global _runner
+    host = host or os.getenv("METRICS_HOST", DEFAULT_METRICS_HOST)
+    port = int(os.getenv("METRICS_PORT", DEFAULT_METRICS_PORT)) if port is None else port
+    if not port or _runner is not None:
+        return
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        # Например, второй воркер на той же машине с тем же METRICS_PORT:
+        # бот работает и без эндпоинта.
+        logging.warning(f"Metrics endpoint disabled, cannot listen on {host}:{port}: {e}")
+        await runner.cleanup()
+        return
+    _runner = runner
+    logging.info(f"Metrics available at http://{host}:{port}/metrics")
+
+
+async def stop() -> None:
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
+
+
+# --- /stats ---
+
+def _ms(seconds: float | None) -> str:
+    return "—" if seconds is None else f"{seconds * 1000:.0f}ms"
+
+
+def _ratio(part: float, total: float) -> str:
+    return f"{part / total:.0%}" if total else "—"
+
+
+def summary_text() -> str:
+    lines = ["<b>Handlers</b> (calls, p50 / p99, errors)"]
+    handlers = sorted(metrics.handler_seconds.items(), key=lambda item: item[1][2], reverse=True)
+    for (event, name), (_, _, count) in handlers[:TOP_HANDLERS]:
+        p50 = metrics.handler_seconds.quantile(0.5, event, name)
+        p99 = metrics.handler_seconds.quantile(0.99, event, name)
+        errors = metrics.handler_errors.value(event, name)
+        lines.append(f"  {name}: {count}, {_ms(p50)} / {_ms(p99)}" + (f", ⚠️ {errors:g}" if errors else ""))
+    if not handlers:
+        lines.append("  no calls yet")
+
+    lines.append("\n<b>Upstream</b> (requests, avg, 429, errors)")
+    statuses = {}
+    for (host, status), value in metrics.upstream_responses.items():
+        statuses.setdefault(host, {})[status] = value
+    for (host,), (_, total, count) in sorted(metrics.upstream_seconds.items()):
+        limited = statuses.get(host, {}).get(429, 0)
+        errors = metrics.upstream_errors.value(host)
+        lines.append(f"  {host}: {count}, {_ms(total / count)}, {limited:g}, {errors:g}")
+
+    telegram_count = sum(count for _, (_, _, count) in metrics.telegram_seconds.items())
+    telegram_total = sum(total for _, (_, total, _) in metrics.telegram_seconds.items())
+    if telegram_count:
+        lines.append(f"  api.telegram.org: {telegram_count}, {_ms(telegram_total / telegram_count)}")
+
+    prices = price_cache.stats()
+    profiles = summaries.stats()
+    loop = loop_monitor.stats()
+    # shared_hits — подмножество misses (и фоновых обновлений), в долю попаданий не входят.
+    price_hits = prices["hits"] + prices["stale_hits"]
+    lines.append("\n<b>Caches</b>")
+    lines.append(f"  prices: {_ratio(price_hits, price_hits + prices['misses'])} hit, "
+                 f"{prices['shared_hits']} from shared store, {prices['size']} entries")
+    lines.append(f"  profiles: {profiles['size']} entries")
+    lines.append(f"  inventories: {len(inventory_cache)}")
+    for kind in ("search", "faceted", "complete"):
+        p50 = metrics.search_seconds.quantile(0.5, kind)
+        if p50 is not None:
+            lines.append(f"  {kind}: p50 {p50 * 1e6:.0f}µs")
+    lines.append(f"\n<b>Event loop</b>: lag {loop['last_ms']:.1f}ms, max {loop['max_ms']:.1f}ms, "
+                 f"stalls {loop['stalls']}")
+    return "\n".join(lines)
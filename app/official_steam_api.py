@@ -1,41 +1,142 @@
 
-import aiohttp
+import asyncio
+import itertools
 import logging
-import os
+import time
+from collections import OrderedDict
+
+from . import request_scheduler
 
 API_URL = "https://api.steampowered.com/ISteamUser/GetPlayerSummaries/v2/"
 
+BATCH_WINDOW = 0.05      # сек: сколько ждём другие запросы, прежде чем отправить пачку
+MAX_BATCH = 100          # лимит steamids в одном запросе GetPlayerSummaries/v2
+SUMMARY_TTL = 300        # сек: профиль (статус, игра) считается свежим
+MISSING_TTL = 60         # сек: "профиль не найден" тоже кешируем, но коротко
+MAX_ENTRIES = 5000
+
+# Ключ читается один раз при старте (server.main -> configure), а не на каждый вызов.
+_api_key: str | None = None
+
+
+def configure(api_key: str | None) -> None:
+    global _api_key
+    _api_key = api_key
+
+
+class SummaryBatcher:
+    """
+    Собирает запросы профилей, пришедшие в течение BATCH_WINDOW, в один
+    вызов GetPlayerSummaries (до MAX_BATCH steamids) и раздаёт ответ по вызывающим.
+    Результаты кешируются с коротким TTL; одинаковые steam_id в одной пачке
+    ждут один и тот же future.
+    """
+
+    def __init__(self, window: float = BATCH_WINDOW, max_batch: int = MAX_BATCH,
+                 ttl: float = SUMMARY_TTL, missing_ttl: float = MISSING_TTL,
+                 max_entries: int = MAX_ENTRIES):
+        self.window = window
+        self.max_batch = max_batch
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()   # steam_id -> (summary | None, expires_at)
+        self._pending = {}              # steam_id -> future, ещё не отправлены
+        self._inflight = {}             # steam_id -> future, запрос уже в пути
+        self._tasks = set()
+        self._timer = None
+        self._counters = {"hits": 0, "misses": 0, "coalesced": 0, "requests": 0, "errors": 0}
+
+    async def get(self, steam_id: str) -> dict | None:
+        entry = self._entries.get(steam_id)
+        if entry is not None:
+            if time.monotonic() < entry[1]:
+                self._counters["hits"] += 1
+                self._entries.move_to_end(steam_id)
+                return entry[0]
+            del self._entries[steam_id]
+
+        future = self._pending.get(steam_id) or self._inflight.get(steam_id)
+        if future is not None:
+            self._counters["coalesced"] += 1
+        else:
+            self._counters["misses"] += 1
+            future = asyncio.get_running_loop().create_future()
+            self._pending[steam_id] = future
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+
+        # shield: отмена одного ожидающего не должна ломать future остальных.
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = dict(itertools.islice(self._pending.items(), self.max_batch))
+            for steam_id in batch:
+                del self._pending[steam_id]
+            self._inflight.update(batch)
+            task = asyncio.create_task(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: dict) -> None:
+        try:
+            await self._request(batch)
+        finally:
+            for steam_id, future in batch.items():
+                self._inflight.pop(steam_id, None)
+                if not future.done():
+                    future.set_result(None)
+
+    async def _request(self, batch: dict) -> None:
+        self._counters["requests"] += 1
+        players = None
+        if not _api_key:
+            logging.error("STEAM_API_KEY is not set. Check .env file.")
+        else:
+            params = {"key": _api_key, "steamids": ",".join(batch)}
+            try:
+                status, data = await request_scheduler.fetch_json(API_URL, params=params)
+                if status == 200 and data:
+                    players = {player.get("steamid"): player
+                               for player in data.get("response", {}).get("players", [])}
+                else:
+                    logging.error(f"Steam API (PlayerSummary) status: {status}")
+            except Exception as e:
+                logging.error(f"Error in get_player_summary: {e}")
+
+        if players is None:
+            # Ошибка запроса — не кешируем, следующий вызов попробует снова.
+            self._counters["errors"] += 1
+            return
+
+        now = time.monotonic()
+        for steam_id, future in batch.items():
+            summary = players.get(steam_id)
+            if summary is None:
+                logging.warning(f"No player found with SteamID: {steam_id}")
+            self._entries[steam_id] = (summary, now + (self.ttl if summary is not None else self.missing_ttl))
+            self._entries.move_to_end(steam_id)
+            if not future.done():
+                future.set_result(summary)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {**self._counters, "size": len(self._entries),
+                "pending": len(self._pending), "inflight": len(self._inflight)}
+
+summaries = SummaryBatcher()
+
+
 async def get_player_summary(steam_id: str) -> dict | None:
     """
     Запрашивает информацию о профиле Steam
     """
-    
-
-    STEAM_API_KEY = os.getenv("STEAM_API_KEY")
-    
-    if not STEAM_API_KEY:
-        logging.error("STEAM_API_KEY is not set. Check .env file.")
-        return None
-
-    params = {
-        "key": STEAM_API_KEY,
-        "steamids": steam_id
-    }
-    
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(API_URL, params=params) as response:
-                if response.status == 200:
-                    data = await response.json(content_type=None)
-                    players = data.get("response", {}).get("players", [])
-                    if players:
-                        return players[0] 
-                    else:
-                        logging.warning(f"No player found with SteamID: {steam_id}")
-                        return None
-                else:
-                    logging.error(f"Steam API (PlayerSummary) status: {response.status}")
-                    return None
-    except Exception as e:
-        logging.error(f"Error in get_player_summary: {e}")
-        return None
\ No newline at end of file
+    return await summaries.get(steam_id)
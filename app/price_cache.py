@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from . import steam_api
+from . import storage
+from .prices import PriceQuote
+from .request_scheduler import INTERACTIVE, BACKGROUND
+
+
+PRICE_TTL = 300          # сек: цена считается свежей
+STALE_TTL = 1800         # сек: после TTL ещё можно отдать старую цену, обновляя её в фоне
+MAX_ENTRIES = 5000
+
+
+class PriceCache:
+    """
+    In-process кеш цен Steam Market (PriceQuote) с ключом (market_hash_name, currency).
+
+    - TTL + ограниченный LRU;
+    - stale-while-revalidate: устаревшая цена отдаётся сразу, обновление идёт в фоне;
+    - single-flight: одновременные одинаковые запросы ждут один и тот же вызов fetch,
+      если он идёт с тем же или более высоким приоритетом (клик не ждёт в очереди
+      за фоновым обновлением);
+    - второй уровень в общем storage: перед походом в Steam смотрим, не загрузил ли
+      цену другой воркер (или этот же до перезапуска).
+    """
+
+    def __init__(self, fetch, ttl: float = PRICE_TTL, stale_ttl: float = STALE_TTL,
+                 max_entries: int = MAX_ENTRIES):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()   # key -> (PriceQuote, fetched_at)
+        self._inflight = {}             # key -> (asyncio.Task, priority)
+        self._counters = {"hits": 0, "stale_hits": 0, "shared_hits": 0, "misses": 0,
+                          "coalesced": 0, "errors": 0}
+
+    async def get(self, market_hash_name: str, currency: int = 1,
+                  priority: int = INTERACTIVE) -> PriceQuote | None:
+        key = (market_hash_name, currency)
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            quote, fetched_at = entry
+            age = time.monotonic() - fetched_at
+            if age < self.ttl:
+                self._counters["hits"] += 1
+                self._entries.move_to_end(key)
+                return quote
+            if age < self.ttl + self.stale_ttl:
+                self._counters["stale_hits"] += 1
+                self._entries.move_to_end(key)
+                self._refresh(key, BACKGROUND)
+                return quote
+
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[1] <= priority:
+            self._counters["coalesced"] += 1
+        else:
+            self._counters["misses"] += 1
+        task = self._refresh(key, priority)
+
+        # shield: отмена одного ожидающего не должна отменять общий запрос.
+        return await asyncio.shield(task)
+
+    def _refresh(self, key, priority: int) -> asyncio.Task:
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[1] <= priority:
+            return inflight[0]
+        # Запроса нет или он стоит в очереди с меньшим приоритетом: свой запрос,
+        # последующие ждут уже его.
+        task = asyncio.create_task(self._load(key, priority))
+        self._inflight[key] = (task, priority)
+        return task
+
+    @staticmethod
+    def _shared_key(key) -> str:
+        market_hash_name, currency = key
+        return f"price:{currency}:{market_hash_name}"
+
+    async def _load_shared(self, key) -> tuple | None:
+        """
+        (PriceQuote, fetched_at по time.monotonic()) из общего хранилища.
+        """
+        try:
+            entry = storage.unpack(await storage.get_store().get(self._shared_key(key)))
+        except Exception as e:
+            logging.error(f"Shared price cache read failed: {e}")
+            return None
+        if entry is None:
+            return None
+        values, saved_at = entry
+        # В хранилище — время по часам (общее для воркеров), в памяти — monotonic.
+        return PriceQuote.from_list(values), time.monotonic() - max(0.0, time.time() - saved_at)
+
+    async def _store_shared(self, key, quote: PriceQuote) -> None:
+        try:
+            await storage.get_store().set(self._shared_key(key), storage.pack([quote.to_list(), time.time()]),
+                                          self.ttl + self.stale_ttl)
+        except Exception as e:
+            logging.error(f"Shared price cache write failed: {e}")
+
+    def _remember(self, key, quote: PriceQuote, fetched_at: float) -> None:
+        self._entries[key] = (quote, fetched_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _load(self, key, priority: int) -> PriceQuote | None:
+        market_hash_name, currency = key
+        try:
+            shared = await self._load_shared(key)
+            if shared is not None and time.monotonic() - shared[1] < self.ttl:
+                self._counters["shared_hits"] += 1
+                self._remember(key, *shared)
+                return shared[0]
+
+            try:
+                quote = await self._fetch(market_hash_name, currency=currency, priority=priority)
+            except Exception as e:
+                logging.error(f"Price fetch failed for {market_hash_name}: {e}")
+                quote = None
+        finally:
+            inflight = self._inflight.get(key)
+            if inflight is not None and inflight[0] is asyncio.current_task():
+                del self._inflight[key]
+
+        if quote is None:
+            self._counters["errors"] += 1
+            # Steam не ответил — лучше отдать старую цену, чем ничего.
+            for entry in (self._entries.get(key), shared):
+                if entry is not None and time.monotonic() - entry[1] < self.ttl + self.stale_ttl:
+                    return entry[0]
+            return None
+
+        self._remember(key, quote, time.monotonic())
+        await self._store_shared(key, quote)
+        return quote
+
+    def stats(self) -> dict:
+        return {**self._counters, "size": len(self._entries), "inflight": len(self._inflight)}
+
+price_cache = PriceCache(steam_api.get_item_price)
+
+
+async def get_price(market_hash_name: str, currency: int = 1,
+                    priority: int = INTERACTIVE) -> PriceQuote | None:
+    """
+    Цена предмета через общий кеш. Используется хендлерами вместо steam_api напрямую.
+    Каждая валюта кешируется отдельно.
+    """
+    return await price_cache.get(market_hash_name, currency, priority)
@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .prices import PriceQuote
+
+
+# История цен: каждое наблюдение Steam Market (lowest, median, volume) пишется
+# в локальный SQLite. Запись буферизуется в памяти и сбрасывается пачкой
+# в отдельном потоке, так что ответ пользователю её не ждёт.
+DEFAULT_PATH = os.path.join(".cache", "price_history.db")
+FLUSH_INTERVAL = 5.0        # сек
+FLUSH_SIZE = 500            # наблюдений: сбросить раньше, не дожидаясь интервала
+MAX_BUFFER = 20_000         # если диск не успевает — старые наблюдения отбрасываются
+RETENTION = 30 * 24 * 3600  # сек
+PURGE_INTERVAL = 3600       # сек
+
+# окно -> (сдвиг назад, ширина корзины для даунсэмплинга опорной цены,
+# насколько опорная корзина может отстоять от момента "сдвиг назад")
+CHANGE_WINDOWS = {"24h": (24 * 3600, 3600, 3 * 3600), "7d": (7 * 24 * 3600, 6 * 3600, 24 * 3600)}
+
+
+def history_path() -> str:
+    return os.getenv("PRICE_HISTORY_PATH", DEFAULT_PATH)
+
+
+class PriceHistory:
+    """
+    Таблицы:
+      names(id, name)                                    — market_hash_name один раз;
+      observations(name_id, currency, ts, lowest, median, volume) — всё целыми
+      (цены в минорных единицах, ts в секундах), ключ (name_id, currency, ts).
+
+    Запись (пачки и очистка старых данных) идёт через один поток-исполнитель,
+    чтение — через свой поток и отдельное read-only соединение: в WAL оно
+    не ждёт писателя, и ответ с ценой не встаёт в очередь за сбросом буфера.
+    """
+
+    def __init__(self, path: str | None = None, flush_interval: float = FLUSH_INTERVAL,
+                 flush_size: int = FLUSH_SIZE):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._buffer = []
+        self._name_ids = {}
+        self._conn = None
+        self._reader = None
+        self._executor = None
+        self._read_executor = None
+        self._task = None
+        self._wakeup = None
+        self._last_purge = 0.0
+        self._counters = {"recorded": 0, "written": 0, "dropped": 0, "flushes": 0}
+
+    # --- запись ---
+
+    def record(self, market_hash_name: str, currency: int, quote: PriceQuote,
+               ts: float | None = None) -> None:
+        """
+        Синхронно и без I/O: наблюдение попадает в буфер.
+        Пока recorder не запущен (start), наблюдения не копятся.
+        """
+        if self._task is None:
+            return
+        if quote.lowest is None and quote.median is None:
+            return
+        self._buffer.append((market_hash_name, currency, int(ts or time.time()),
+                             quote.lowest, quote.median, quote.volume))
+        self._counters["recorded"] += 1
+        if len(self._buffer) > MAX_BUFFER:
+            dropped = len(self._buffer) - MAX_BUFFER
+            del self._buffer[:dropped]
+            self._counters["dropped"] += dropped
+        if len(self._buffer) >= self.flush_size:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self.path = self.path or history_path()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="price-history")
+        self._read_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="price-history-read")
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+        logging.info(f"Price history recording to {self.path}.")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+        await self._read(self._close_reader)
+        await self._run(self._close)
+        self._read_executor.shutdown(wait=True)
+        self._executor.shutdown(wait=True)
+        self._executor = self._read_executor = None
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error(f"Price history flush failed: {e}")
+
+    async def flush(self) -> None:
+        if not self._buffer or self._executor is None:
+            return
+        batch, self._buffer = self._buffer, []
+        await self._run(self._write, batch)
+        self._counters["written"] += len(batch)
+        self._counters["flushes"] += 1
+
+    # --- SQLite (только в потоках-исполнителях) ---
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def _read(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._read_executor, func, *args)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS names (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS observations ("
+                         "name_id INTEGER NOT NULL, currency INTEGER NOT NULL, ts INTEGER NOT NULL, "
+                         "lowest INTEGER, median INTEGER, volume INTEGER, "
+                         "PRIMARY KEY (name_id, currency, ts)) WITHOUT ROWID")
+            conn.commit()
+            self._name_ids = dict(conn.execute("SELECT name, id FROM names"))
+            self._conn = conn
+        return self._conn
+
+    def _reader_connection(self) -> sqlite3.Connection | None:
+        """
+        Read-only соединение потока чтения; None, пока писатель не создал файл.
+        """
+        if self._reader is None:
+            if not os.path.exists(self.path):
+                return None
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute("PRAGMA busy_timeout=1000")
+            self._reader = conn
+        return self._reader
+
+    def _name_id(self, conn: sqlite3.Connection, name: str) -> int:
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = conn.execute("INSERT INTO names (name) VALUES (?)", (name,)).lastrowid
+            self._name_ids[name] = name_id
+        return name_id
+
+    @staticmethod
+    def _find_name_id(conn: sqlite3.Connection, name: str) -> int | None:
+        row = conn.execute("SELECT id FROM names WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _write(self, batch: list) -> None:
+        conn = self._connection()
+        rows = [(self._name_id(conn, name), currency, ts, lowest, median, volume)
+                for name, currency, ts, lowest, median, volume in batch]
+        # Одна транзакция на пачку: один fsync вместо сотни.
+        conn.executemany("INSERT OR REPLACE INTO observations VALUES (?, ?, ?, ?, ?, ?)", rows)
+        now = time.time()
+        if now - self._last_purge > PURGE_INTERVAL:
+            conn.execute("DELETE FROM observations WHERE ts < ?", (int(now - RETENTION),))
+            self._last_purge = now
+        conn.commit()
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _close_reader(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def _references(self, name: str, currency: int, now: float) -> dict:
+        conn = self._reader_connection()
+        try:
+            name_id = self._find_name_id(conn, name) if conn is not None else None
+        except sqlite3.OperationalError:
+            return {}   # файл уже есть, а таблиц ещё нет: писатель только создаёт базу
+        if name_id is None:
+            return {}
+        return {label: self._reference(conn, name_id, currency, window, bucket, tolerance, now)
+                for label, (window, bucket, tolerance) in CHANGE_WINDOWS.items()}
+
+    @staticmethod
+    def _reference(conn: sqlite3.Connection, name_id: int, currency: int, window: int, bucket: int,
+                   tolerance: int, now: float) -> int | None:
+        """
+        Средняя lowest-цена в корзине шириной bucket, ближайшей к моменту now - window.
+        Берутся наблюдения не дальше tolerance от этого момента, чтобы опорой
+        для "24 ч назад" не оказалась цена двенадцатичасовой давности.
+        """
+        target = now - window
+        row = conn.execute(
+            "SELECT AVG(lowest) FROM observations "
+            "WHERE name_id = ? AND currency = ? AND ts BETWEEN ? AND ? AND lowest IS NOT NULL "
+            "GROUP BY ts / ? ORDER BY ABS((ts / ?) * ? + ? - ?) LIMIT 1",
+            (name_id, currency, int(target - tolerance), int(target + tolerance),
+             bucket, bucket, bucket, bucket // 2, int(target)),
+        ).fetchone()
+        return round(row[0]) if row else None
+
+    # --- чтение ---
+
+    async def changes(self, market_hash_name: str, currency: int, current: int | None) -> dict:
+        """
+        Изменение текущей lowest-цены (в минорных единицах) относительно
+        24 ч и 7 дней назад: {"24h": доля | None, "7d": доля | None}.
+        Без обращений к Steam — только локальная история.
+        """
+        if current is None or self._executor is None:
+            return {label: None for label in CHANGE_WINDOWS}
+        references = await self._read(self._references, market_hash_name, currency, time.time())
+        result = {}
+        for label in CHANGE_WINDOWS:
+            reference = references.get(label)
+            result[label] = (current - reference) / reference if reference else None
+        return result
+
+    def stats(self) -> dict:
+        return {**self._counters, "buffered": len(self._buffer)}
+
+
+price_history = PriceHistory()
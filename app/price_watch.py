@@ -0,0 +1,369 @@
+import asyncio
+import heapq
+import html
+import itertools
+import logging
+import os
+import time
+import uuid
+
+from . import price_cache
+from . import storage
+from .prices import format_price
+from .request_scheduler import BACKGROUND, host_limit
+
+
+WATCH_INTERVAL = 600        # сек: как часто проверять один предмет при свободном бюджете
+BUDGET_SHARE = 0.5          # доля лимита steamcommunity.com, которую может занять планировщик
+POLL_CONCURRENCY = 4        # одновременных проверок (остальные ждут в куче)
+MAX_WATCHES_PER_USER = 20
+# Подписки лежат в общем хранилище по пользователю (price_watches:<user_id>),
+# список пользователей — во множестве. Опрашивает только владелец аренды:
+# при нескольких воркерах каждый предмет проверяется и уведомление уходит один раз.
+USERS_KEY = "price_watches:users"
+LEASE_KEY = "price_watches:lease"
+LEGACY_KEY = "price_watches"        # старый формат: все подписки одним списком
+LEASE_TTL = 30              # сек: столько живёт аренда без продления (воркер упал)
+SYNC_INTERVAL = 10          # сек: продление аренды и перечитывание подписок владельцем
+
+BELOW = "below"
+ABOVE = "above"
+
+
+def watch_interval() -> float:
+    return float(os.getenv("WATCH_INTERVAL", WATCH_INTERVAL))
+
+
+class Watch:
+    __slots__ = ("user_id", "name", "currency", "target", "direction", "created_at")
+
+    def __init__(self, user_id: int, name: str, currency: int, target: int, direction: str,
+                 created_at: float | None = None):
+        self.user_id = user_id
+        self.name = name
+        self.currency = currency
+        self.target = target
+        self.direction = direction
+        self.created_at = created_at or time.time()
+
+    def triggered(self, price: int) -> bool:
+        return price <= self.target if self.direction == BELOW else price >= self.target
+
+    def describe(self) -> str:
+        """
+        Для HTML-сообщений: имя предмета экранировано.
+        """
+        sign = "≤" if self.direction == BELOW else "≥"
+        return f"{html.escape(self.name)} {sign} {html.escape(format_price(self.target, self.currency))}"
+
+    def row(self) -> list:
+        return [self.user_id, self.name, self.currency, self.target, self.direction, self.created_at]
+
+    def __eq__(self, other):
+        return isinstance(other, Watch) and self.row() == other.row()
+
+    def __hash__(self):
+        return hash((self.user_id, self.name, self.created_at))
+
+
+def _user_key(user_id: int) -> str:
+    return f"price_watches:{user_id}"
+
+
+class WatchGroup:
+    """
+    Все подписки на один (market_hash_name, currency): предмет проверяется один раз,
+    сколько бы пользователей за ним ни следило.
+    """
+    __slots__ = ("watches", "due")
+
+    def __init__(self):
+        self.watches = []
+        self.due = None     # время следующей проверки; None — проверка идёт сейчас
+
+
+class WatchScheduler:
+    """
+    Планировщик проверок на одной куче (due, seq, key) вместо таймера на подписку.
+    Устаревшие записи кучи (группа удалена или перепланирована) пропускаются при извлечении.
+
+    Источник правды — общее хранилище: команды пишут подписки пользователя сразу,
+    а воркер, владеющий арендой LEASE_KEY, раз в SYNC_INTERVAL перечитывает их
+    в кучу. Остальные воркеры ничего не опрашивают.
+
+    Интервал проверки растягивается так, чтобы все группы укладывались
+    в BUDGET_SHARE лимита Steam Market; цены берутся через price_cache
+    с приоритетом BACKGROUND, так что клики пользователей идут первыми.
+    """
+
+    def __init__(self, interval: float | None = None, budget_share: float = BUDGET_SHARE,
+                 concurrency: int = POLL_CONCURRENCY, get_price=None):
+        # None — из окружения в момент опроса: модуль импортируется раньше load_dotenv().
+        self.interval = interval
+        self.budget_share = budget_share
+        self.budget_rate = None
+        self._get_price = get_price or price_cache.get_price
+        self._groups = {}           # (name, currency) -> WatchGroup
+        self._by_user = {}          # user_id -> [Watch]
+        self._heap = []
+        self._seq = itertools.count()
+        self._slots = asyncio.Semaphore(concurrency)
+        self._wakeup = None
+        self._notify = None
+        self._tasks = set()
+        self._owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+        self._leader = False
+        self._counters = {"polls": 0, "notifications": 0, "failed_polls": 0}
+
+    def __len__(self):
+        return sum(len(watches) for watches in self._by_user.values())
+
+    def effective_interval(self) -> float:
+        interval = self.interval or watch_interval()
+        budget_rate = self.budget_rate or host_limit("steamcommunity.com")[0] * self.budget_share
+        return max(interval, len(self._groups) / budget_rate)
+
+    # --- подписки ---
+
+    async def user_watches(self, user_id: int) -> list:
+        try:
+            rows = storage.unpack(await storage.get_store().get(_user_key(user_id))) or []
+        except Exception as e:
+            logging.error(f"Failed to load price watches of {user_id}: {e}")
+            return []
+        return [Watch(*row) for row in rows]
+
+    async def _store_user(self, user_id: int, watches: list) -> None:
+        store = storage.get_store()
+        if watches:
+            await store.set(_user_key(user_id), storage.pack([watch.row() for watch in watches]))
+            await store.add_member(USERS_KEY, str(user_id))
+        else:
+            await store.delete(_user_key(user_id))
+            await store.remove_member(USERS_KEY, str(user_id))
+
+    async def add(self, watch: Watch) -> None:
+        watches = await self.user_watches(watch.user_id)
+        await self._store_user(watch.user_id, watches + [watch])
+        if self._leader:
+            self._add_local(watch)
+
+    async def remove(self, watch: Watch) -> None:
+        watches = await self.user_watches(watch.user_id)
+        await self._store_user(watch.user_id, [other for other in watches if other != watch])
+        self._remove_local(watch)
+
+    def _add_local(self, watch: Watch) -> None:
+        self._by_user.setdefault(watch.user_id, []).append(watch)
+        key = (watch.name, watch.currency)
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = WatchGroup()
+            self._schedule(key, group, time.monotonic())
+        group.watches.append(watch)
+
+    def _remove_local(self, watch: Watch) -> None:
+        user_watches = self._by_user.get(watch.user_id, [])
+        if watch in user_watches:
+            user_watches.remove(watch)
+            if not user_watches:
+                del self._by_user[watch.user_id]
+        key = (watch.name, watch.currency)
+        group = self._groups.get(key)
+        if group is not None and watch in group.watches:
+            group.watches.remove(watch)
+            if not group.watches:
+                # Запись в куче останется и будет пропущена при извлечении.
+                del self._groups[key]
+
+    def _schedule(self, key, group: WatchGroup, due: float) -> None:
+        group.due = due
+        heapq.heappush(self._heap, (due, next(self._seq), key))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # --- цикл ---
+
+    async def start(self, notify) -> None:
+        """
+        notify(user_id, text) — корутина отправки уведомления.
+        """
+        self._notify = notify
+        self._wakeup = asyncio.Event()
+        await self._migrate()
+        await self._sync()
+        for coro in (self._run(), self._sync_loop()):
+            task = asyncio.create_task(coro)
+            self._tasks.add(task)
+        role = "polling" if self._leader else "standby"
+        logging.info(f"Price watch scheduler started ({role}): {len(self)} watches, {len(self._groups)} items.")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks.clear()
+        if self._leader:
+            # Отпускаем аренду сразу, чтобы другой воркер не ждал LEASE_TTL.
+            try:
+                await storage.get_store().delete(LEASE_KEY)
+            except Exception as e:
+                logging.warning(f"Failed to release price watch lease: {e}")
+            self._leader = False
+
+    async def _run(self) -> None:
+        while True:
+            if not self._heap:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            due, _, key = self._heap[0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            heapq.heappop(self._heap)
+            group = self._groups.get(key)
+            if group is None or group.due != due:
+                continue
+            group.due = None
+
+            await self._slots.acquire()
+            task = asyncio.create_task(self._poll(key))
+            self._tasks.add(task)
+            task.add_done_callback(self._poll_done)
+
+    def _poll_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        self._slots.release()
+
+    async def _poll(self, key) -> None:
+        name, currency = key
+        self._counters["polls"] += 1
+        try:
+            quote = await self._get_price(name, currency, priority=BACKGROUND)
+        except Exception as e:
+            logging.error(f"Price watch poll failed for {name}: {e}")
+            quote = None
+
+        price = quote.lowest if quote is not None else None
+        group = self._groups.get(key)
+        if group is None:
+            return
+
+        if price is None:
+            self._counters["failed_polls"] += 1
+        else:
+            fired = [watch for watch in group.watches if watch.triggered(price)]
+            for watch in fired:
+                try:
+                    await self.remove(watch)
+                except Exception as e:
+                    # Не удалось убрать из хранилища — не шлём, иначе уведомление повторится.
+                    logging.error(f"Failed to remove fired price watch of {watch.user_id}: {e}")
+                    fired = [other for other in fired if other is not watch]
+            await self._fan_out(fired, price)
+
+        group = self._groups.get(key)
+        if group is not None and group.due is None:
+            self._schedule(key, group, time.monotonic() + self.effective_interval())
+
+    async def _fan_out(self, fired: list, price: int) -> None:
+        for watch in fired:
+            arrow = "📉" if watch.direction == BELOW else "📈"
+            text = (f"{arrow} <b>{html.escape(watch.name)}</b>\n"
+                    f"Lowest price is now {html.escape(format_price(price, watch.currency))} "
+                    f"(your alert: {watch.describe()}).")
+            try:
+                await self._notify(watch.user_id, text)
+                self._counters["notifications"] += 1
+            except Exception as e:
+                logging.warning(f"Failed to notify {watch.user_id} about {watch.name}: {e}")
+
+    # --- хранилище ---
+
+    async def _migrate(self) -> None:
+        """
+        Переносит подписки из старого общего списка в ключи пользователей.
+        """
+        store = storage.get_store()
+        try:
+            rows = storage.unpack(await store.get(LEGACY_KEY))
+            if not rows:
+                return
+            by_user = {}
+            for row in rows:
+                by_user.setdefault(row[0], []).append(Watch(*row))
+            for user_id, watches in by_user.items():
+                current = await self.user_watches(user_id)
+                await self._store_user(user_id, current + [w for w in watches if w not in current])
+            await store.delete(LEGACY_KEY)
+            logging.info(f"Migrated {len(rows)} price watches to per-user keys.")
+        except Exception as e:
+            logging.error(f"Failed to migrate price watches: {e}")
+
+    async def _sync(self) -> None:
+        """
+        Продлевает (или перехватывает) аренду; владелец перечитывает все подписки,
+        чтобы видеть изменения, сделанные на других воркерах.
+        """
+        store = storage.get_store()
+        try:
+            leader = await store.claim(LEASE_KEY, self._owner, LEASE_TTL)
+        except Exception as e:
+            logging.error(f"Failed to renew price watch lease: {e}")
+            leader = False
+        if not leader:
+            if self._leader:
+                logging.info("Price watch lease lost, polling stops on this worker.")
+                self._leader = False
+                self._groups, self._by_user, self._heap = {}, {}, []
+            return
+        if not self._leader:
+            logging.info("Price watch lease acquired, polling on this worker.")
+            self._leader = True
+
+        try:
+            users = await store.members(USERS_KEY)
+            rows = await asyncio.gather(*(store.get(_user_key(user_id)) for user_id in users))
+        except Exception as e:
+            logging.error(f"Failed to load price watches: {e}")
+            return
+
+        previous = self._groups
+        self._groups, self._by_user = {}, {}
+        for data in rows:
+            for row in storage.unpack(data) or []:
+                watch = Watch(*row)
+                self._by_user.setdefault(watch.user_id, []).append(watch)
+                self._groups.setdefault((watch.name, watch.currency), WatchGroup()).watches.append(watch)
+        now = time.monotonic()
+        for key, group in self._groups.items():
+            old = previous.get(key)
+            if old is None:
+                self._schedule(key, group, now)
+            else:
+                # Запись кучи (due, seq, key) остаётся действительной; None — проверка идёт.
+                group.due = old.due
+
+    async def _sync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(SYNC_INTERVAL)
+            await self._sync()
+
+    def stats(self) -> dict:
+        return {**self._counters, "watches": len(self), "items": len(self._groups),
+                "heap": len(self._heap), "interval": self.effective_interval(), "leader": int(self._leader)}
+
+
+watch_scheduler = WatchScheduler()
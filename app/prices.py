@@ -0,0 +1,120 @@
+import re
+
+
+PRICE_NUMBER_RE = re.compile(r"\d[\d\s.,']*")
+
+
+class Currency:
+    __slots__ = ("id", "code", "symbol", "suffix")
+
+    def __init__(self, currency_id: int, code: str, symbol: str, suffix: bool = False):
+        self.id = currency_id      # ECurrencyCode Steam (параметр currency= в priceoverview)
+        self.code = code
+        self.symbol = symbol
+        self.suffix = suffix       # символ после числа: "12,34€"
+
+
+CURRENCIES = {currency.id: currency for currency in (
+    Currency(1, "USD", "$"),
+    Currency(2, "GBP", "£"),
+    Currency(3, "EUR", "€", suffix=True),
+    Currency(5, "RUB", " ₽", suffix=True),
+    Currency(6, "PLN", "zł", suffix=True),
+    Currency(7, "BRL", "R$ "),
+    Currency(17, "TRY", " TL", suffix=True),
+    Currency(18, "UAH", "₴", suffix=True),
+    Currency(20, "CAD", "CDN$ "),
+    Currency(21, "AUD", "A$ "),
+    Currency(23, "CNY", "¥ "),
+    Currency(24, "INR", "₹ "),
+    Currency(37, "KZT", "₸", suffix=True),
+)}
+DEFAULT_CURRENCY = 1
+
+
+def get_currency(currency_id: int) -> Currency:
+    return CURRENCIES.get(currency_id) or CURRENCIES[DEFAULT_CURRENCY]
+
+
+def find_currency(code: str) -> Currency | None:
+    code = code.strip().upper()
+    return next((currency for currency in CURRENCIES.values() if currency.code == code), None)
+
+
+def parse_price(text: str | None) -> int | None:
+    """
+    Переводит строку цены Steam ("$1,234.56", "1 234,56€") в целые минорные единицы (центы).
+    Возвращает None, если цену разобрать не удалось.
+    """
+    if not text:
+        return None
+    match = PRICE_NUMBER_RE.search(text)
+    if not match:
+        return None
+
+    number = re.sub(r"[\s']", "", match.group()).rstrip(".,")
+    last_sep = max(number.rfind("."), number.rfind(","))
+    # Разделитель считается десятичным, если после него 1-2 цифры.
+    if last_sep != -1 and 0 < len(number) - last_sep - 1 <= 2:
+        whole, fraction = number[:last_sep], number[last_sep + 1:]
+    else:
+        whole, fraction = number, ""
+
+    whole = re.sub(r"[.,]", "", whole) or "0"
+    return int(whole) * 100 + int(fraction.ljust(2, "0"))
+
+
+def parse_volume(text) -> int | None:
+    """
+    "1,234" / "1 234" / 1234 -> 1234.
+    """
+    if text is None:
+        return None
+    digits = "".join(ch for ch in str(text) if ch.isdigit())
+    return int(digits) if digits else None
+
+
+def format_price(cents: int | None, currency: int = DEFAULT_CURRENCY) -> str:
+    if cents is None:
+        return "N/A"
+    info = get_currency(currency)
+    number = f"{cents // 100:,}.{cents % 100:02d}"
+    return f"{number}{info.symbol}" if info.suffix else f"{info.symbol}{number}"
+
+
+class PriceQuote:
+    """
+    Цена предмета в одной валюте, уже разобранная в числа:
+    lowest/median — минорные единицы, volume — продаж за 24ч.
+    Строки Steam разбираются один раз — при получении ответа.
+    """
+    __slots__ = ("lowest", "median", "volume", "currency")
+
+    def __init__(self, lowest: int | None, median: int | None, volume: int | None,
+                 currency: int = DEFAULT_CURRENCY):
+        self.lowest = lowest
+        self.median = median
+        self.volume = volume
+        self.currency = currency
+
+    @classmethod
+    def from_steam(cls, data: dict, currency: int = DEFAULT_CURRENCY) -> "PriceQuote":
+        return cls(parse_price(data.get("lowest_price")), parse_price(data.get("median_price")),
+                   parse_volume(data.get("volume")), currency)
+
+    @property
+    def unit(self) -> int | None:
+        """
+        Цена для оценки и сравнений: lowest, а если лотов нет — median.
+        """
+        return self.lowest if self.lowest is not None else self.median
+
+    def to_list(self) -> list:
+        return [self.lowest, self.median, self.volume, self.currency]
+
+    @classmethod
+    def from_list(cls, values: list) -> "PriceQuote":
+        return cls(*values)
+
+    def __repr__(self):
+        return f"PriceQuote({self.lowest!r}, {self.median!r}, {self.volume!r}, currency={self.currency})"
@@ -0,0 +1,243 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from . import http_client
+from . import json_decoder
+from . import metrics
+
+
+# Приоритеты: чем меньше число, тем раньше запрос получит токен.
+INTERACTIVE = 0   # клик пользователя
+BULK = 1          # массовые операции, запущенные пользователем (оценка инвентаря)
+BACKGROUND = 2    # фоновые обновления кешей, поллеры
+
+# host -> (запросов в секунду, размер burst) на весь IP.
+# steamcommunity.com (Market + inventory) режет примерно после 20 запросов в минуту с IP.
+HOST_LIMITS = {
+    "steamcommunity.com": (20 / 60, 5),
+    "api.steampowered.com": (5, 10),
+    "www.valvesoftware.com": (1, 3),
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = {INTERACTIVE: 2, BULK: 4, BACKGROUND: 4}
+BACKOFF_BASE = 2.0
+BACKOFF_CAP = 60.0
+# Клик пользователя не ждёт дольше: при большем Retry-After / паузе хоста
+# запрос сразу возвращает ответ upstream (429), и хендлер просит попробовать позже.
+INTERACTIVE_MAX_WAIT = 3.0
+
+
+def worker_count() -> int:
+    """
+    WORKER_COUNT — сколько процессов бота ходят в Steam с одного IP.
+    Бюджеты токенов живут в памяти процесса, поэтому каждый берёт 1/N лимита.
+    """
+    try:
+        return max(1, int(os.getenv("WORKER_COUNT", "1")))
+    except ValueError:
+        return 1
+
+
+def host_limit(host: str) -> tuple | None:
+    """
+    (запросов в секунду, burst) для этого процесса или None, если хост не лимитирован.
+    """
+    if host not in HOST_LIMITS:
+        return None
+    rate, capacity = HOST_LIMITS[host]
+    workers = worker_count()
+    return rate / workers, max(1.0, capacity / workers)
+
+
+class TokenBucket:
+    """
+    Token bucket с очередью ожидающих по приоритету.
+    Свободный токен сначала получает запрос с наименьшим приоритетом,
+    при равных — тот, кто пришёл раньше.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._drainer = None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def paused_for(self) -> float:
+        return max(0.0, self._paused_until - time.monotonic())
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def pause(self, delay: float) -> None:
+        """
+        Upstream попросил подождать (429 / Retry-After) — не выдаём токены никому.
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    async def acquire(self, priority: int = INTERACTIVE) -> None:
+        self._refill()
+        if not self._waiters and self._tokens >= 1 and time.monotonic() >= self._paused_until:
+            self._tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if self._drainer is None or self._drainer.done():
+            self._drainer = asyncio.create_task(self._drain())
+        await future
+
+    async def _drain(self) -> None:
+        while self._waiters:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                continue
+
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                # Ожидающий уже отменён.
+                continue
+            self._tokens -= 1
+            future.set_result(None)
+
+
+_buckets = {}
+
+
+def get_bucket(url: str) -> TokenBucket | None:
+    host = urlsplit(url).hostname
+    bucket = _buckets.get(host)
+    if bucket is None:
+        limit = host_limit(host)
+        if limit is not None:
+            bucket = _buckets[host] = TokenBucket(*limit)
+    return bucket
+
+
+def queue_depths() -> dict:
+    return {host: bucket.queue_depth for host, bucket in _buckets.items()}
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Retry-After бывает числом секунд или HTTP-датой.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Экспоненциальный backoff с full jitter.
+    """
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+async def fetch(url: str, *, params: dict | None = None, headers: dict | None = None,
+                priority: int = INTERACTIVE, timeout: aiohttp.ClientTimeout | None = None) -> tuple:
+    """
+    Единая точка для всех исходящих GET-запросов к Steam/Valve/GitHub.
+
+    Ждёт токен своего хоста (с учётом приоритета), на 429/5xx повторяет запрос,
+    соблюдая Retry-After или jittered backoff. INTERACTIVE-запрос не ждёт
+    дольше INTERACTIVE_MAX_WAIT: вместо этого возвращается 429/5xx как есть
+    (если хост на паузе — 429 без обращения к нему).
+    Возвращает (status, response_headers, body: bytes).
+    """
+    bucket = get_bucket(url)
+    max_retries = MAX_RETRIES.get(priority, MAX_RETRIES[BACKGROUND])
+    session = http_client.get_session()
+    host = urlsplit(url).hostname
+
+    attempt = 0
+    while True:
+        if bucket is not None:
+            paused = bucket.paused_for()
+            if priority == INTERACTIVE and paused > INTERACTIVE_MAX_WAIT:
+                logging.warning(f"{host}: paused for {paused:.0f}s, failing interactive request fast")
+                return 429, {"Retry-After": str(round(paused))}, b""
+            queued = time.perf_counter()
+            await bucket.acquire(priority)
+            metrics.upstream_queue_seconds.observe(time.perf_counter() - queued, host)
+
+        kwargs = {"params": params, "headers": headers}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+
+        started = time.perf_counter()
+        try:
+            async with session.get(url, **kwargs) as response:
+                status = response.status
+                metrics.upstream_responses.inc(host, status)
+                delay = None
+                if status in RETRY_STATUSES:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    delay = retry_after if retry_after is not None else backoff_delay(attempt)
+                    if bucket is not None and status == 429:
+                        # Лимит общий для хоста — притормаживаем всех, а не только этот запрос.
+                        bucket.pause(delay)
+                if (delay is None or attempt >= max_retries
+                        or (priority == INTERACTIVE and delay > INTERACTIVE_MAX_WAIT)):
+                    body = await response.read()
+                    metrics.upstream_seconds.observe(time.perf_counter() - started, host)
+                    return status, response.headers, body
+        except Exception:
+            metrics.upstream_errors.inc(host)
+            raise
+        metrics.upstream_seconds.observe(time.perf_counter() - started, host)
+
+        logging.warning(f"{host}: status {status}, retry {attempt + 1}/{max_retries} "
+                        f"in {delay:.1f}s")
+        if bucket is None or status != 429:
+            await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def fetch_json(url: str, *, params: dict | None = None, priority: int = INTERACTIVE,
+                     timeout: aiohttp.ClientTimeout | None = None, reducer=None) -> tuple[int, object]:
+    """
+    fetch() + разбор JSON через json_decoder (большие тела — вне event loop).
+    Возвращает (status, data); data — разобранный JSON (или reducer(JSON))
+    при статусе 200, иначе None.
+    """
+    status, _, body = await fetch(url, params=params, priority=priority, timeout=timeout)
+    if status != 200:
+        return status, None
+    return status, await json_decoder.decode(body, reducer)
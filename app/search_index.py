@@ -0,0 +1,538 @@
+import re
+import heapq
+import itertools
+from array import array
+from collections import defaultdict
+from bisect import bisect_left
+
+from . import item_snapshot
+
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Автодополнение: для всех префиксов слов длиной до COMPLETION_PREFIX_LEN
+# заранее сохраняется COMPLETION_DEPTH лучших позиций.
+COMPLETION_PREFIX_LEN = 3
+COMPLETION_DEPTH = 100
+# Префиксный уровень: для коротких префиксов с большим диапазоном имён
+# позиции по рангу хранятся заранее, остальные диапазоны упорядочиваются кучей.
+PREFIX_TABLE_LEN = 3
+PREFIX_TABLE_MIN = 256
+
+# Фасетные фильтры распознаются прямо в тексте запроса ("AK-47 Factory New covert").
+# Поле -> приоритет при совпадении фразы сразу в нескольких полях.
+FACET_FIELDS = ("weapon", "type", "rarity", "wear", "category", "collection")
+MAX_PHRASE_TOKENS = 6
+# Типы по префиксу id ByMykel; фильтром считаются только эти слова,
+# чтобы "key" или "patch" в названии не превращались в фильтр.
+TYPE_WORDS = {
+    "skin": "skin", "skins": "skin",
+    "sticker": "sticker", "stickers": "sticker",
+    "agent": "agent", "agents": "agent",
+    "crate": "crate", "crates": "crate", "case": "crate", "cases": "crate",
+}
+WEAR_ALIASES = {"fn": "Factory New", "mw": "Minimal Wear", "ft": "Field-Tested",
+                "ww": "Well-Worn", "bs": "Battle-Scarred"}
+# Нечёткий поиск (symmetric delete): для слов словаря заранее сохранены
+# варианты с одной удалённой буквой; опечатка ищется теми же удалениями в запросе.
+FUZZY_MIN_LEN = 4           # короче — опечатки не исправляются
+FUZZY_CANDIDATES = 8        # вариантов слова на одно слово запроса
+FUZZY_SCAN = 2000           # позиций, просматриваемых на один запрос
+FUZZY_RESULTS = 200
+
+FLAG_WORDS = {"stattrak": item_snapshot.STATTRAK, "souvenir": item_snapshot.SOUVENIR}
+
+
+def normalize(text: str) -> str:
+    """
+    Приводит строку к виду, по которому строится индекс:
+    нижний регистр и схлопнутые пробелы.
+    """
+    return " ".join(text.lower().split())
+
+
+def tokenize(text: str) -> list:
+    return TOKEN_RE.findall(text)
+
+
+class SearchIndex:
+    """
+    Заранее построенный индекс по именам предметов.
+    Строится один раз при загрузке базы, дальше поиск не трогает item_database.
+
+    Ранжирование: точное совпадение > префикс > все слова запроса > подстрока,
+    внутри уровня короткие имена идут первыми.
+    """
+
+    def __init__(self, items: dict):
+        # Позиции присваиваются в порядке (длина имени, порядок в базе), поэтому
+        # отсортированные posting-листы уже идут по рангу и поиск может
+        # остановиться на первых `limit` совпадениях.
+        entries = sorted(
+            ((normalize(item.get('name', '')), order, item) for order, item in enumerate(items.values())),
+            key=lambda entry: (len(entry[0]), entry[1])
+        )
+        self._items = [item for _, _, item in entries]
+        self._names = [name for name, _, _ in entries]
+        self._token_texts = []
+
+        self._exact = {}
+        tokens = defaultdict(list)
+        trigrams = defaultdict(list)
+
+        for pos, name in enumerate(self._names):
+            self._exact.setdefault(name, []).append(pos)
+
+            name_tokens = tokenize(name)
+            self._token_texts.append(" " + " ".join(name_tokens))
+            for token in set(name_tokens):
+                tokens[token].append(pos)
+
+            for gram in {name[i:i + 3] for i in range(len(name) - 2)}:
+                trigrams[gram].append(pos)
+
+        # Списки только на время сборки, храним компактные массивы.
+        self._tokens = {token: array('I', positions) for token, positions in tokens.items()}
+        self._vocabulary = sorted(self._tokens)
+        self._trigrams = {gram: array('I', positions) for gram, positions in trigrams.items()}
+        by_name = sorted(range(len(self._names)), key=self._names.__getitem__)
+        self._sorted_names = [self._names[pos] for pos in by_name]
+        self._sorted_positions = array('I', by_name)
+        self._build_prefix_table()
+        self._completions = self._build_completions()
+        self._build_deletes()
+        self._build_facets()
+
+    def __len__(self):
+        return len(self._names)
+
+    def describe(self) -> str:
+        return (f"{len(self._names)} names, {len(self._tokens)} tokens, "
+                f"{len(self._trigrams)} trigrams, {len(self._bitmaps)} facet bitmaps")
+
+    def search(self, query: str, limit: int = 15) -> list:
+        """
+        Возвращает до `limit` предметов, отсортированных по релевантности.
+        """
+        query = normalize(query)
+        if not query or limit <= 0:
+            return []
+
+        found = []
+        seen = set()
+
+        def take(positions):
+            for pos in positions:
+                if pos not in seen:
+                    seen.add(pos)
+                    found.append(pos)
+                    if len(found) >= limit:
+                        return True
+            return False
+
+        for tier in (self._exact.get(query, ()),
+                     self._prefix_matches(query),
+                     self._token_matches(query),
+                     self._substring_matches(query)):
+            if take(tier):
+                break
+
+        if not found:
+            found = self._fuzzy_matches(query)[:limit]
+
+        return [self._items[pos] for pos in found]
+
+    def find(self, query: str, offset: int = 0, limit: int = 10) -> tuple:
+        """
+        Поиск с фасетными фильтрами и страницами: (предметы, есть ли ещё).
+        Фильтры извлекаются из запроса (parse_filters), остаток ищется по имени
+        так же, как в search(); без остатка — все предметы фильтра по рангу.
+        Если фильтры ничего не дали, запрос ищется целиком как имя.
+        """
+        if offset < 0 or limit <= 0:
+            return [], False
+        text, filters = self.parse_filters(query)
+        stream = _nonempty(self._filtered(text, filters)) if filters else None
+        if stream is None:
+            stream = self._matches(normalize(query))
+        positions = list(itertools.islice(stream, offset, offset + limit + 1))
+        return [self._items[pos] for pos in positions[:limit]], len(positions) > limit
+
+    def _filtered(self, text: str, filters: dict):
+        bitmap = self.filter_bitmap(filters)
+        if not text:
+            return _bit_positions(bitmap, len(self._names))
+        flags = bitmap.to_bytes((len(self._names) + 7) // 8, "little")
+        return (pos for pos in self._matches(text) if flags[pos >> 3] >> (pos & 7) & 1)
+
+    def _matches(self, query: str):
+        """
+        Точные уровни ранга, а если они пусты — нечёткие совпадения.
+        """
+        stream = _nonempty(self._ranked(query))
+        return stream if stream is not None else iter(self._fuzzy_matches(query))
+
+    def parse_filters(self, query: str) -> tuple:
+        """
+        "AK-47 Factory New covert" -> ("", {"weapon": "AK-47", "wear": "Factory New", "rarity": "Covert"}).
+        Фразы сопоставляются жадно, самые длинные первыми; флаги — под ключом "flags".
+        """
+        tokens = tokenize(normalize(query))
+        rest = []
+        filters = {}
+        i = 0
+        while i < len(tokens):
+            for length in range(min(MAX_PHRASE_TOKENS, len(tokens) - i), 0, -1):
+                match = self._phrases.get(tuple(tokens[i:i + length]))
+                if match is not None and match[0] not in filters:
+                    field, value = match
+                    filters[field] = value
+                    i += length
+                    break
+                if length == 1 and tokens[i] in FLAG_WORDS:
+                    filters["flags"] = filters.get("flags", 0) | FLAG_WORDS[tokens[i]]
+                    i += 1
+                    break
+            else:
+                rest.append(tokens[i])
+                i += 1
+        return " ".join(rest), filters
+
+    def filter_bitmap(self, filters: dict) -> int:
+        """
+        Пересечение битовых карт фильтров (бит = позиция в индексе).
+        """
+        bitmap = self._all
+        for field, value in filters.items():
+            if field == "flags":
+                for flag in (item_snapshot.STATTRAK, item_snapshot.SOUVENIR):
+                    if value & flag:
+                        bitmap &= self._bitmaps.get(("flags", flag), 0)
+            else:
+                bitmap &= self._bitmaps.get((field, value), 0)
+        return bitmap
+
+    def _ranked(self, query: str):
+        """
+        Все совпадения по уровням ранга без ограничения — для постраничной выдачи.
+        """
+        if not query:
+            return
+        seen = set()
+        for tier in (self._exact.get(query, ()),
+                     self._prefix_matches(query),
+                     self._token_matches(query),
+                     self._substring_matches(query)):
+            for pos in tier:
+                if pos not in seen:
+                    seen.add(pos)
+                    yield pos
+
+    def _build_deletes(self) -> None:
+        deletes = defaultdict(list)
+        for word_id, word in enumerate(self._vocabulary):
+            if len(word) < FUZZY_MIN_LEN or word.isdigit():
+                continue
+            for variant in _deletes(word):
+                deletes[variant].append(word_id)
+        self._deletes = {variant: array('I', ids) for variant, ids in deletes.items()}
+
+    def _similar_words(self, token: str, last: bool) -> dict:
+        """
+        Слова словаря, похожие на token: {слово: расстояние}.
+        Кандидаты — слова с общим вариантом после одного удаления, поэтому
+        находится любая одна правка (замена, вставка, удаление, перестановка
+        соседних букв). Для слов длиннее 7 букв принимаются и две правки, но
+        только те, что сводятся к общему удалению (лишняя буква в одном месте
+        и пропущенная в другом); замена плюс перестановка не находятся —
+        удаления второго уровня раздули бы таблицу в разы.
+        Последнее слово запроса может быть недописанным — его префиксы тоже подходят.
+        """
+        words = {}
+        if token in self._tokens:
+            words[token] = 0
+        if last:
+            for word in self._vocabulary_range(token)[:FUZZY_CANDIDATES]:
+                words.setdefault(word, 0)
+        if len(token) < FUZZY_MIN_LEN or token.isdigit():
+            return words
+
+        max_distance = 1 if len(token) <= 7 else 2
+        candidates = set()
+        for variant in (token, *_deletes(token)):
+            for word_id in self._deletes.get(variant, ()):
+                candidates.add(self._vocabulary[word_id])
+            if variant in self._tokens:
+                candidates.add(variant)
+        scored = []
+        for word in candidates:
+            if word not in words:
+                distance = edit_distance(token, word, max_distance)
+                if distance <= max_distance:
+                    scored.append((distance, -len(self._tokens[word]), word))
+        for distance, _, word in sorted(scored)[:FUZZY_CANDIDATES]:
+            words[word] = distance
+        return words
+
+    def _split_word(self, token: str) -> tuple:
+        """
+        Слитно набранное имя с дефисом: "ak47" -> ("ak", "47"), "usps" -> ("usp", "s").
+        """
+        if token in self._tokens:
+            return (token,)
+        for i in range(1, len(token)):
+            if token[:i] in self._tokens and token[i:] in self._tokens:
+                return token[:i], token[i:]
+        return (token,)
+
+    def _fuzzy_matches(self, query: str) -> list:
+        """
+        Предметы, в имени которых для каждого слова запроса есть слово с опечаткой
+        не больше допустимой. Ранг — сумма расстояний, затем обычный порядок позиций.
+        Стоимость ограничена: FUZZY_CANDIDATES слов на слово запроса
+        и FUZZY_SCAN просмотренных позиций.
+        """
+        query_tokens = []
+        for token in tokenize(query):
+            query_tokens.extend(self._split_word(token))
+        query_tokens = list(dict.fromkeys(query_tokens))[:MAX_PHRASE_TOKENS]
+        if not query_tokens:
+            return []
+        similar = [self._similar_words(token, i == len(query_tokens) - 1)
+                   for i, token in enumerate(query_tokens)]
+        # Короткое нераспознанное слово ("ft", опечатка в "web") не обнуляет запрос.
+        similar = [words for token, words in zip(query_tokens, similar)
+                   if words or len(token) >= FUZZY_MIN_LEN]
+        if not similar or not all(similar):
+            return []
+
+        driver = min(range(len(similar)), key=lambda i: sum(len(self._tokens[w]) for w in similar[i]))
+        driver_words = similar[driver]
+        others = [words for i, words in enumerate(similar) if i != driver]
+
+        # Для каждого остального слова — варианты " слово " по возрастанию расстояния.
+        needles = [sorted(((f" {word} ", distance) for word, distance in words.items()), key=lambda n: n[1])
+                   for words in others]
+        scores = {}
+        budget = FUZZY_SCAN
+        for word, distance in sorted(driver_words.items(), key=lambda entry: entry[1]):
+            for pos in self._tokens[word][:budget]:
+                if pos in scores and scores[pos] <= distance:
+                    continue
+                text = self._token_texts[pos] + " "
+                total = distance
+                for variants in needles:
+                    best = next((d for needle, d in variants if needle in text), None)
+                    if best is None:
+                        break
+                    total += best
+                else:
+                    if total < scores.get(pos, total + 1):
+                        scores[pos] = total
+            budget -= len(self._tokens[word])
+            if budget <= 0:
+                break
+        return sorted(scores, key=lambda pos: (scores[pos], pos))[:FUZZY_RESULTS]
+
+    def _build_facets(self) -> None:
+        """
+        Битовая карта (int) на каждое значение фасета: пересечение фильтров —
+        несколько побитовых AND над числами в пару килобайт.
+        """
+        size = len(self._names)
+        members = defaultdict(list)
+        for pos, item in enumerate(self._items):
+            facets, flags = item_snapshot.facets_of(item)
+            for field in FACET_FIELDS:
+                if facets.get(field):
+                    members[(field, facets[field])].append(pos)
+            for flag in (item_snapshot.STATTRAK, item_snapshot.SOUVENIR):
+                if flags & flag:
+                    members[("flags", flag)].append(pos)
+
+        self._all = (1 << size) - 1
+        self._bitmaps = {}
+        for key, positions in members.items():
+            bits = bytearray((size + 7) // 8)
+            for pos in positions:
+                bits[pos >> 3] |= 1 << (pos & 7)
+            self._bitmaps[key] = int.from_bytes(bits, "little")
+
+        self._phrases = {}
+        for field in reversed(FACET_FIELDS):
+            for key_field, value in self._bitmaps:
+                if key_field != field:
+                    continue
+                phrase = tuple(tokenize(normalize(value)))
+                if phrase:
+                    self._phrases[phrase] = (field, value)
+                if field == "rarity" and len(phrase) > 1 and phrase[-1] == "grade":
+                    self._phrases[phrase[:-1]] = (field, value)
+        for word, value in TYPE_WORDS.items():
+            if ("type", value) in self._bitmaps:
+                self._phrases[(word,)] = ("type", value)
+        for word, value in WEAR_ALIASES.items():
+            if ("wear", value) in self._bitmaps:
+                self._phrases[(word,)] = ("wear", value)
+        # Тип фильтруется только словами из TYPE_WORDS.
+        self._phrases = {phrase: match for phrase, match in self._phrases.items()
+                         if match[0] != "type" or phrase[0] in TYPE_WORDS}
+
+    def complete(self, query: str, offset: int = 0, limit: int = 20) -> list:
+        """
+        Автодополнение для inline-режима: те же результаты, что и search(),
+        но для коротких префиксов слов (набор первых букв) первые
+        COMPLETION_DEPTH позиций ранжированной выдачи посчитаны заранее.
+        """
+        query = normalize(query)
+        end = min(offset + limit, COMPLETION_DEPTH)
+        if not query or offset >= end:
+            return []
+
+        positions = self._completions.get(query)
+        if positions is not None:
+            return [self._items[pos] for pos in positions[offset:end]]
+        return self.search(query, limit=end)[offset:]
+
+    def _build_completions(self) -> dict:
+        # Через _ranked: тот же порядок уровней, что и у search().
+        prefixes = {word[:length] for word in self._vocabulary
+                    for length in range(1, min(len(word), COMPLETION_PREFIX_LEN) + 1)}
+        return {prefix: array('I', itertools.islice(self._ranked(prefix), COMPLETION_DEPTH))
+                for prefix in prefixes}
+
+    def _build_prefix_table(self) -> None:
+        prefixes = defaultdict(list)
+        for pos, name in enumerate(self._names):
+            for length in range(1, min(len(name), PREFIX_TABLE_LEN) + 1):
+                prefixes[name[:length]].append(pos)
+        self._prefix_table = {prefix: array('I', positions) for prefix, positions in prefixes.items()
+                              if len(positions) >= PREFIX_TABLE_MIN}
+
+    def _prefix_matches(self, query: str):
+        positions = self._prefix_table.get(query)
+        if positions is not None:
+            yield from positions
+            return
+        # Имена с префиксом — непрерывный диапазон в алфавитном порядке;
+        # по рангу (позиции) его выдаёт куча, не сортируя весь диапазон заранее.
+        start = bisect_left(self._sorted_names, query)
+        end = bisect_left(self._sorted_names, query + "\U0010ffff", start)
+        heap = self._sorted_positions[start:end].tolist()
+        heapq.heapify(heap)
+        while heap:
+            yield heapq.heappop(heap)
+
+    def _vocabulary_range(self, prefix: str) -> list:
+        """
+        Слова словаря, начинающиеся с `prefix`.
+        """
+        vocabulary = self._vocabulary
+        i = bisect_left(vocabulary, prefix)
+        words = []
+        while i < len(vocabulary) and vocabulary[i].startswith(prefix):
+            words.append(vocabulary[i])
+            i += 1
+        return words
+
+    def _token_matches(self, query: str):
+        query_tokens = set(tokenize(query))
+        if not query_tokens:
+            return
+
+        ranges = {token: self._vocabulary_range(token) for token in query_tokens}
+        # Ведущее слово — то, у которого меньше всего кандидатов.
+        driver = min(query_tokens, key=lambda t: sum(len(self._tokens[w]) for w in ranges[t]))
+        others = [" " + token for token in query_tokens if token != driver]
+
+        postings = [self._tokens[word] for word in ranges[driver]]
+        stream = postings[0] if len(postings) == 1 else heapq.merge(*postings)
+
+        token_texts = self._token_texts
+        previous = -1
+        for pos in stream:
+            if pos == previous:
+                continue
+            previous = pos
+            text = token_texts[pos]
+            if all(token in text for token in others):
+                yield pos
+
+    def _substring_matches(self, query: str):
+        names = self._names
+
+        if len(query) < 3:
+            # Триграмм нет: ищем по словарю слов, он на порядки меньше базы.
+            postings = [self._tokens[token] for token in self._vocabulary if query in token]
+            previous = -1
+            for pos in heapq.merge(*postings):
+                if pos != previous and query in names[pos]:
+                    yield pos
+                previous = pos
+            return
+
+        postings = []
+        for gram in {query[i:i + 3] for i in range(len(query) - 2)}:
+            posting = self._trigrams.get(gram)
+            if posting is None:
+                return
+            postings.append(posting)
+
+        for pos in min(postings, key=len):
+            if query in names[pos]:
+                yield pos
+
+
+def _bit_positions(bitmap: int, size: int, chunk: int = 512):
+    """
+    Номера установленных битов по возрастанию (то есть по рангу).
+    Карта разбирается кусками по `chunk` байт, чтобы первая страница
+    не требовала обхода всей карты.
+    """
+    data = bitmap.to_bytes((size + 7) // 8, "little")
+    for start in range(0, len(data), chunk):
+        value = int.from_bytes(data[start:start + chunk], "little")
+        if not value:
+            continue
+        base = start * 8
+        bits = bin(value)[:1:-1]
+        pos = bits.find("1")
+        while pos != -1:
+            yield base + pos
+            pos = bits.find("1", pos + 1)
+
+
+def _nonempty(stream):
+    """
+    Тот же поток позиций, если в нём что-то есть, иначе None.
+    Первый элемент уже вычислен — поток не строится заново.
+    """
+    first = next(stream, None)
+    return None if first is None else itertools.chain((first,), stream)
+
+
+def _deletes(word: str) -> set:
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Расстояние Дамерау-Левенштейна (перестановка соседних букв — одна правка).
+    Возвращает limit + 1, как только расстояние точно больше limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
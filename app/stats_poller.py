@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+from . import valve_stats_api
+from .request_scheduler import BACKGROUND
+
+
+# Статистика Steam опрашивается в фоне, хендлер "Server Stats" читает её из памяти:
+# сколько бы пользователей ни жали кнопку, к Valve уходит один запрос в POLL_INTERVAL.
+POLL_INTERVAL = 60       # сек
+HISTORY_SIZE = 60        # последних замеров в кольцевом буфере (час при интервале в минуту)
+
+# (time.time(), online, in_game); deque с maxlen сам выбрасывает старые замеры.
+_samples = deque(maxlen=HISTORY_SIZE)
+_task = None
+
+
+async def poll_once() -> bool:
+    counts = await valve_stats_api.fetch_online_counts(priority=BACKGROUND)
+    if counts is None:
+        return False
+    _samples.append((time.time(), counts["online"], counts["in_game"]))
+    return True
+
+
+async def _poll_loop(interval: float) -> None:
+    while True:
+        try:
+            await poll_once()
+        except Exception as e:
+            logging.error(f"Server stats poll failed: {e}")
+        await asyncio.sleep(interval)
+
+
+def start(interval: float | None = None) -> None:
+    """
+    Первый опрос выполняется сразу, дальше — раз в interval секунд.
+    """
+    global _task
+    if interval is None:
+        interval = float(os.getenv("STATS_POLL_INTERVAL", POLL_INTERVAL))
+    if _task is None or _task.done():
+        _task = asyncio.create_task(_poll_loop(interval))
+        logging.info(f"Server stats polling every {interval:.0f}s.")
+
+
+async def stop() -> None:
+    global _task
+    if _task is not None and not _task.done():
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+    _task = None
+
+
+def summary() -> dict | None:
+    """
+    Последний замер и тренд по буферу, без обращений к сети.
+    None — ещё ни одного удачного опроса.
+    """
+    if not _samples:
+        return None
+    updated_at, online, in_game = _samples[-1]
+    first_at, first_online, first_in_game = _samples[0]
+    return {
+        "online": online,
+        "in_game": in_game,
+        "updated_at": updated_at,
+        "peak_online": max(sample[1] for sample in _samples),
+        "peak_in_game": max(sample[2] for sample in _samples),
+        "online_change": online - first_online,
+        "in_game_change": in_game - first_in_game,
+        "window": updated_at - first_at,
+        "samples": len(_samples),
+    }
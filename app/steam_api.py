@@ -1,38 +1,44 @@
 
-import aiohttp
 import logging
 
-async def get_item_price(market_hash_name: str) -> dict | None:
+from . import request_scheduler
+from .price_history import price_history
+from .prices import PriceQuote
+
+PRICE_URL = "https://steamcommunity.com/market/priceoverview/"
+
+async def get_item_price(market_hash_name: str, currency: int = 1,
+                         priority: int = request_scheduler.INTERACTIVE) -> PriceQuote | None:
     """
-    Запрашивает цену предмета с Steam Market.
-    Возвращает словарь с ценами или None в случае ошибки.
+    Запрашивает цену предмета с Steam Market в валюте currency.
+    Возвращает PriceQuote (цены в минорных единицах) или None в случае ошибки.
     """
     
-    url = "https://steamcommunity.com/market/priceoverview/"
     params = {
         "appid": 730,
-        "currency": 1, 
+        "currency": currency,
         "market_hash_name": market_hash_name
     }
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json(content_type=None) 
-                    if data.get("success"):
-                        return data 
-                    else:
-                        logging.warning(f"Steam API success=false для {market_hash_name}")
-                        return None
-                        
-                elif response.status == 429:
-                    logging.warning("Steam API: 429 Too Many Requests.")
-                    return None
-                else:
-                    logging.error(f"Steam API ошибка. Статус: {response.status} для {market_hash_name}")
-                    return None
+        status, data = await request_scheduler.fetch_json(PRICE_URL, params=params, priority=priority)
+        if status == 200:
+            if data and data.get("success"):
+                quote = PriceQuote.from_steam(data, currency)
+                # Только в буфер: запись на диск идёт пачками в фоне.
+                price_history.record(market_hash_name, currency, quote)
+                return quote
+            else:
+                logging.warning(f"Steam API success=false для {market_hash_name}")
+                return None
+                
+        elif status == 429:
+            logging.warning("Steam API: 429 Too Many Requests (retries exhausted).")
+            return None
+        else:
+            logging.error(f"Steam API ошибка. Статус: {status} для {market_hash_name}")
+            return None
     
     except Exception as e:
         logging.error(f"Неизвестная ошибка в steam_api: {e}")
-        return None
\ No newline at end of file
+        return None
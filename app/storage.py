@@ -0,0 +1,370 @@
+import asyncio
+import logging
+import math
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+from .json_decoder import dumps as pack, loads
+
+try:
+    from redis import asyncio as redis_asyncio
+except ImportError:
+    redis_asyncio = None
+
+
+# Общее хранилище ключ-значение для FSM и кешей (цены, инвентари).
+#   memory://                    — в памяти процесса (как раньше, до перезапуска)
+#   sqlite:///.cache/state.db    — локальный файл; несколько воркеров на одной машине
+#   redis://host:6379/0          — несколько машин (нужен пакет redis)
+DEFAULT_URL = "sqlite:///" + os.path.join(".cache", "state.db")
+FSM_TTL = 7 * 24 * 3600     # сек: брошенные диалоги не копятся вечно
+PURGE_EVERY = 1000          # SQLite: чистим протухшие записи раз в N записей
+
+
+def storage_url() -> str:
+    return os.getenv("STORAGE_URL", DEFAULT_URL)
+
+
+def unpack(data: bytes | None) -> Any:
+    return None if data is None else loads(data)
+
+
+class KeyValueStore:
+    """
+    Асинхронное хранилище bytes по строковому ключу с необязательным TTL (сек).
+    """
+
+    async def get(self, key: str) -> bytes | None:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def add_member(self, key: str, member: str) -> None:
+        """
+        Множество строк под ключом: добавление и удаление атомарны,
+        поэтому воркеры не затирают изменения друг друга.
+        """
+        raise NotImplementedError
+
+    async def remove_member(self, key: str, member: str) -> None:
+        raise NotImplementedError
+
+    async def members(self, key: str) -> set:
+        raise NotImplementedError
+
+    async def claim(self, key: str, owner: str, ttl: float) -> bool:
+        """
+        Аренда: ключ занимается, если свободен, протух или уже принадлежит owner
+        (тогда TTL продлевается). True — аренда у owner.
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryStore(KeyValueStore):
+
+    def __init__(self):
+        self._data = {}   # key -> (value, expires_at | None)
+        self._sets = {}
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def add_member(self, key: str, member: str) -> None:
+        self._sets.setdefault(key, set()).add(member)
+
+    async def remove_member(self, key: str, member: str) -> None:
+        self._sets.get(key, set()).discard(member)
+
+    async def members(self, key: str) -> set:
+        return set(self._sets.get(key, ()))
+
+    async def claim(self, key: str, owner: str, ttl: float) -> bool:
+        current = await self.get(key)
+        if current is not None and current != owner.encode():
+            return False
+        await self.set(key, owner.encode(), ttl)
+        return True
+
+
+class SQLiteStore(KeyValueStore):
+    """
+    Таблица kv в одном файле (WAL).
+
+    Запись идёт через отдельный поток (одно соединение): commit может ждать диск.
+    Чтение — через свой поток и своё соединение: в WAL читатель не ждёт писателя,
+    но busy_timeout (чекпойнт, другой воркер держит блокировку) не должен
+    замораживать event loop, а очередь записей — задерживать чтения.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-store")
+        self._read_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-store-read")
+        self._conn = None
+        self._reader = None
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("CREATE TABLE IF NOT EXISTS kv ("
+                     "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL) WITHOUT ROWID")
+        conn.execute("CREATE TABLE IF NOT EXISTS kv_sets ("
+                     "key TEXT NOT NULL, member TEXT NOT NULL, PRIMARY KEY (key, member)) WITHOUT ROWID")
+        return conn
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def _read(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._read_executor, func, *args)
+
+    def _get(self, key: str) -> bytes | None:
+        if self._reader is None:
+            self._reader = self._connect()
+        row = self._reader.execute(
+            "SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and time.time() >= expires_at:
+            return None
+        return value
+
+    def _set(self, key: str, value: bytes, ttl: float | None) -> None:
+        conn = self._connection()
+        expires_at = time.time() + ttl if ttl else None
+        conn.execute("INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                     (key, value, expires_at))
+        self._writes += 1
+        if self._writes % PURGE_EVERY == 0:
+            conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+
+    def _delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def _add_member(self, key: str, member: str) -> None:
+        self._connection().execute("INSERT OR IGNORE INTO kv_sets (key, member) VALUES (?, ?)", (key, member))
+
+    def _remove_member(self, key: str, member: str) -> None:
+        self._connection().execute("DELETE FROM kv_sets WHERE key = ? AND member = ?", (key, member))
+
+    def _members(self, key: str) -> set:
+        if self._reader is None:
+            self._reader = self._connect()
+        return {row[0] for row in self._reader.execute("SELECT member FROM kv_sets WHERE key = ?", (key,))}
+
+    def _claim(self, key: str, owner: str, ttl: float) -> bool:
+        # Один UPSERT: проверка и захват атомарны относительно других воркеров.
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE kv.value = excluded.value OR kv.expires_at < ?",
+            (key, owner.encode(), now + ttl, now))
+        return cursor.rowcount > 0
+
+    def _close_reader(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._read(self._get, key)
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        await self._run(self._set, key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._run(self._delete, key)
+
+    async def add_member(self, key: str, member: str) -> None:
+        await self._run(self._add_member, key, member)
+
+    async def remove_member(self, key: str, member: str) -> None:
+        await self._run(self._remove_member, key, member)
+
+    async def members(self, key: str) -> set:
+        return await self._read(self._members, key)
+
+    async def claim(self, key: str, owner: str, ttl: float) -> bool:
+        return await self._run(self._claim, key, owner, ttl)
+
+    async def close(self) -> None:
+        await self._read(self._close_reader)
+        await self._run(self._close)
+        self._read_executor.shutdown(wait=True)
+        self._executor.shutdown(wait=True)
+
+
+CLAIM_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current == false or current == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+class RedisStore(KeyValueStore):
+
+    def __init__(self, url: str):
+        if redis_asyncio is None:
+            raise RuntimeError("Redis storage requires the 'redis' package (pip install redis).")
+        self._redis = redis_asyncio.from_url(url)
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._redis.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        await self._redis.set(key, value, ex=math.ceil(ttl) if ttl else None)
+
+    async def delete(self, key: str) -> None:
+        await self._redis.delete(key)
+
+    async def add_member(self, key: str, member: str) -> None:
+        await self._redis.sadd(key, member)
+
+    async def remove_member(self, key: str, member: str) -> None:
+        await self._redis.srem(key, member)
+
+    async def members(self, key: str) -> set:
+        return {member.decode() for member in await self._redis.smembers(key)}
+
+    async def claim(self, key: str, owner: str, ttl: float) -> bool:
+        return bool(await self._redis.eval(CLAIM_SCRIPT, 1, key, owner, math.ceil(ttl * 1000)))
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def create_store(url: str | None = None) -> KeyValueStore:
+    url = url or storage_url()
+    scheme = url.split("://", 1)[0].lower()
+    if scheme == "memory":
+        return MemoryStore()
+    if scheme == "sqlite":
+        return SQLiteStore(url[len("sqlite:///"):])
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisStore(url)
+    raise ValueError(f"Unknown storage URL scheme: {url!r}")
+
+
+_store: KeyValueStore | None = None
+
+
+async def init_store(url: str | None = None) -> KeyValueStore:
+    """
+    Вызывается при старте бота (server.main).
+    """
+    global _store
+    if _store is None:
+        url = url or storage_url()
+        _store = create_store(url)
+        logging.info(f"Shared storage: {url.split('@')[-1]}")
+    return _store
+
+
+def get_store() -> KeyValueStore:
+    """
+    Общее хранилище. Если бот не вызвал init_store (скрипты, бенчмарки) —
+    лениво создаётся хранилище в памяти.
+    """
+    global _store
+    if _store is None:
+        _store = MemoryStore()
+    return _store
+
+
+async def close_store() -> None:
+    global _store
+    if _store is not None:
+        await _store.close()
+        logging.info("Shared storage closed.")
+    _store = None
+
+
+class KeyValueStorage(BaseStorage):
+    """
+    FSM-хранилище aiogram поверх общего KeyValueStore.
+    Состояние и данные лежат под разными ключами: чтение состояния
+    (фильтр каждого хендлера) не тянет за собой данные диалога.
+    """
+
+    def __init__(self, store: KeyValueStore | None = None, key_builder: KeyBuilder | None = None,
+                 ttl: float = FSM_TTL):
+        self._store = store
+        self.key_builder = key_builder or DefaultKeyBuilder(prefix="fsm")
+        self.ttl = ttl
+
+    @property
+    def store(self) -> KeyValueStore:
+        return self._store or get_store()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self.key_builder.build(key, "state")
+        if state is None:
+            await self.store.delete(storage_key)
+            return
+        value = state.state if isinstance(state, State) else state
+        await self.store.set(storage_key, value.encode(), self.ttl)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        value = await self.store.get(self.key_builder.build(key, "state"))
+        return value.decode() if value is not None else None
+
+    async def set_data(self, key: StorageKey, data) -> None:
+        storage_key = self.key_builder.build(key, "data")
+        if not data:
+            await self.store.delete(storage_key)
+            return
+        await self.store.set(storage_key, pack(dict(data)), self.ttl)
+
+    async def get_data(self, key: StorageKey) -> dict:
+        return unpack(await self.store.get(self.key_builder.build(key, "data"))) or {}
+
+    async def close(self) -> None:
+        # Хранилище общее с кешами — его закрывает close_store().
+        pass
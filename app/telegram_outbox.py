@@ -0,0 +1,206 @@
+import asyncio
+import contextvars
+import logging
+from collections import deque
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+from .request_scheduler import BACKGROUND, INTERACTIVE, TokenBucket
+
+
+# Исходящие сообщения Bot API. Лимиты Telegram: ~30 сообщений в секунду на бота,
+# ~1 в секунду в один чат (короткий burst допускается), 20 в минуту в группу.
+GLOBAL_LIMIT = (30, 30)         # (в секунду, burst)
+PRIVATE_LIMIT = (1, 3)
+GROUP_LIMIT = (20 / 60, 3)
+MAX_RETRIES = 3
+MAX_IDLE_CHATS = 10_000
+
+# Методы, на которые действуют лимиты. answerCallbackQuery/answerInlineQuery
+# и служебные вызовы (getUpdates, setWebhook...) идут мимо очереди.
+LIMITED_PREFIXES = ("Send", "Edit", "Copy", "Forward")
+# Правка текста задаёт и текст, и клавиатуру, поэтому отменяет ожидающие
+# правки того же сообщения обоих видов; правка клавиатуры — только клавиатуры.
+SUPERSEDES = {
+    "EditMessageText": ("EditMessageText", "EditMessageReplyMarkup"),
+    "EditMessageCaption": ("EditMessageCaption", "EditMessageReplyMarkup"),
+    "EditMessageMedia": ("EditMessageMedia", "EditMessageReplyMarkup"),
+    "EditMessageReplyMarkup": ("EditMessageReplyMarkup",),
+}
+
+_priority = contextvars.ContextVar("telegram_outbox_priority", default=INTERACTIVE)
+
+
+class _Pending:
+    __slots__ = ("make_request", "bot", "method", "kind", "message", "priority", "futures", "cancelled",
+                 "attempts")
+
+    def __init__(self, make_request, bot, method, message, priority):
+        self.make_request = make_request
+        self.bot = bot
+        self.method = method
+        self.kind = type(method).__name__
+        self.message = message          # ключ сообщения для правок, иначе None
+        self.priority = priority
+        self.futures = [asyncio.get_running_loop().create_future()]
+        self.cancelled = False
+        self.attempts = 0
+
+
+class _Chat:
+    __slots__ = ("bucket", "queue", "edits", "drainer")
+
+    def __init__(self, rate: float, capacity: float):
+        self.bucket = TokenBucket(rate, capacity)
+        self.queue = deque()
+        self.edits = {}                 # message -> [_Pending] в очереди
+        self.drainer = None
+
+
+class TelegramOutbox(BaseRequestMiddleware):
+    """
+    Session-middleware: все отправки и правки сообщений проходят через
+    очередь чата (свой token bucket) и общий bucket бота.
+
+    Правки одного сообщения, ещё не ушедшие в Telegram, схлопываются:
+    отправляется только последняя, а все ожидавшие получают её результат.
+    На 429 (RetryAfter) чат ставится на паузу, запрос повторяется.
+    """
+
+    def __init__(self, global_limit: tuple = GLOBAL_LIMIT, private_limit: tuple = PRIVATE_LIMIT,
+                 group_limit: tuple = GROUP_LIMIT):
+        self.global_bucket = TokenBucket(*global_limit)
+        self.private_limit = private_limit
+        self.group_limit = group_limit
+        self._chats = {}
+        self._counters = {"sent": 0, "coalesced": 0, "retry_after": 0, "failed": 0}
+
+    async def __call__(self, make_request, bot, method):
+        kind = type(method).__name__
+        if not kind.startswith(LIMITED_PREFIXES):
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, "chat_id", None)
+        inline_id = getattr(method, "inline_message_id", None)
+        message = None
+        if kind in SUPERSEDES:
+            message = inline_id or getattr(method, "message_id", None)
+        key = chat_id if chat_id is not None else inline_id
+
+        pending = _Pending(make_request, bot, method, message, _priority.get())
+        self._enqueue(key, pending)
+        return await pending.futures[0]
+
+    def _chat(self, key) -> _Chat:
+        chat = self._chats.get(key)
+        if chat is None:
+            if len(self._chats) >= MAX_IDLE_CHATS:
+                self._prune()
+            group = isinstance(key, int) and key < 0
+            chat = self._chats[key] = _Chat(*(self.group_limit if group else self.private_limit))
+        return chat
+
+    def _prune(self) -> None:
+        # Пока drainer чата работает (или чат на паузе после 429), его bucket
+        # ещё нужен: новый _Chat начал бы с полным запасом токенов.
+        idle = [key for key, chat in self._chats.items()
+                if not chat.queue and (chat.drainer is None or chat.drainer.done())
+                and not chat.bucket.paused_for()]
+        for key in idle:
+            del self._chats[key]
+
+    def _enqueue(self, key, pending: _Pending) -> None:
+        chat = self._chat(key)
+        if pending.message is not None:
+            waiting = chat.edits.setdefault(pending.message, [])
+            for older in waiting:
+                if not older.cancelled and older.kind in SUPERSEDES[pending.kind]:
+                    older.cancelled = True
+                    pending.futures.extend(older.futures)
+                    # Кто-то из схлопнутых ждал интерактивно — новая правка тоже не фоновая.
+                    pending.priority = min(pending.priority, older.priority)
+                    self._counters["coalesced"] += 1
+            waiting[:] = [older for older in waiting if not older.cancelled]
+            waiting.append(pending)
+        chat.queue.append(pending)
+        if chat.drainer is None or chat.drainer.done():
+            chat.drainer = asyncio.create_task(self._drain(key, chat))
+
+    def _forget(self, chat: _Chat, pending: _Pending) -> None:
+        if pending.message is not None:
+            waiting = chat.edits.get(pending.message, [])
+            if pending in waiting:
+                waiting.remove(pending)
+            if not waiting:
+                chat.edits.pop(pending.message, None)
+
+    async def _drain(self, key, chat: _Chat) -> None:
+        while chat.queue:
+            while chat.queue and chat.queue[0].cancelled:
+                chat.queue.popleft()
+            if not chat.queue:
+                break
+            # Приоритет — у записи во главе очереди, а не у той, что запустила drainer.
+            priority = chat.queue[0].priority
+            await chat.bucket.acquire(priority)
+            await self.global_bucket.acquire(priority)
+            # Пока ждали токены, первую запись могли заменить более свежей правкой.
+            while chat.queue and chat.queue[0].cancelled:
+                chat.queue.popleft()
+            if not chat.queue:
+                break
+            pending = chat.queue.popleft()
+            self._forget(chat, pending)
+            await self._send(key, chat, pending)
+
+    async def _send(self, key, chat: _Chat, pending: _Pending) -> None:
+        try:
+            result = await pending.make_request(pending.bot, pending.method)
+        except TelegramRetryAfter as e:
+            self._counters["retry_after"] += 1
+            pending.attempts += 1
+            if pending.attempts <= MAX_RETRIES:
+                logging.warning(f"Telegram flood limit for {key}: retry in {e.retry_after}s.")
+                chat.bucket.pause(e.retry_after)
+                # Вперёд очереди: порядок сообщений чата сохраняется.
+                chat.queue.appendleft(pending)
+                if pending.message is not None:
+                    chat.edits.setdefault(pending.message, []).insert(0, pending)
+                return
+            self._resolve(pending, error=e)
+        except Exception as e:
+            self._resolve(pending, error=e)
+        else:
+            self._counters["sent"] += 1
+            self._resolve(pending, result=result)
+
+    def _resolve(self, pending: _Pending, result=None, error: Exception | None = None) -> None:
+        if error is not None:
+            self._counters["failed"] += 1
+        for future in pending.futures:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {**self._counters, "chats": len(self._chats),
+                "queued": sum(len(chat.queue) for chat in self._chats.values())}
+
+
+async def send_background(bot, method):
+    """
+    Отправка с фоновым приоритетом (уведомления): общий bucket сначала
+    отдаёт токены ответам пользователям.
+    """
+    token = _priority.set(BACKGROUND)
+    try:
+        return await bot(method)
+    finally:
+        _priority.reset(token)
+
+
+outbox = TelegramOutbox()
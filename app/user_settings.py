@@ -0,0 +1,25 @@
+from . import storage
+from .prices import CURRENCIES, DEFAULT_CURRENCY
+
+
+# Настройки пользователя лежат в общем storage, чтобы их видели все воркеры.
+SETTINGS_TTL = 365 * 24 * 3600
+
+
+def _currency_key(user_id: int) -> str:
+    return f"user:{user_id}:currency"
+
+
+async def get_currency(user_id: int) -> int:
+    """
+    Валюта пользователя (ECurrencyCode Steam), по умолчанию USD.
+    """
+    value = await storage.get_store().get(_currency_key(user_id))
+    if value is None:
+        return DEFAULT_CURRENCY
+    currency = int(value)
+    return currency if currency in CURRENCIES else DEFAULT_CURRENCY
+
+
+async def set_currency(user_id: int, currency: int) -> None:
+    await storage.get_store().set(_currency_key(user_id), str(currency).encode(), SETTINGS_TTL)
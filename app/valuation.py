@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import time
+
+from . import price_cache
+from .request_scheduler import BULK
+
+
+VALUATION_WORKERS = 4
+PROGRESS_INTERVAL = 3.0   # сек между обновлениями прогресса
+TOP_N = 10
+
+
+async def value_inventory(counts: dict, on_progress=None, workers: int = VALUATION_WORKERS,
+                          top_n: int = TOP_N, currency: int = 1) -> dict:
+    """
+    Оценивает инвентарь целиком.
+
+    `counts` — {market_hash_name: количество}, поэтому каждый уникальный предмет
+    запрашивается один раз. Цены берутся через price_cache с приоритетом BULK:
+    скорость ограничивает общий token bucket Steam, а клики пользователей
+    обгоняют оценку в очереди. Работает фиксированное число воркеров,
+    а не корутина на каждый предмет.
+
+    on_progress(done, total) вызывается не чаще раза в PROGRESS_INTERVAL секунд.
+    """
+    queue = asyncio.Queue()
+    for name in counts:
+        queue.put_nowait(name)
+
+    total = len(counts)
+    unit_prices = {}
+    done = 0
+    last_progress = time.monotonic()
+
+    async def worker():
+        nonlocal done, last_progress
+        while True:
+            try:
+                name = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            quote = await price_cache.get_price(name, currency, priority=BULK)
+            if quote is not None and quote.unit is not None:
+                unit_prices[name] = quote.unit
+            done += 1
+
+            now = time.monotonic()
+            if on_progress is not None and now - last_progress >= PROGRESS_INTERVAL:
+                last_progress = now
+                try:
+                    await on_progress(done, total)
+                except Exception as e:
+                    logging.warning(f"Valuation progress callback failed: {e}")
+
+    await asyncio.gather(*(worker() for _ in range(min(workers, total) or 1)))
+
+    positions = [
+        (name, counts[name], unit, unit * counts[name])
+        for name, unit in unit_prices.items()
+    ]
+    positions.sort(key=lambda position: position[3], reverse=True)
+
+    return {
+        "total": sum(position[3] for position in positions),
+        "unique": total,
+        "assets": sum(counts.values()),
+        "priced": len(positions),
+        "unpriced": [name for name in counts if name not in unit_prices],
+        "top": positions[:top_n],
+    }
@@ -1,29 +1,27 @@
 
-import aiohttp
 import logging
 
+from . import request_scheduler
+from .request_scheduler import INTERACTIVE
+
 STATS_URL = "https://www.valvesoftware.com/about/statsajax?l=english"
 
-async def get_online_stats() -> dict | None:
+
+def _to_int(value) -> int:
+    # Valve отдаёт числа то как int, то как строку с разделителями ("33,123,456").
+    return int(str(value).replace(",", "") or 0)
+
+
+async def fetch_online_counts(priority: int = INTERACTIVE) -> dict | None:
     """
-    Запрашивает статистику Steam через их внутренний JSON API
+    Сырые числа: {"online": int, "in_game": int} или None при ошибке.
     """
-    logging.info("Fetching Valve stats (JSON API)...")
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(STATS_URL) as response:
-                if response.status != 200:
-                    logging.error(f"Valve stats API status: {response.status}")
-                    return None
-                
-                data = await response.json(content_type=None)
-                
-                stats = {
-                    "online": f"{data.get('online', 0):,}",
-                    "in_game": f"{data.get('ingame', 0):,}"
-                }
-                return stats
-                
+        status, data = await request_scheduler.fetch_json(STATS_URL, priority=priority)
+        if status != 200 or not data:
+            logging.error(f"Valve stats API status: {status}")
+            return None
+        return {"online": _to_int(data.get('online', 0)), "in_game": _to_int(data.get('ingame', 0))}
     except Exception as e:
-        logging.error(f"Error in get_online_stats: {e}")
-        return None
\ No newline at end of file
+        logging.error(f"Error in fetch_online_counts: {e}")
+        return None
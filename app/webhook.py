@@ -0,0 +1,28 @@
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+
+DEFAULT_PATH = "/webhook"
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 8080
+
+
+def create_app(dispatcher: Dispatcher, bot: Bot, path: str = DEFAULT_PATH,
+               secret_token: str | None = None, handle_in_background: bool = True) -> web.Application:
+    """
+    aiohttp-приложение, принимающее апдейты Telegram на `path`.
+    Запросы без верного X-Telegram-Bot-Api-Secret-Token отклоняются (401).
+
+    handle_in_background=True отвечает Telegram сразу, а апдейт обрабатывается
+    задачей; False ждёт окончания хендлера (удобно для замеров задержки).
+    """
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dispatcher,
+        bot=bot,
+        secret_token=secret_token,
+        handle_in_background=handle_in_background,
+    ).register(app, path=path)
+    setup_application(app, dispatcher, bot=bot)
+    return app
@@ -0,0 +1,102 @@
+"""
+Холодный старт базы предметов: загрузка all.json по сети против снапшота на диске.
+
+Поднимает локальный stand-in для ByMykel all.json (с поддержкой ETag/304)
+и меряет load_all_item_data() без снапшота и со снапшотом.
+
+Запуск: python -m benchmarks.bench_cold_start [--items 27000]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import tempfile
+import time
+
+from aiohttp import web
+
+from app import data_manager, http_client, item_snapshot, json_decoder
+
+
+def make_all_json(size: int) -> bytes:
+    """
+    Синтетический all.json с полями как у ByMykel (описания, картинки, коллекции).
+    """
+    rng = random.Random(3)
+    items = {}
+    for i in range(size):
+        item_id = f"skin-{i:06x}"
+        items[item_id] = {
+            "id": item_id,
+            "name": f"AK-47 | Finish {i} ({rng.choice(['Factory New', 'Field-Tested', 'Battle-Scarred'])})",
+            "description": "Lorem ipsum " * 25,
+            "weapon": {"id": "weapon_ak47", "name": "AK-47"},
+            "category": {"id": "csgo_inventory_weapon_category_rifles", "name": "Rifles"},
+            "rarity": {"id": "rarity_rare_weapon", "name": "Mil-Spec Grade", "color": "#4b69ff"},
+            "stattrak": bool(i % 2),
+            "souvenir": False,
+            "paint_index": str(i),
+            "collections": [{"id": "collection-set-1", "name": "The Example Collection",
+                             "image": "https://example.invalid/" + "c" * 60}],
+            "crates": [{"id": "crate-1", "name": "Example Case", "image": "https://example.invalid/" + "k" * 60}],
+            "image": "https://example.invalid/" + "i" * 90,
+        }
+    return json.dumps(items).encode()
+
+
+async def timed(coro) -> float:
+    start = time.perf_counter()
+    await coro
+    return time.perf_counter() - start
+
+
+async def main(size: int) -> None:
+    body = make_all_json(size)
+    etag = '"' + hashlib.md5(body).hexdigest() + '"'
+
+    async def all_json(request: web.Request) -> web.Response:
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(body=body, content_type="application/json", headers={"ETag": etag})
+
+    app = web.Application()
+    app.router.add_get("/all.json", all_json)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    data_manager.DATA_URLS = [{"name": "all_items", "url": f"http://127.0.0.1:{port}/all.json"}]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ["ITEM_SNAPSHOT_PATH"] = os.path.join(workdir, "items.snapshot")
+        try:
+            print(f"all.json: {size} items, {len(body) / 1e6:.1f} MB\n")
+
+            cold = await timed(data_manager.load_all_item_data())
+            print(f"{'no snapshot (download + parse + index)':<44}{cold * 1000:>9.0f} ms")
+
+            snapshot_read = await timed(asyncio.to_thread(item_snapshot.load))
+            warm = await timed(data_manager.load_all_item_data())
+            await data_manager._revalidate_task
+            print(f"{'snapshot (read + index)':<44}{warm * 1000:>9.0f} ms")
+            print(f"{'  of which snapshot read':<44}{snapshot_read * 1000:>9.0f} ms")
+
+            start = time.perf_counter()
+            data_manager.search_index.search("finish 12")
+            item = next(iter(data_manager.item_database.values()))
+            item.get("rarity")
+            print(f"{'first lazy field access':<44}{(time.perf_counter() - start) * 1000:>9.2f} ms")
+        finally:
+            await http_client.close_session()
+            await runner.cleanup()
+            json_decoder.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=27_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.items))
@@ -0,0 +1,198 @@
+"""
+Сквозной оффлайн-бенчмарк: настоящий app.handlers.router против локальных
+stand-in'ов Steam (benchmarks/fake_steam.py) и Telegram (benchmarks/fake_telegram.py).
+
+База предметов скачивается с fake-сервера так же, как в проде (all.json → снапшот),
+цены, инвентари, профили и онлайн — тоже через настоящие API-клиенты.
+Апдейты подаются в Dispatcher.feed_raw_update, по сценариям:
+
+  search      — "Skin Price Search" → запрос (в т.ч. фильтры и опечатки) → страницы → inline;
+  pagination  — "View Inventory" → SteamID → листание страниц инвентаря;
+  pricing     — цены предметов (priceid:<id>), часть запросов попадает в кэш;
+  profile     — "Steam Profile Search" → SteamID (батчинг GetPlayerSummaries);
+  stats       — "Server Stats".
+
+Для каждого сценария: апдейтов в секунду, p50/p99/max времени обработки апдейта
+и RSS процесса после прогона. Задержку Steam, долю 429 и размер инвентаря можно
+менять, чтобы регрессии были видны в цифрах. Fake-серверы живут в том же процессе
+и event loop: в RSS входит их каталог, а во время апдейта — их работа.
+
+Запуск: python -m benchmarks.bench_e2e [--users 50] [--rounds 3] [--items 27000]
+        [--steam-latency 0.02] [--rate-limit 0.0] [--inventory 1000] [--outbox]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import resource
+import statistics
+import tempfile
+import time
+
+from aiogram import Dispatcher
+
+from app import data_manager, http_client, stats_poller, storage
+from app.handlers import router
+from app.telegram_outbox import TelegramOutbox
+from benchmarks.bench_fuzzy import typo
+from benchmarks.bench_search import FACETED_QUERIES, QUERIES
+from benchmarks.bench_webhook import callback_update, inline_update, message_update, percentile
+from benchmarks.fake_steam import FakeSteam
+from benchmarks.fake_telegram import FakeTelegram
+
+SCENARIOS = ("search", "pagination", "pricing", "profile", "stats")
+BASE_STEAM_ID = 76561198000000000
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # Не Linux: пиковый RSS (ru_maxrss в КБ).
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def search_flow(rng: random.Random, user_id: int, round_no: int) -> list:
+    kind = round_no % 3
+    if kind == 0:
+        query = QUERIES[(user_id + round_no) % len(QUERIES)]
+    elif kind == 1:
+        query = FACETED_QUERIES[(user_id + round_no) % len(FACETED_QUERIES)]
+    else:
+        query = " ".join(typo(rng, word) for word in QUERIES[user_id % len(QUERIES)].split())
+    return [
+        message_update(user_id, "Skin Price Search"),
+        message_update(user_id, query),
+        callback_update(user_id, "search_page:1"),
+        callback_update(user_id, "search_page:0"),
+        inline_update(user_id, query[:5]),
+    ]
+
+
+def pagination_flow(rng: random.Random, user_id: int, round_no: int, pages: int) -> list:
+    # Один SteamID на пользователя: со второго раунда инвентарь берётся из кэша.
+    updates = [message_update(user_id, "View Inventory"),
+               message_update(user_id, str(BASE_STEAM_ID + user_id))]
+    updates += [callback_update(user_id, f"inv_page:{page}") for page in range(1, min(pages, 6))]
+    updates.append(callback_update(user_id, "inv_page:0"))
+    return updates
+
+
+def pricing_flow(rng: random.Random, item_ids: list):
+    def flow(_, user_id: int, round_no: int) -> list:
+        return [callback_update(user_id, f"priceid:{rng.choice(item_ids)}") for _ in range(5)]
+    return flow
+
+
+def profile_flow(rng: random.Random, user_id: int, round_no: int) -> list:
+    return [message_update(user_id, "Steam Profile Search"),
+            message_update(user_id, str(BASE_STEAM_ID + user_id * 100 + round_no))]
+
+
+def stats_flow(rng: random.Random, user_id: int, round_no: int) -> list:
+    return [message_update(user_id, "Server Stats")]
+
+
+async def run_user(dp, bot, flow, rng, user_id: int, rounds: int, latencies: list, errors: list) -> None:
+    for round_no in range(rounds):
+        for update in flow(rng, user_id, round_no):
+            start = time.perf_counter()
+            try:
+                await dp.feed_raw_update(bot, update)
+            except Exception as e:
+                errors.append(e)
+            latencies.append(time.perf_counter() - start)
+
+
+async def run_scenario(name: str, flow, dp, bot, users: int, rounds: int,
+                       steam: FakeSteam, telegram: FakeTelegram) -> None:
+    rng = random.Random(name)
+    steam_calls = sum(steam.calls.values())
+    telegram_calls = sum(telegram.calls.values())
+    latencies, errors = [], []
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_user(dp, bot, flow, rng, 1000 + i, rounds, latencies, errors)
+                           for i in range(users)))
+    elapsed = time.perf_counter() - started
+
+    print(f"{name:<12}{len(latencies):>8}{len(latencies) / elapsed:>9.0f}"
+          f"{percentile(latencies, 0.5) * 1000:>9.2f}{percentile(latencies, 0.99) * 1000:>9.2f}"
+          f"{max(latencies) * 1000:>9.1f}{statistics.mean(latencies) * 1000:>9.2f}"
+          f"{sum(steam.calls.values()) - steam_calls:>8}{sum(telegram.calls.values()) - telegram_calls:>8}"
+          f"{len(errors):>7}{rss_mb():>9.1f}")
+    for error in errors[:3]:
+        print(f"            ! {type(error).__name__}: {error}")
+
+
+async def main(args) -> None:
+    workdir = tempfile.mkdtemp(prefix="bench-e2e-")
+    os.environ["ITEM_SNAPSHOT_PATH"] = os.path.join(workdir, "items.snapshot")
+    os.environ["PRICE_HISTORY_PATH"] = os.path.join(workdir, "price_history.sqlite3")
+    os.environ["STORAGE_URL"] = "memory://"
+
+    steam = FakeSteam(latency=args.steam_latency, rate_limit=args.rate_limit,
+                      inventory_size=args.inventory, items=args.items)
+    telegram = FakeTelegram(latency=args.telegram_latency)
+    await steam.start()
+    await telegram.start()
+    steam.install()
+    bot = telegram.bot()
+
+    dp = Dispatcher(storage=storage.KeyValueStorage())
+    dp.include_router(router)
+    if args.outbox:
+        bot.session.middleware(TelegramOutbox())
+
+    baseline = rss_mb()
+    started = time.perf_counter()
+    await data_manager.load_all_item_data()
+    print(f"all.json {len(steam.all_json) / 2**20:.1f} MB, {len(data_manager.item_database)} items loaded "
+          f"in {time.perf_counter() - started:.2f}s, RSS {baseline:.1f} -> {rss_mb():.1f} MB")
+    await stats_poller.poll_once()
+    print(f"{args.users} users x {args.rounds} rounds, Steam latency {args.steam_latency * 1000:.0f} ms, "
+          f"429 rate {args.rate_limit:.0%}, inventory {args.inventory} items"
+          f"{', outbox on' if args.outbox else ''}\n")
+
+    item_ids = random.Random(3).sample(list(data_manager.item_database), args.users * 2)
+    flows = {
+        "search": search_flow,
+        "pagination": lambda rng, user_id, round_no: pagination_flow(rng, user_id, round_no,
+                                                                    args.inventory // 20),
+        "pricing": pricing_flow(random.Random(4), item_ids),
+        "profile": profile_flow,
+        "stats": stats_flow,
+    }
+
+    print(f"{'scenario':<12}{'updates':>8}{'upd/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'mean ms':>9}"
+          f"{'steam':>8}{'tg':>8}{'errors':>7}{'RSS MB':>9}")
+    try:
+        for name in args.scenarios.split(","):
+            await run_scenario(name, flows[name], dp, bot, args.users, args.rounds, steam, telegram)
+    finally:
+        await data_manager.stop_background_refresh()
+        await http_client.close_session()
+        await bot.session.close()
+        await telegram.stop()
+        await steam.stop()
+
+    print(f"\nfake Steam calls: {steam.calls}, 429 injected: {steam.limited}")
+    print(f"fake Bot API calls: {telegram.calls}")
+    print(f"peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--items", type=int, default=27_000)
+    parser.add_argument("--steam-latency", type=float, default=0.02, help="задержка ответа fake Steam, сек")
+    parser.add_argument("--telegram-latency", type=float, default=0.0, help="задержка fake Bot API, сек")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="доля ответов 429 от fake Steam")
+    parser.add_argument("--inventory", type=int, default=1000, help="предметов в инвентаре")
+    parser.add_argument("--outbox", action="store_true", help="пропускать Bot API через telegram_outbox")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,86 @@
+"""
+Нечёткий поиск: задержка запросов с опечатками на всей базе предметов.
+
+Берёт синтетическую базу (bench_search.make_database) с настоящими названиями,
+портит их типичными опечатками (пропущенная/лишняя/переставленная буква,
+слитное "m4a1s") и меряет SearchIndex.search() — p50/p99/max и долю запросов,
+где нужный скин нашёлся.
+
+Запуск: python -m benchmarks.bench_fuzzy [--items 30000] [--queries 2000]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.search_index import SearchIndex, normalize
+from benchmarks.bench_search import KNOWN, WEAPONS, make_database
+from benchmarks.bench_webhook import percentile
+
+HAND_WRITTEN = ["asimov", "dragon lor", "m4a1s hyper beast", "awp asimov", "hyper baest",
+                "glok fade", "printsteam", "vulcn", "dopler", "crimson wbe", "bloodsprot"]
+
+
+def typo(rng: random.Random, word: str) -> str:
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.choice(("drop", "double", "swap", "replace"))
+    if kind == "drop":
+        return word[:i] + word[i + 1:]
+    if kind == "double":
+        return word[:i] + word[i] + word[i:]
+    if kind == "swap":
+        return word[:i - 1] + word[i] + word[i - 1] + word[i + 1:]
+    return word[:i] + rng.choice("aeiourstln") + word[i + 1:]
+
+
+def make_queries(rng: random.Random, count: int) -> list:
+    queries = []
+    for _ in range(count):
+        finish = rng.choice(KNOWN)
+        words = [typo(rng, word) if rng.random() < 0.7 else word for word in finish.lower().split()]
+        if rng.random() < 0.4:
+            weapon = rng.choice(WEAPONS).replace("★ ", "").lower().replace("-", "")
+            words.insert(0, weapon)
+        queries.append((" ".join(words), finish.lower()))
+    return queries
+
+
+def main(size: int, count: int) -> None:
+    rng = random.Random(5)
+    items = make_database(size)
+
+    start = time.perf_counter()
+    index = SearchIndex(items)
+    build = time.perf_counter() - start
+    deletes = sum(len(ids) for ids in index._deletes.values())
+    print(f"Database: {len(items)} items, index build {build:.2f}s ({index.describe()}), "
+          f"{len(index._deletes)} delete variants -> {deletes} word refs\n")
+
+    print(f"{'query':<24}{'ms':>8}  first result")
+    for query in HAND_WRITTEN:
+        start = time.perf_counter()
+        results = index.search(query)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{query:<24}{elapsed:>8.2f}  {results[0]['name'] if results else '—'}")
+
+    queries = make_queries(rng, count)
+    latencies, found = [], 0
+    for query, expected in queries:
+        start = time.perf_counter()
+        results = index.search(query)
+        latencies.append(time.perf_counter() - start)
+        found += any(expected in normalize(item['name']) for item in results)
+
+    print(f"\n{count} random typo queries: found {found / count:.0%}, "
+          f"p50 {percentile(latencies, 0.5) * 1000:.2f} ms, p99 {percentile(latencies, 0.99) * 1000:.2f} ms, "
+          f"max {max(latencies) * 1000:.2f} ms, mean {statistics.mean(latencies) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=30_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.items, args.queries)
@@ -0,0 +1,105 @@
+"""
+Сравнение задержки запроса: новая aiohttp.ClientSession на каждый вызов
+(как было в API-клиентах) против общей сессии из app.http_client.
+
+Поднимает локальный stand-in сервер, отвечающий как /market/priceoverview/.
+С флагом --tls сервер работает по HTTPS с временным самоподписанным
+сертификатом (нужен openssl в PATH) — так виден и TLS-handshake.
+
+Запуск: python -m benchmarks.bench_http_session [--tls] [-n 300]
+"""
+import argparse
+import asyncio
+import os
+import ssl
+import statistics
+import subprocess
+import tempfile
+import time
+
+import aiohttp
+from aiohttp import web
+
+from app import http_client
+
+
+PAYLOAD = {"success": True, "lowest_price": "$12.34", "median_price": "$12.50", "volume": "1,024"}
+
+
+async def priceoverview(request: web.Request) -> web.Response:
+    return web.json_response(PAYLOAD)
+
+
+def make_ssl_contexts(workdir: str):
+    cert = os.path.join(workdir, "cert.pem")
+    key = os.path.join(workdir, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+        check=True, capture_output=True
+    )
+    server_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    server_ctx.load_cert_chain(cert, key)
+    client_ctx = ssl.create_default_context(cafile=cert)
+    return server_ctx, client_ctx
+
+
+async def run_fresh(url: str, n: int, client_ssl) -> list:
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url, ssl=client_ssl) as response:
+                await response.json()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def run_shared(url: str, n: int, client_ssl) -> list:
+    session = await http_client.init_session()
+    timings = []
+    try:
+        for _ in range(n):
+            start = time.perf_counter()
+            async with session.get(url, ssl=client_ssl) as response:
+                await response.json()
+            timings.append(time.perf_counter() - start)
+    finally:
+        await http_client.close_session()
+    return timings
+
+
+def report(label: str, timings: list) -> None:
+    ms = sorted(t * 1000 for t in timings)
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    print(f"{label:<24}mean {statistics.mean(ms):7.2f} ms   p50 {statistics.median(ms):7.2f} ms   p99 {p99:7.2f} ms")
+
+
+async def main(use_tls: bool, n: int) -> None:
+    app = web.Application()
+    app.router.add_get("/market/priceoverview/", priceoverview)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server_ssl, client_ssl = make_ssl_contexts(workdir) if use_tls else (None, None)
+        site = web.TCPSite(runner, "localhost", 0, ssl_context=server_ssl)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        scheme = "https" if use_tls else "http"
+        url = f"{scheme}://localhost:{port}/market/priceoverview/"
+
+        try:
+            print(f"{n} sequential requests to {url}\n")
+            report("session per request", await run_fresh(url, n, client_ssl))
+            report("shared pooled session", await run_shared(url, n, client_ssl))
+        finally:
+            await runner.cleanup()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tls", action="store_true", help="serve over HTTPS with a self-signed cert")
+    parser.add_argument("-n", type=int, default=300, help="number of requests per mode")
+    args = parser.parse_args()
+    asyncio.run(main(args.tls, args.n))
@@ -0,0 +1,91 @@
+"""
+Память на сессию просмотра инвентаря для 1k одновременных пользователей.
+
+Сравнивает то, что раньше лежало в FSM (список имён целиком), с текущей
+схемой: в FSM только handle и номер страницы, сам инвентарь — в общем
+inventory_cache в виде массивов ID имён и количеств.
+
+Запуск: python -m benchmarks.bench_inventory_memory
+"""
+import json
+import random
+import tracemalloc
+
+from app.inventory_cache import InventoryCache, names
+
+
+SESSIONS = 1000
+ASSETS = 2000
+UNIQUE = 400
+NAME_POOL = 20_000
+
+
+def make_name_pool(rng: random.Random) -> list:
+    weapons = ["AK-47", "AWP", "M4A4", "M4A1-S", "Glock-18", "USP-S", "Sticker", "Sealed Graffiti"]
+    wears = ["Factory New", "Minimal Wear", "Field-Tested", "Well-Worn", "Battle-Scarred"]
+    return [f"{rng.choice(weapons)} | Finish {i} ({rng.choice(wears)})" for i in range(NAME_POOL)]
+
+
+def make_inventory_json(rng: random.Random, pool: list) -> str:
+    """
+    JSON, как его отдаёт Steam: каждая сессия декодирует свои копии строк.
+    """
+    unique = rng.sample(pool, UNIQUE)
+    assets = [rng.choice(unique) for _ in range(ASSETS)]
+    return json.dumps(assets)
+
+
+def measure(build) -> tuple:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    keep = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, keep
+
+
+def main():
+    rng = random.Random(1)
+    pool = make_name_pool(rng)
+    names.seed(pool)
+    payloads = [make_inventory_json(rng, pool) for _ in range(SESSIONS)]
+
+    def flat_lists():
+        return [{"inventory": json.loads(p), "page": 0, "steam_id": f"7656119{i:010d}"}
+                for i, p in enumerate(payloads)]
+
+    def pairs():
+        sessions = []
+        for i, p in enumerate(payloads):
+            counts = {}
+            for name in json.loads(p):
+                counts[name] = counts.get(name, 0) + 1
+            sessions.append({"inventory": [[n, c] for n, c in counts.items()],
+                             "page": 0, "steam_id": f"7656119{i:010d}"})
+        return sessions
+
+    def handles():
+        cache = InventoryCache(max_entries=SESSIONS)
+        sessions = []
+        for i, p in enumerate(payloads):
+            counts = {}
+            for name in json.loads(p):
+                counts[name] = counts.get(name, 0) + 1
+            inventory = cache.create(f"7656119{i:010d}")
+            cache.extend(inventory, counts.items())
+            sessions.append({"inv": inventory.handle, "page": 0, "viewing_item": False})
+        return cache, sessions
+
+    print(f"{SESSIONS} sessions, {ASSETS} assets / {UNIQUE} unique names per inventory\n")
+    print(f"{'FSM layout':<34}{'heap / session':>16}{'serialized / session':>24}")
+    for label, build in (("flat name list (original)", flat_lists),
+                         ("[name, count] pairs", pairs),
+                         ("handle + shared inventory_cache", handles)):
+        heap, keep = measure(build)
+        sessions = keep[1] if isinstance(keep, tuple) else keep
+        serialized = sum(len(json.dumps(s)) for s in sessions)
+        print(f"{label:<34}{heap / SESSIONS / 1024:>13.1f} KB{serialized / SESSIONS / 1024:>21.2f} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Память базы предметов: словари all.json как есть против компактного хранилища
+item_snapshot (слоты id/name, фасеты номерами в array, cold-поля в отображённом файле).
+
+По умолчанию — синтетический all.json на 27k предметов (как bench_cold_start);
+с --path можно померить настоящий файл ByMykel.
+
+Запуск: python -m benchmarks.bench_item_memory [--items 27000] [--path all.json]
+"""
+import argparse
+import gc
+import json
+import marshal
+import os
+import tempfile
+import time
+import tracemalloc
+
+from app import item_snapshot
+from app.data_manager import to_item_dict
+from benchmarks.bench_cold_start import make_all_json
+
+
+def measure(build) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    keep = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, keep
+
+
+def in_memory_snapshot(encoded) -> item_snapshot.Snapshot:
+    """
+    То, что возвращает save(), если файл записать не удалось: cold-блок целиком в памяти.
+    """
+    header, hot, cold = item_snapshot.build({"all_items": encoded}, {})
+    return item_snapshot._open(header, marshal.loads(hot), memoryview(cold))
+
+
+def per_call_us(func, items: list, repeat: int = 3) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            func(item)
+    return (time.perf_counter() - start) / (repeat * len(items)) * 1e6
+
+
+def main(size: int, path: str | None) -> None:
+    if path:
+        with open(path, "rb") as f:
+            body = f.read()
+    else:
+        body = make_all_json(size)
+    encoded = item_snapshot.encode_items(to_item_dict(json.loads(body), "all_items"))
+
+    raw_bytes, raw = measure(lambda: to_item_dict(json.loads(body), "all_items"))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        snapshot_file = os.path.join(workdir, "items.snapshot")
+        mapped_bytes, mapped = measure(
+            lambda: item_snapshot.save({"all_items": encoded}, {}, path=snapshot_file))
+        in_memory_bytes, in_memory = measure(lambda: in_memory_snapshot(encoded))
+        file_size = os.path.getsize(snapshot_file)
+
+        count = len(raw)
+        print(f"all.json: {count} items, {len(body) / 1e6:.1f} MB\n")
+        print(f"{'store':<40}{'MB':>8}{'bytes/item':>12}")
+        for label, used in (("raw dicts (json.loads)", raw_bytes),
+                            ("compact, cold in memory", in_memory_bytes),
+                            ("compact, cold mapped from file", mapped_bytes)):
+            print(f"{label:<40}{used / 1e6:>8.1f}{used / count:>12.0f}")
+        print(f"{'  + mapped snapshot file (paged lazily)':<40}{file_size / 1e6:>8.1f}")
+
+        raw_items = list(raw.values())
+        compact_items = list(mapped.sources["all_items"].values())
+        print(f"\n{'access':<40}{'dict us':>10}{'compact us':>12}")
+        for label, raw_get, compact_get in (
+            ("name", lambda item: item['name'], lambda item: item['name']),
+            ("rarity (facet)", lambda item: item['rarity']['name'],
+             lambda item: item_snapshot.facets_of(item)[0]["rarity"]),
+            ("stattrak (flag)", lambda item: item.get('stattrak'),
+             lambda item: bool(item_snapshot.facets_of(item)[1] & item_snapshot.STATTRAK)),
+        ):
+            print(f"{label:<40}{per_call_us(raw_get, raw_items):>10.3f}{per_call_us(compact_get, compact_items):>12.3f}")
+
+        sample = compact_items[:1000]
+        first = per_call_us(lambda item: item['image'], sample, repeat=1)
+        print(f"{'image (cold, first access)':<40}{per_call_us(lambda item: item['image'], raw_items[:1000]):>10.3f}"
+              f"{first:>12.3f}")
+
+        values = [item_snapshot.facets_of(item)[0] for item in compact_items]
+        facets = {field: len({row[field] for row in values} - {None}) for field in item_snapshot.FACETS}
+        print(f"\ndistinct facet values: {facets}")
+        del mapped, in_memory
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=27_000)
+    parser.add_argument("--path", help="настоящий all.json вместо синтетического")
+    args = parser.parse_args()
+    main(args.items, args.path)
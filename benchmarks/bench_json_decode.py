@@ -0,0 +1,76 @@
+"""
+Задержка event loop при разборе больших JSON: прямо в loop против json_decoder.
+
+Сценарии — синтетический all.json (~30 МБ) с reducer'ом снапшота и страница
+инвентаря на 2000 предметов с reducer'ом inventory_api. Пока идёт разбор,
+loop_monitor меряет, насколько опаздывает event loop.
+
+Запуск: python -m benchmarks.bench_json_decode
+"""
+import asyncio
+import json
+import time
+from functools import partial
+
+from app import json_decoder, loop_monitor
+from app.data_manager import parse_source
+from app.inventory_api import reduce_inventory_page
+from benchmarks.bench_cold_start import make_all_json
+
+
+def make_inventory_page(assets: int = 2000) -> bytes:
+    descriptions = [
+        {"classid": str(i), "instanceid": "0", "market_hash_name": f"Sticker | Example {i}",
+         "marketable": 1, "descriptions": [{"type": "html", "value": "x" * 200}] * 3,
+         "icon_url": "i" * 120, "tags": [{"category": "Type", "localized_tag_name": "Sticker"}] * 5}
+        for i in range(assets // 4)
+    ]
+    page = {
+        "assets": [{"classid": str(i % (assets // 4)), "instanceid": "0", "amount": "1",
+                    "assetid": str(10 ** 10 + i)} for i in range(assets)],
+        "descriptions": descriptions,
+        "more_items": 0,
+        "total_inventory_count": assets,
+    }
+    return json.dumps(page).encode()
+
+
+async def measure(label: str, work) -> None:
+    # Сбрасываем max, чтобы учесть только этот сценарий.
+    loop_monitor._stats.update({"samples": 0, "max": 0.0, "total": 0.0, "stalls": 0})
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.05)
+    lag = loop_monitor.stats()
+    print(f"{label:<40}{elapsed * 1000:>10.0f} ms{lag['max_ms']:>14.1f} ms")
+
+
+async def main() -> None:
+    all_json = make_all_json(27_000)
+    inventory = make_inventory_page()
+    reducer = partial(parse_source, "all_items")
+    loop_monitor.start(interval=0.002)
+
+    async def inline(body, reduce):
+        reduce(json_decoder.loads(body))
+
+    print(f"all.json {len(all_json) / 1e6:.1f} MB, inventory page {len(inventory) / 1e6:.2f} MB, "
+          f"orjson: {json_decoder.orjson is not None}\n")
+    print(f"{'scenario':<40}{'wall':>13}{'max loop lag':>17}")
+
+    # Первый вызов поднимает воркеры — прогреваем, чтобы мерить сам разбор.
+    await json_decoder.decode(inventory, reduce_inventory_page)
+
+    await measure("all.json inline", lambda: inline(all_json, reducer))
+    await measure("all.json json_decoder", lambda: json_decoder.decode(all_json, reducer))
+    await measure("inventory page inline", lambda: inline(inventory, reduce_inventory_page))
+    await measure("inventory page json_decoder", lambda: json_decoder.decode(inventory, reduce_inventory_page))
+
+    await loop_monitor.stop()
+    json_decoder.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+"""
+Листание инвентаря из 2000 предметов: сборка клавиатуры на каждый клик
+против кеша готовых markup по (handle, version, page).
+Плюс повторные поисковые запросы: поиск + сборка против кеша по normalize(query).
+
+Запуск: python -m benchmarks.bench_keyboards [--flips 20000]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app import data_manager, keyboard_builders
+from app.inventory_cache import InventoryCache
+from benchmarks.bench_search import QUERIES, make_database
+
+
+def make_inventory(size: int):
+    cache = InventoryCache()
+    inventory = cache.create("76561198000000000")
+    database = make_database(size, seed=11)
+    cache.extend(inventory, [(item["name"], i % 3 + 1) for i, item in enumerate(database.values())])
+    inventory.complete = True
+    return inventory
+
+
+def per_call_us(func, args_list: list) -> float:
+    start = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1e6
+
+
+def main(flips: int, inventory_size: int, database_size: int) -> None:
+    inventory = make_inventory(inventory_size)
+    pages = (len(inventory) + keyboard_builders.ITEMS_PER_PAGE - 1) // keyboard_builders.ITEMS_PER_PAGE
+    rng = random.Random(5)
+    # Типичное листание: вперёд/назад вокруг текущей страницы, иногда прыжок.
+    page, clicks = 0, []
+    for _ in range(flips):
+        page = rng.randrange(pages) if rng.random() < 0.05 else max(0, min(pages - 1, page + rng.choice((-1, 1, 1))))
+        clicks.append((inventory, page))
+
+    build = per_call_us(keyboard_builders.build_inventory_keyboard, clicks)
+    keyboard_builders.create_inventory_keyboard(inventory, 0)
+    cached = per_call_us(keyboard_builders.create_inventory_keyboard, clicks)
+    print(f"inventory {len(inventory)} items, {pages} pages, {flips} flips:")
+    print(f"  build every click: {build:8.1f} µs    cached markup: {cached:6.2f} µs")
+
+    asyncio.run(data_manager.install({"synthetic": make_database(database_size)}))
+    searches = [(rng.choice(QUERIES),) for _ in range(flips // 10)]
+
+    def uncached(query: str):
+        results, has_more = data_manager.search_items(query, limit=keyboard_builders.SEARCH_PAGE_SIZE)
+        return keyboard_builders.create_skin_search_keyboard(results, 0, has_more) if results else None
+
+    search_build = per_call_us(uncached, searches)
+    search_cached = per_call_us(keyboard_builders.get_search_keyboard, searches)
+    print(f"search over {database_size} items, {len(searches)} repeated queries:")
+    print(f"  search + build:    {search_build:8.1f} µs    cached markup: {search_cached:6.2f} µs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--flips", type=int, default=20_000)
+    parser.add_argument("--inventory", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=30_000)
+    args = parser.parse_args()
+    main(args.flips, args.inventory, args.items)
@@ -0,0 +1,91 @@
+"""
+Очередь исходящих сообщений: прямые вызовы Bot API против telegram_outbox.
+
+Локальный stand-in Telegram (benchmarks/fake_telegram.py) режет ~1 сообщение
+в секунду на чат (burst 3) и отвечает 429 с retry_after. Каждый пользователь
+быстро листает инвентарь (N нажатий "Next »" = N правок одного сообщения)
+и получает пачку уведомлений. Сравниваются: число вызовов API, 429,
+ошибки, дошедшие до хендлеров, и совпадает ли итоговая страница с последней.
+
+Запуск: python -m benchmarks.bench_outbox [--users 50] [--presses 20] [--notices 5]
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from app.telegram_outbox import TelegramOutbox, send_background
+from benchmarks.fake_telegram import FakeTelegram
+
+
+def page_markup(page: int):
+    builder = InlineKeyboardBuilder()
+    builder.button(text=f"Page {page + 1}", callback_data="noop")
+    return builder.as_markup()
+
+
+async def run_user(bot, chat_id: int, presses: int, notices: int, errors: list) -> None:
+    async def press(page: int) -> None:
+        try:
+            await bot.edit_message_reply_markup(chat_id=chat_id, message_id=1, reply_markup=page_markup(page))
+        except TelegramRetryAfter as e:
+            errors.append(e)
+
+    async def notify(i: int) -> None:
+        try:
+            await send_background(bot, SendMessage(chat_id=chat_id, text=f"alert {i}"))
+        except TelegramRetryAfter as e:
+            errors.append(e)
+
+    tasks = []
+    for page in range(presses):
+        tasks.append(asyncio.create_task(press(page)))
+        await asyncio.sleep(0.02)       # ~50 нажатий в секунду
+    tasks.extend(asyncio.create_task(notify(i)) for i in range(notices))
+    await asyncio.gather(*tasks)
+
+
+async def scenario(label: str, with_outbox: bool, users: int, presses: int, notices: int) -> None:
+    telegram = FakeTelegram(chat_limit=1, chat_burst=3, retry_after=1)
+    await telegram.start()
+    bot = telegram.bot()
+    outbox = TelegramOutbox()
+    if with_outbox:
+        bot.session.middleware(outbox)
+
+    errors = []
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(run_user(bot, 1000 + i, presses, notices, errors) for i in range(users)))
+    finally:
+        elapsed = time.perf_counter() - started
+        await bot.session.close()
+        await telegram.stop()
+
+    fresh = sum(1 for i in range(users)
+                if f'"Page {presses}"' in (telegram.texts.get((str(1000 + i), "1")) or ""))
+    api_calls = sum(telegram.calls.values())
+    print(f"{label:<10}{api_calls:>10}{telegram.flooded:>8}{len(errors):>9}{fresh:>8}/{users:<5}{elapsed:>9.2f}s")
+    if with_outbox:
+        print(f"          outbox: {outbox.stats()}")
+
+
+async def main(users: int, presses: int, notices: int) -> None:
+    print(f"{users} users x ({presses} page flips + {notices} notifications), fake limit 1 msg/s per chat\n")
+    print(f"{'':<10}{'API calls':>10}{'429s':>8}{'errors':>9}{'fresh page':>14}{'time':>10}")
+    await scenario("direct", False, users, presses, notices)
+    await scenario("outbox", True, users, presses, notices)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--presses", type=int, default=20)
+    parser.add_argument("--notices", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.presses, args.notices))
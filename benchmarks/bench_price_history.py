@@ -0,0 +1,82 @@
+"""
+История цен: стоимость record() на пути ответа, пропускная способность
+пакетной записи и время запроса изменений за 24ч/7д, в том числе
+пока идёт сброс пачки.
+
+Заполняет временную базу синтетическими наблюдениями за 8 дней
+(каждые 10 минут для --names предметов).
+
+Запуск: python -m benchmarks.bench_price_history [--names 500]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from app.price_history import PriceHistory
+from app.prices import PriceQuote
+
+
+def price_data(cents: int) -> PriceQuote:
+    return PriceQuote(cents, int(cents * 1.02), 1234)
+
+
+async def main(names: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        history = PriceHistory(os.path.join(directory, "history.db"), flush_size=10**9)
+        history.start()
+
+        now = time.time()
+        step = 600
+        points = 8 * 24 * 3600 // step
+        start = time.perf_counter()
+        for name_no in range(names):
+            name = f"AK-47 | Synthetic {name_no} (Field-Tested)"
+            for point in range(points):
+                history.record(name, 1, price_data(1000 + point), ts=now - (points - point) * step)
+            if len(history._buffer) >= 10_000:
+                await history.flush()
+        await history.flush()
+        elapsed = time.perf_counter() - start
+        total = names * points
+        print(f"{total} observations recorded and written in {elapsed:.2f}s "
+              f"({total / elapsed:,.0f}/s), file {os.path.getsize(history.path) / 1e6:.1f} MB")
+
+        sample = price_data(1500)
+        repeat = 100_000
+        start = time.perf_counter()
+        for _ in range(repeat):
+            history.record("AK-47 | Synthetic 0 (Field-Tested)", 1, sample)
+        record_us = (time.perf_counter() - start) / repeat * 1e6
+        history._buffer.clear()
+        print(f"record() on the request path: {record_us:.2f} µs")
+
+        queries = 200
+        start = time.perf_counter()
+        for i in range(queries):
+            changes = await history.changes(f"AK-47 | Synthetic {i % names} (Field-Tested)", 1, 2200)
+        print(f"changes(24h, 7d): {(time.perf_counter() - start) / queries * 1000:.2f} ms per item, "
+              f"example {({k: f'{v:+.1%}' for k, v in changes.items()})}")
+
+        # Ответ с ценой во время сброса большой пачки и очистки старых данных.
+        for point in range(50_000):
+            history.record(f"AK-47 | Synthetic {point % names} (Field-Tested)", 1, sample, ts=now + point)
+        history._last_purge = 0.0
+        flush = asyncio.create_task(history.flush())
+        latencies = []
+        while not flush.done():
+            start = time.perf_counter()
+            await history.changes(f"AK-47 | Synthetic {len(latencies) % names} (Field-Tested)", 1, 2200)
+            latencies.append(time.perf_counter() - start)
+        await flush
+        print(f"changes() during a 50k flush + purge: {len(latencies)} calls, "
+              f"max {max(latencies, default=0) * 1000:.2f} ms")
+        await history.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--names", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.names))
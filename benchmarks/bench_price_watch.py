@@ -0,0 +1,96 @@
+"""
+Планировщик ценовых алертов под нагрузкой: десятки тысяч подписок
+на несколько тысяч предметов. Цены отдаёт локальная функция с задержкой,
+уведомления считаются, а не отправляются. Подписки пишутся в общее
+хранилище (memory://), владелец аренды поднимает их оттуда.
+
+Проверяет, что каждый предмет опрашивается один раз за интервал
+независимо от числа подписчиков, и меряет накладные расходы планировщика.
+
+Запуск: python -m benchmarks.bench_price_watch [--watches 50000] [--items 5000]
+"""
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+from collections import Counter
+
+from app.price_watch import Watch, WatchScheduler, BELOW, ABOVE
+from app.prices import PriceQuote
+
+
+async def main(watches: int, items: int, interval: float, duration: float) -> None:
+    rng = random.Random(9)
+    polls = Counter()
+    prices = {f"Item {i}": rng.randint(100, 10_000) for i in range(items)}
+
+    async def get_price(name: str, currency: int = 1, priority: int = 0) -> PriceQuote:
+        polls[name] += 1
+        await asyncio.sleep(0.002)
+        # Цена случайно гуляет на ±10% — часть алертов срабатывает.
+        cents = int(prices[name] * rng.uniform(0.9, 1.1))
+        return PriceQuote(cents, cents, 100, currency)
+
+    notified = []
+
+    async def notify(user_id: int, text: str) -> None:
+        notified.append(user_id)
+
+    # Подписки лежат в общем хранилище (здесь — в памяти), планировщик-владелец
+    # аренды поднимает их в кучу через _sync().
+    storage_rng = random.Random(10)
+    names = list(prices)
+    writer = WatchScheduler(get_price=get_price)
+    start = time.perf_counter()
+    for i in range(watches):
+        name = storage_rng.choice(names)
+        direction = storage_rng.choice((BELOW, ABOVE))
+        target = int(prices[name] * (0.93 if direction == BELOW else 1.07))
+        await writer.add(Watch(100_000 + i % (watches // 3 or 1), name, 1, target, direction,
+                               created_at=1_700_000_000 + i))
+    added = time.perf_counter() - start
+
+    async def build() -> WatchScheduler:
+        scheduler = WatchScheduler(interval=interval, concurrency=64, get_price=get_price)
+        scheduler.budget_rate = float("inf")    # бюджет Steam здесь не ограничивает
+        scheduler._owner = writer._owner
+        await scheduler._sync()
+        return scheduler
+
+    tracemalloc.start()
+    measured = await build()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del measured
+
+    start = time.perf_counter()
+    scheduler = await build()
+    synced = time.perf_counter() - start
+
+    scheduler._notify = notify
+    scheduler._wakeup = asyncio.Event()
+    run = asyncio.create_task(scheduler._run())
+    await asyncio.sleep(duration)
+    run.cancel()
+    for task in list(scheduler._tasks):
+        task.cancel()
+
+    rounds = Counter(polls.values())
+    print(f"{watches} watches on {items} items: /watch adds in {added * 1000:.0f} ms "
+          f"({added / watches * 1e6:.1f} µs each), sync from storage {synced * 1000:.0f} ms, "
+          f"~{memory / 1e6:.1f} MB in the heap")
+    print(f"ran {duration:.1f}s with interval {interval:.1f}s: {sum(polls.values())} polls "
+          f"for {len(polls)} items (polls per item: {dict(sorted(rounds.items()))})")
+    print(f"notifications fanned out: {len(notified)}, watches left: {len(scheduler)}, "
+          f"heap: {len(scheduler._heap)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--watches", type=int, default=50_000)
+    parser.add_argument("--items", type=int, default=5_000)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--duration", type=float, default=2.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.watches, args.items, args.interval, args.duration))
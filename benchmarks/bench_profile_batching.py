@@ -0,0 +1,104 @@
+"""
+Батчинг GetPlayerSummaries: N одновременных запросов профилей против
+локального stand-in API (с задержкой ответа). Сравнивает старый путь
+(один steamid на запрос) и SummaryBatcher.
+
+Запуск: python -m benchmarks.bench_profile_batching [--lookups 500] [--distinct 300]
+"""
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+
+from aiohttp import web
+
+from app import http_client, official_steam_api, request_scheduler
+
+
+async def start_server(latency: float, calls: list) -> tuple:
+    async def summaries(request: web.Request) -> web.Response:
+        steam_ids = request.query["steamids"].split(",")
+        calls.append(len(steam_ids))
+        await asyncio.sleep(latency)
+        players = [{"steamid": steam_id, "personaname": f"player {steam_id[-4:]}"}
+                   for steam_id in steam_ids if not steam_id.endswith("0")]
+        return web.json_response({"response": {"players": players}})
+
+    app = web.Application()
+    app.router.add_get("/ISteamUser/GetPlayerSummaries/v2/", summaries)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/ISteamUser/GetPlayerSummaries/v2/"
+
+
+async def single(url: str, steam_id: str):
+    # Старое поведение: отдельный запрос на каждый профиль, без кеша.
+    status, data = await request_scheduler.fetch_json(
+        url, params={"key": "bench", "steamids": steam_id})
+    players = data.get("response", {}).get("players", []) if status == 200 else []
+    return players[0] if players else None
+
+
+async def run(lookup, steam_ids: list) -> list:
+    latencies = []
+
+    async def one(steam_id: str):
+        start = time.perf_counter()
+        result = await lookup(steam_id)
+        latencies.append(time.perf_counter() - start)
+        return result
+
+    await asyncio.gather(*(one(steam_id) for steam_id in steam_ids))
+    return latencies
+
+
+def report(label: str, latencies: list, calls: list, elapsed: float) -> None:
+    ordered = sorted(latencies)
+    print(f"{label:<10} upstream requests: {len(calls):>4}  wall: {elapsed * 1000:7.1f} ms  "
+          f"p50: {ordered[len(ordered) // 2] * 1000:6.1f} ms  "
+          f"p99: {ordered[int(len(ordered) * 0.99)] * 1000:6.1f} ms  "
+          f"mean batch: {statistics.mean(calls) if calls else 0:.1f}")
+
+
+async def main(lookups: int, distinct: int, latency: float) -> None:
+    rng = random.Random(1)
+    pool = [str(76561198000000000 + i) for i in range(distinct)]
+    steam_ids = [rng.choice(pool) for _ in range(lookups)]
+
+    calls = []
+    runner, url = await start_server(latency, calls)
+    official_steam_api.API_URL = url
+    official_steam_api.configure("bench")
+    try:
+        start = time.perf_counter()
+        latencies = await run(lambda steam_id: single(url, steam_id), steam_ids)
+        report("single", latencies, calls, time.perf_counter() - start)
+
+        calls.clear()
+        start = time.perf_counter()
+        latencies = await run(official_steam_api.get_player_summary, steam_ids)
+        report("batched", latencies, calls, time.perf_counter() - start)
+
+        calls.clear()
+        start = time.perf_counter()
+        latencies = await run(official_steam_api.get_player_summary, steam_ids)
+        report("cached", latencies, calls, time.perf_counter() - start)
+        print(f"batcher stats: {official_steam_api.summaries.stats()}")
+    finally:
+        await http_client.close_session()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR)   # "No player found" для каждого 10-го id
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--distinct", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.08, help="upstream latency, seconds")
+    args = parser.parse_args()
+    asyncio.run(main(args.lookups, args.distinct, args.latency))
@@ -0,0 +1,89 @@
+"""
+Микро-бенчмарк поиска: старый линейный проход по item_database
+против SearchIndex на синтетической базе из 100k предметов,
+плюс фасетные фильтры (битовые карты) и постраничная выдача.
+
+Запуск: python -m benchmarks.bench_search
+"""
+import random
+import time
+
+from app.search_index import SearchIndex
+
+
+WEAPONS = ["AK-47", "AWP", "M4A4", "M4A1-S", "Desert Eagle", "USP-S", "Glock-18",
+           "P250", "MP9", "MAC-10", "FAMAS", "Galil AR", "SSG 08", "★ Karambit", "★ Butterfly Knife"]
+KNOWN = ["Redline", "Asiimov", "Dragon Lore", "Hyper Beast", "Fade", "Doppler", "Vulcan",
+         "Fire Serpent", "Howl", "Printstream", "Neo-Noir", "Bloodsport", "Case Hardened",
+         "Slaughter", "Crimson Web", "Tiger Tooth", "Marble Fade", "Gamma Doppler", "Blaze"]
+SYLLABLES = ["ka", "ri", "mo", "ze", "lu", "to", "shi", "va", "ne", "or", "ix", "pa", "dra",
+             "gon", "bel", "um", "qua", "sy", "ter", "fex"]
+WEARS = ["Factory New", "Minimal Wear", "Field-Tested", "Well-Worn", "Battle-Scarred"]
+
+QUERIES = ["ak-47 | redline (field-tested)", "awp", "redline", "awp asiimov", "dragon lore",
+           "karambit fade", "xyz-not-found", "m4", "blaze (factory new)"]
+FACETED_QUERIES = ["ak-47 factory new", "awp fn", "karambit fade bs", "skin mw", "usp-s redline ft"]
+
+
+def make_database(size: int, seed: int = 7) -> dict:
+    """
+    Синтетическая база с реалистичным разнообразием: ~20k разных слов
+    в названиях скинов плюс реальные названия для проверочных запросов.
+    """
+    rng = random.Random(seed)
+    vocabulary = list({
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+        for _ in range(30_000)
+    })
+    items = {}
+    for i in range(size):
+        finish = rng.choice(KNOWN) if i % 50 == 0 else " ".join(rng.sample(vocabulary, rng.randint(1, 2)))
+        name = f"{rng.choice(WEAPONS)} | {finish} ({rng.choice(WEARS)})"
+        items[f"skin-{i}"] = {"id": f"skin-{i}", "name": name}
+    return items
+
+
+def linear_scan(item_database: dict, query: str) -> list:
+    """Копия прежнего find_items_by_name."""
+    matches = []
+    query_lower = query.lower()
+    for item_id, item_details in item_database.items():
+        if query_lower in item_details.get('name', '').lower():
+            matches.append(item_details)
+            if len(matches) >= 15:
+                break
+    return matches
+
+
+def per_call_us(func, query, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(query)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    items = make_database(100_000)
+
+    start = time.perf_counter()
+    index = SearchIndex(items)
+    build_s = time.perf_counter() - start
+    print(f"Database: {len(items)} items, index build: {build_s:.2f}s ({index.describe()})\n")
+
+    print(f"{'query':<32}{'scan, us':>12}{'index, us':>12}{'speedup':>10}")
+    for query in QUERIES:
+        scan_us = per_call_us(lambda q: linear_scan(items, q), query, repeat=5)
+        index_us = per_call_us(index.search, query, repeat=200)
+        print(f"{query:<32}{scan_us:>12.1f}{index_us:>12.1f}{scan_us / index_us:>9.0f}x")
+
+    print(f"\n{'faceted query':<24}{'filters':>24}{'AND, us':>10}{'page 1, us':>12}{'page 20, us':>13}")
+    for query in FACETED_QUERIES:
+        text, filters = index.parse_filters(query)
+        bitmap_us = per_call_us(index.filter_bitmap, filters, repeat=2000)
+        first_us = per_call_us(index.find, query, repeat=200)
+        deep_us = per_call_us(lambda q: index.find(q, offset=190), query, repeat=50)
+        print(f"{query:<24}{'+'.join(filters):>24}{bitmap_us:>10.1f}{first_us:>12.1f}{deep_us:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
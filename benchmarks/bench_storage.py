@@ -0,0 +1,56 @@
+"""
+Стоимость одного клика для FSM-хранилища: get_state + get_data + update_data
+(то, что делает inventory_page_handler) для memory:// и sqlite://,
+плюс размер сериализованного состояния.
+
+Запуск: python -m benchmarks.bench_storage [--clicks 5000]
+"""
+import argparse
+import asyncio
+import os
+import pickle
+import tempfile
+import time
+
+from aiogram.fsm.storage.base import StorageKey
+
+from app import storage
+
+
+STATE = "InventorySearch:showing_inventory"
+DATA = {"inv": "76561198000000000:9f86d081", "page": 3, "viewing_item": False}
+
+
+async def measure(url: str, clicks: int) -> float:
+    store = storage.create_store(url)
+    fsm = storage.KeyValueStorage(store)
+    keys = [StorageKey(bot_id=1, chat_id=user_id, user_id=user_id) for user_id in range(100)]
+    for key in keys:
+        await fsm.set_state(key, STATE)
+        await fsm.set_data(key, DATA)
+
+    start = time.perf_counter()
+    for i in range(clicks):
+        key = keys[i % len(keys)]
+        await fsm.get_state(key)
+        await fsm.get_data(key)
+        await fsm.update_data(key, {"page": i % 10})
+    elapsed = time.perf_counter() - start
+    await store.close()
+    return elapsed / clicks * 1e6
+
+
+async def main(clicks: int) -> None:
+    print(f"serialized FSM data: {len(storage.pack(DATA))} B "
+          f"(pickle: {len(pickle.dumps(DATA))} B), state: {len(STATE.encode())} B")
+    with tempfile.TemporaryDirectory() as directory:
+        for url in ("memory://", "sqlite:///" + os.path.join(directory, "state.db")):
+            per_click = await measure(url, clicks)
+            print(f"{url.split('://')[0]:<8} {per_click:8.1f} µs per click (3 FSM calls)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clicks", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.clicks))
@@ -0,0 +1,164 @@
+"""
+Нагрузочный тест webhook-режима: синтетические апдейты Telegram
+против локального aiohttp-сервера из app.webhook.
+
+Бот ходит в локальный fake Bot API (benchmarks.fake_telegram), база предметов —
+синтетическая. Сервер запускается с handle_in_background=False, поэтому время
+ответа на POST — это время работы хендлера (плюс разбор апдейта).
+
+Каждый виртуальный пользователь проходит сценарий
+/start → "Skin Price Search" → запрос → noop-кнопка → inline-запрос;
+пользователи работают параллельно.
+
+Запуск: python -m benchmarks.bench_webhook [--users 200] [--rounds 5] [--items 30000]
+"""
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+
+import aiohttp
+from aiohttp import web
+from aiogram import Dispatcher
+
+from app import data_manager, metrics, observability, webhook
+from app.handlers import router
+from benchmarks.bench_search import QUERIES, make_database
+from benchmarks.fake_telegram import FakeTelegram
+
+SECRET = "bench-secret"
+_update_ids = itertools.count(1)
+
+
+def _user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+
+
+def message_update(user_id: int, text: str) -> dict:
+    update_id = next(_update_ids)
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": _user(user_id),
+            "text": text,
+        },
+    }
+
+
+def callback_update(user_id: int, data: str) -> dict:
+    update_id = next(_update_ids)
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": _user(user_id),
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "text": "...",
+            },
+        },
+    }
+
+
+def inline_update(user_id: int, query: str) -> dict:
+    update_id = next(_update_ids)
+    return {
+        "update_id": update_id,
+        "inline_query": {"id": str(update_id), "from": _user(user_id), "query": query, "offset": ""},
+    }
+
+
+def scenario(user_id: int, round_no: int) -> list:
+    query = QUERIES[(user_id + round_no) % len(QUERIES)]
+    return [
+        ("start", message_update(user_id, "/start")),
+        ("menu", message_update(user_id, "Skin Price Search")),
+        ("search", message_update(user_id, query)),
+        ("noop", callback_update(user_id, "noop")),
+        ("inline", inline_update(user_id, query[:4])),
+    ]
+
+
+def percentile(samples: list, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run_user(session: aiohttp.ClientSession, url: str, user_id: int, rounds: int,
+                   latencies: dict, errors: list) -> None:
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+    for round_no in range(rounds):
+        for kind, update in scenario(user_id, round_no):
+            start = time.perf_counter()
+            async with session.post(url, json=update, headers=headers) as response:
+                await response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+            latencies.setdefault(kind, []).append(time.perf_counter() - start)
+
+
+async def main(users: int, rounds: int, size: int, with_metrics: bool) -> None:
+    await data_manager.install({"synthetic": make_database(size)})
+
+    telegram = FakeTelegram()
+    await telegram.start()
+    bot = telegram.bot()
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    if with_metrics:
+        observability.setup(dp, bot)
+    app = webhook.create_app(dp, bot, path=webhook.DEFAULT_PATH, secret_token=SECRET,
+                             handle_in_background=False)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}{webhook.DEFAULT_PATH}"
+
+    latencies, errors = {}, []
+    connector = aiohttp.TCPConnector(limit=users)
+    try:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            async with session.post(url, json=message_update(1, "/start"),
+                                    headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"}) as response:
+                print(f"wrong secret -> HTTP {response.status}")
+
+            started = time.perf_counter()
+            await asyncio.gather(*(run_user(session, url, 1000 + i, rounds, latencies, errors)
+                                   for i in range(users)))
+            elapsed = time.perf_counter() - started
+    finally:
+        await runner.cleanup()
+        await bot.session.close()
+        await telegram.stop()
+
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"{users} users x {rounds} rounds, {size} items: {total} updates in {elapsed:.2f}s "
+          f"({total / elapsed:.0f} updates/s), errors: {len(errors)}")
+    print(f"{'update':<8} {'count':>6} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for kind, samples in [*latencies.items(), ("all", [s for v in latencies.values() for s in v])]:
+        print(f"{kind:<8} {len(samples):>6} {percentile(samples, 0.5) * 1000:>8.2f} "
+              f"{percentile(samples, 0.99) * 1000:>8.2f} {statistics.mean(samples) * 1000:>8.2f}")
+    print(f"fake Bot API calls: {telegram.calls}")
+    if with_metrics:
+        print(f"metrics exposition: {len(metrics.render())} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--items", type=int, default=30_000)
+    parser.add_argument("--metrics", action="store_true", help="включить middleware метрик")
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.rounds, args.items, args.metrics))
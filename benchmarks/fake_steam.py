@@ -0,0 +1,173 @@
+"""
+Локальный stand-in для всех внешних HTTP-источников бота, чтобы гонять
+сквозные бенчмарки без сети:
+
+  /market/priceoverview/                — цена предмета (Steam Market);
+  /inventory/{steam_id}/730/2           — инвентарь CS2 постранично (start_assetid);
+  /ISteamUser/GetPlayerSummaries/v2/    — профили (Steam Web API);
+  /about/statsajax                      — онлайн Steam (Valve);
+  /all.json                             — база предметов ByMykel (с ETag/304).
+
+Задержка ответа, доля ответов 429 (с Retry-After) и размер инвентаря настраиваются.
+install() переключает URL модулей app на этот сервер.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import time
+
+from aiohttp import web
+
+from app import data_manager, inventory_api, official_steam_api, steam_api, valve_stats_api
+from benchmarks.bench_search import make_database
+
+RARITIES = ["Consumer Grade", "Industrial Grade", "Mil-Spec Grade", "Restricted", "Classified", "Covert"]
+COLLECTIONS = ["The Phoenix Collection", "The Huntsman Collection", "The Dreams & Nightmares Collection",
+               "The Anubis Collection", "The Revolution Collection"]
+
+
+def make_catalog(size: int, seed: int = 7) -> dict:
+    """
+    all.json как у ByMykel: имена из bench_search.make_database
+    плюс вложенные объекты и тяжёлые cold-поля.
+    """
+    rng = random.Random(seed)
+    items = {}
+    for item_id, item in make_database(size, seed).items():
+        name = item["name"]
+        weapon = name.split(" | ", 1)[0].replace("★ ", "")
+        items[item_id] = {
+            "id": item_id,
+            "name": name,
+            "description": "Lorem ipsum " * 20,
+            "weapon": {"id": "weapon_" + weapon.lower(), "name": weapon},
+            "rarity": {"id": "rarity", "name": rng.choice(RARITIES), "color": "#4b69ff"},
+            "stattrak": rng.random() < 0.3,
+            "souvenir": rng.random() < 0.05,
+            "collections": [{"id": "collection", "name": rng.choice(COLLECTIONS),
+                             "image": "https://example.invalid/" + "c" * 60}],
+            "image": "https://example.invalid/" + "i" * 90,
+        }
+    return items
+
+
+class FakeSteam:
+    def __init__(self, latency: float = 0.0, rate_limit: float = 0.0, retry_after: int = 1,
+                 inventory_size: int = 1000, items: int = 27_000, seed: int = 1):
+        self.latency = latency
+        self.rate_limit = rate_limit        # доля ответов 429
+        self.retry_after = retry_after
+        self.inventory_size = inventory_size
+        self.catalog = make_catalog(items)
+        self.names = [item["name"] for item in self.catalog.values()]
+        self.all_json = json.dumps(self.catalog).encode()
+        self.etag = '"' + hashlib.md5(self.all_json).hexdigest() + '"'
+        self.calls = {}
+        self.limited = 0
+        self._rng = random.Random(seed)
+        self._runner = None
+        self.url = None
+
+    async def _gate(self, kind: str) -> web.Response | None:
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.rate_limit and self._rng.random() < self.rate_limit:
+            self.limited += 1
+            return web.Response(status=429, headers={"Retry-After": str(self.retry_after)})
+        return None
+
+    async def price(self, request: web.Request) -> web.Response:
+        limited = await self._gate("priceoverview")
+        if limited:
+            return limited
+        name = request.query.get("market_hash_name", "")
+        cents = int(hashlib.md5(name.encode()).hexdigest()[:6], 16) % 100_000 + 3
+        return web.json_response({
+            "success": True,
+            "lowest_price": f"${cents / 100:,.2f}",
+            "median_price": f"${cents * 1.05 / 100:,.2f}",
+            "volume": f"{cents % 5000:,}",
+        })
+
+    async def inventory(self, request: web.Request) -> web.Response:
+        limited = await self._gate("inventory")
+        if limited:
+            return limited
+        steam_id = request.match_info["steam_id"]
+        count = int(request.query.get("count", 2000))
+        start = int(request.query.get("start_assetid", 0))
+        rng = random.Random(steam_id)
+        owned = [rng.randrange(len(self.names)) for _ in range(self.inventory_size)]
+        page = owned[start:start + count]
+        end = start + len(page)
+        return web.json_response({
+            "assets": [{"assetid": str(start + i), "classid": str(index), "instanceid": "0", "amount": "1"}
+                       for i, index in enumerate(page)],
+            "descriptions": [{"classid": str(index), "instanceid": "0", "marketable": 1,
+                              "market_hash_name": self.names[index]} for index in set(page)],
+            "more_items": 1 if end < len(owned) else 0,
+            "last_assetid": str(end) if end < len(owned) else None,
+            "total_inventory_count": len(owned),
+            "success": 1,
+        })
+
+    async def summaries(self, request: web.Request) -> web.Response:
+        limited = await self._gate("GetPlayerSummaries")
+        if limited:
+            return limited
+        players = [{
+            "steamid": steam_id,
+            "personaname": f"player{steam_id[-4:]}",
+            "profileurl": f"https://steamcommunity.com/profiles/{steam_id}/",
+            "avatarfull": "https://example.invalid/avatar.jpg",
+            "personastate": int(steam_id) % 7,
+            "communityvisibilitystate": 3,
+            "timecreated": 1_300_000_000 + int(steam_id) % 300_000_000,
+        } for steam_id in request.query.get("steamids", "").split(",") if steam_id]
+        return web.json_response({"response": {"players": players}})
+
+    async def stats(self, request: web.Request) -> web.Response:
+        limited = await self._gate("statsajax")
+        if limited:
+            return limited
+        online = 30_000_000 + int(time.time()) % 1000
+        return web.json_response({"online": f"{online:,}", "ingame": f"{online // 3:,}"})
+
+    async def items(self, request: web.Request) -> web.Response:
+        self.calls["all.json"] = self.calls.get("all.json", 0) + 1
+        if request.headers.get("If-None-Match") == self.etag:
+            return web.Response(status=304, headers={"ETag": self.etag})
+        return web.Response(body=self.all_json, content_type="application/json", headers={"ETag": self.etag})
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_get("/market/priceoverview/", self.price)
+        app.router.add_get("/inventory/{steam_id}/730/2", self.inventory)
+        app.router.add_get("/ISteamUser/GetPlayerSummaries/v2/", self.summaries)
+        app.router.add_get("/about/statsajax", self.stats)
+        app.router.add_get("/all.json", self.items)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def install(self) -> None:
+        """
+        Направляет API-клиенты бота на этот сервер. Лимиты request_scheduler
+        привязаны к настоящим хостам, поэтому к локальному не применяются.
+        """
+        steam_api.PRICE_URL = f"{self.url}/market/priceoverview/"
+        inventory_api.INVENTORY_URL = self.url + "/inventory/{steam_id}/730/2"
+        official_steam_api.API_URL = f"{self.url}/ISteamUser/GetPlayerSummaries/v2/"
+        official_steam_api.configure("fake-steam-key")
+        valve_stats_api.STATS_URL = f"{self.url}/about/statsajax?l=english"
+        data_manager.DATA_URLS = [{"name": "all_items", "url": f"{self.url}/all.json"}]
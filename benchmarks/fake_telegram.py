@@ -0,0 +1,99 @@
+"""
+Локальный stand-in для Telegram Bot API, чтобы гонять бота в бенчмарках без сети.
+
+Отвечает {"ok": true, "result": ...} на любой метод: для sendMessage/sendPhoto/editMessageText
+возвращает объект Message, для остальных — true. Может добавлять задержку
+и изображать flood control: при превышении chat_limit сообщений в секунду
+в один чат отвечает 429 с retry_after, как настоящий Bot API.
+"""
+import asyncio
+import itertools
+import time
+
+from aiohttp import web
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+TOKEN = "123456:AAFakeTokenForLocalBenchmarksOnly0000"
+MESSAGE_METHODS = {"sendmessage", "sendphoto", "editmessagetext", "editmessagereplymarkup"}
+
+
+class FakeTelegram:
+    def __init__(self, latency: float = 0.0, chat_limit: float | None = None, chat_burst: int = 3,
+                 retry_after: int = 1):
+        self.latency = latency
+        self.chat_limit = chat_limit
+        self.chat_burst = chat_burst
+        self.retry_after = retry_after
+        self.calls = {}
+        self.flooded = 0
+        self.texts = {}                 # (chat_id, message_id) -> последний текст/клавиатура
+        self._allowance = {}            # chat_id -> (токены, время)
+        self._message_ids = itertools.count(1)
+        self._runner = None
+        self.url = None
+
+    def _message(self, form) -> dict:
+        chat_id = int(form.get("chat_id") or 1)
+        return {
+            "message_id": int(form.get("message_id") or next(self._message_ids)),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": form.get("text", ""),
+        }
+
+    def _over_limit(self, chat_id) -> bool:
+        if self.chat_limit is None or chat_id is None:
+            return False
+        now = time.monotonic()
+        tokens, updated = self._allowance.get(chat_id, (self.chat_burst, now))
+        tokens = min(self.chat_burst, tokens + (now - updated) * self.chat_limit)
+        if tokens < 1:
+            self._allowance[chat_id] = (tokens, now)
+            return True
+        self._allowance[chat_id] = (tokens - 1, now)
+        return False
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] = self.calls.get(method, 0) + 1
+        form = await request.post()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        limited = method.lower().startswith(("send", "edit", "copy", "forward"))
+        if limited and self._over_limit(form.get("chat_id")):
+            self.flooded += 1
+            return web.json_response({
+                "ok": False, "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }, status=429)
+        if form.get("message_id"):
+            self.texts[(form.get("chat_id"), form.get("message_id"))] = form.get("text") or form.get("reply_markup")
+
+        if method.lower() in MESSAGE_METHODS and not form.get("inline_message_id"):
+            result = self._message(form)
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def bot(self) -> Bot:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(self.url))
+        return Bot(token=TOKEN, session=session)
@@ -1,16 +1,40 @@
-
 import asyncio
 import logging
 import os  
 from dotenv import load_dotenv  
 
+from aiohttp import web
 from aiogram import Bot, Dispatcher
+from aiogram.methods import SendMessage
 from app.handlers import router
-from app.data_manager import load_all_item_data
+from app import data_manager
+from app import http_client
+from app import json_decoder
+from app import loop_monitor
+from app import observability
+from app import official_steam_api
+from app.price_history import price_history
+from app.price_watch import watch_scheduler
+from app import stats_poller
+from app import storage
+from app import telegram_outbox
+from app import webhook
 
 
 load_dotenv()
 API_KEY = os.getenv("STEAM_API_KEY")
+BOT_TOKEN = os.getenv("BOT_TOKEN")
+
+# polling — один процесс, long polling; webhook — aiohttp-сервер,
+# таких воркеров можно запустить несколько за балансировщиком.
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", webhook.DEFAULT_HOST)
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", webhook.DEFAULT_PORT))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", webhook.DEFAULT_PATH)
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+# Публичный адрес (https://bot.example.com). Если задан, воркер сам регистрирует
+# вебхук в Telegram; если нет — вебхук настроен снаружи (один раз на весь кластер).
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL")
 
 
 logging.basicConfig(level=logging.INFO)
@@ -21,21 +45,88 @@ if not API_KEY:
     exit() 
 else:
     logging.info("STEAM_API_KEY успешно загружен.")
+    official_steam_api.configure(API_KEY)
 
+if not BOT_TOKEN:
+    logging.critical("BOT_TOKEN не найден! Добавь токен бота в .env файл.")
+    exit()
 
-dp = Dispatcher()
+if BOT_MODE not in ("polling", "webhook"):
+    logging.critical(f"Неизвестный BOT_MODE={BOT_MODE!r}, ожидается polling или webhook.")
+    exit()
 
-async def main() -> None:
-    bot = Bot(token="your token here")
+if BOT_MODE == "webhook" and not WEBHOOK_SECRET:
+    logging.warning("WEBHOOK_SECRET не задан: вебхук примет запросы от кого угодно.")
 
-    dp.include_router(router)
 
-    await load_all_item_data()
-    
+# FSM лежит в общем хранилище (STORAGE_URL): переживает перезапуск
+# и доступно всем воркерам.
+dp = Dispatcher(storage=storage.KeyValueStorage())
+
+
+async def run_polling(bot: Bot) -> None:
     await bot.delete_webhook(drop_pending_updates=True)
-    
     await dp.start_polling(bot)
 
+
+async def run_webhook(bot: Bot) -> None:
+    app = webhook.create_app(dp, bot, path=WEBHOOK_PATH, secret_token=WEBHOOK_SECRET)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+        await site.start()
+        logging.info(f"Webhook server listening on {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+
+        if WEBHOOK_BASE_URL:
+            await bot.set_webhook(
+                WEBHOOK_BASE_URL.rstrip("/") + WEBHOOK_PATH,
+                secret_token=WEBHOOK_SECRET,
+                drop_pending_updates=True,
+            )
+
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def main() -> None:
+    bot = Bot(token=BOT_TOKEN)
+
+    dp.include_router(router)
+    # Очередь исходящих снаружи, метрики внутри: telegram_request_seconds — время самого вызова.
+    bot.session.middleware(telegram_outbox.outbox)
+    observability.setup(dp, bot)
+
+    await http_client.init_session()
+    await storage.init_store()
+    loop_monitor.start()
+    await observability.start()
+    try:
+        await data_manager.load_all_item_data()
+        data_manager.start_background_refresh()
+        stats_poller.start()
+        price_history.start()
+        await watch_scheduler.start(
+            lambda user_id, text: telegram_outbox.send_background(
+                bot, SendMessage(chat_id=user_id, text=text, parse_mode="HTML"))
+        )
+
+        if BOT_MODE == "webhook":
+            await run_webhook(bot)
+        else:
+            await run_polling(bot)
+    finally:
+        await data_manager.stop_background_refresh()
+        await stats_poller.stop()
+        await price_history.stop()
+        await watch_scheduler.stop()
+        await loop_monitor.stop()
+        await observability.stop()
+        await http_client.close_session()
+        await storage.close_store()
+        json_decoder.shutdown()
+
 if __name__ =='__main__':
     try:
         asyncio.run(main())